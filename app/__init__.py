@@ -13,5 +13,11 @@ __version__ = "1.0.0"
 __author__ = "Tu Nombre"
 __email__ = "tu@email.com"
 
-# Exportar los módulos principales para facilitar el acceso
-from .main import main  # noqa
\ No newline at end of file
+
+
+def __getattr__(name):
+    """`from app import main` carga la GUI solo cuando se pide: los servicios se importan sin PyQt6"""
+    if name == 'main':
+        from .main import main
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -24,10 +24,7 @@ class AuthController:
     def ensure_connection(self):
         """Verifica conexión a la base de datos"""
         try:
-            if not self.db.connection_pool:
-                return False
-            self.db.connection = self.db.get_connection()
-            return self.db.connection is not None
+            return self.db.check_connection()
         except Exception as e:
             self.logger.error(f"Error al verificar conexión: {str(e)}")
             return False
\ No newline at end of file
@@ -1,32 +1,99 @@
 # app/controllers/video_controller.py
 from app.services.video_service import VideoService
+from app.services.intent_engine import CommandDispatcher
+from app.services.event_sink import create_event_sink
+from app.services.inference_server import get_inference_server
 
 class VideoController:
-    def __init__(self):
-        self.video_service = VideoService()
+    def __init__(self, inference_server=None, stream_id=None, db=None, user=None):
+        # Todas las cámaras del proceso comparten un modelo y lo consultan en lotes
+        self.video_service = VideoService(inference_server or get_inference_server(), stream_id)
+        self.commands = CommandDispatcher(self)
+        self.commands.set_face_aliases(self.video_service.get_face_aliases())
+        if db is not None:
+            self.video_service.set_gallery_db(db, lambda stats: self.refresh_face_aliases())
+            self.video_service.set_event_sink(create_event_sink(db), user)
     
-    def start_video(self, callback=None):
+    def start_video(self, callback=None, source=None):
         if callback:
             self.video_service.set_frame_callback(callback)
-        return self.video_service.start_camera()
+        return self.video_service.start_camera(source)
     
     def stop_video(self):
         self.video_service.stop_camera()
     
+    def get_pipeline_stats(self):
+        return self.video_service.get_pipeline_stats()
+    
+    def get_active_tracks(self):
+        return self.video_service.get_active_tracks()
+    
+    def add_track_listener(self, callback):
+        self.video_service.add_track_listener(callback)
+    
+    def get_metrics(self):
+        return self.video_service.get_metrics()
+    
+    def get_model_stats(self):
+        return self.video_service.get_model_stats()
+    
+    def get_event_stats(self):
+        sink = self.video_service.event_sink
+        return dict(sink.stats) if sink else {}
+    
     def set_detection_mode(self, mode):
         self.video_service.set_detection_mode(mode)
     
     def set_target_object(self, object_name):
         self.video_service.set_target_object(object_name)
     
+    def set_target_color(self, color):
+        self.video_service.set_target_color(color)
+    
+    def set_target_face(self, alias):
+        self.video_service.set_target_face(alias)
+    
+    def set_face_aliases(self, aliases):
+        self.commands.set_face_aliases(aliases)
+    
+    def get_recognized_faces(self):
+        return self.video_service.get_recognized_faces()
+    
+    def add_face_listener(self, callback):
+        self.video_service.add_face_listener(callback)
+    
+    def remove_face_listener(self, callback):
+        self.video_service.remove_face_listener(callback)
+    
+    def refresh_face_aliases(self):
+        self.commands.set_face_aliases(self.video_service.get_face_aliases())
+    
+    def get_class_names(self):
+        return self.video_service.get_class_names()
+    
+    def set_detect_interval(self, max_interval, min_interval=1):
+        self.video_service.set_detect_interval(max_interval, min_interval)
+    
+    def set_motion_gating(self, enabled, threshold=None, force_every=None):
+        self.video_service.set_motion_gating(enabled, threshold, force_every)
+    
     def set_mask_method(self, method):
         self.video_service.mask_method = method  # Usando property ahora
     
-    def toggle_voice_listening(self):
-        return self.video_service.toggle_listening()
+    def toggle_voice_listening(self, on_text=None, on_error=None):
+        return self.video_service.toggle_listening(on_text, on_error)
+    
+    def start_listening(self, on_text, on_error=None):
+        return self.video_service.start_listening(on_text, on_error)
+    
+    def stop_listening(self):
+        self.video_service.stop_listening()
+    
+    def is_listening(self):
+        return self.video_service.listening
     
     def process_command(self, command):
-        return self.video_service.process_command(command)
+        return self.commands.handle(command)
     
     def speak(self, text):
         self.video_service.speak(text)
\ No newline at end of file
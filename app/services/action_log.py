@@ -0,0 +1,316 @@
+# app/services/action_log.py
+import argparse
+import json
+import logging
+import struct
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger("nova.vision")
+
+DEFAULT_ACTION_LOG_DIR = Path("ST_GCN/action_logs")
+
+MAGIC = b"NOVAACT1"
+VERSION = 1
+# magic, versión, keypoints por registro, bytes de la etiqueta, bytes por registro
+HEADER = struct.Struct("<8sIIII8x")
+LABEL_BYTES = 24
+
+TimeLike = Union[float, int, str, datetime]
+
+
+def record_dtype(n_keypoints: int = 17) -> np.dtype:
+    """Registro de ancho fijo: marca de tiempo, confianza, acción y keypoints (x, y, score) en float32"""
+    return np.dtype([('ts', '<f8'), ('confidence', '<f4'), ('action', f'S{LABEL_BYTES}'),
+                     ('keypoints', '<f4', (n_keypoints, 3))])
+
+
+def to_timestamp(value: TimeLike) -> float:
+    """Segundos epoch; las fechas sin zona horaria son hora local, como en action_logs.json"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+class ActionSegment(NamedTuple):
+    path: Path
+    n_keypoints: int
+    count: int
+    first_ts: float
+    last_ts: float
+
+
+def _read_header(path: Path) -> Optional[tuple]:
+    with open(path, 'rb') as f:
+        raw = f.read(HEADER.size)
+    if len(raw) < HEADER.size:
+        return None
+    magic, version, n_keypoints, label_bytes, record_size = HEADER.unpack(raw)
+    if magic != MAGIC or version != VERSION or label_bytes != LABEL_BYTES or \
+            record_size != record_dtype(n_keypoints).itemsize:
+        raise ValueError(f"{path} no es un segmento de acciones válido")
+    return n_keypoints, record_size
+
+
+def open_segment(path: Path) -> np.ndarray:
+    """Registros completos del segmento, mapeados en memoria (solo lectura)"""
+    header = _read_header(path)
+    if header is None:
+        return np.empty(0, dtype=record_dtype())
+    n_keypoints, record_size = header
+    count = (path.stat().st_size - HEADER.size) // record_size  # Ignora un registro a medio escribir
+    if count <= 0:
+        return np.empty(0, dtype=record_dtype(n_keypoints))
+    return np.memmap(path, dtype=record_dtype(n_keypoints), mode='r', offset=HEADER.size, shape=(count,))
+
+
+class ActionLogWriter:
+    """Registro de acciones en segmentos binarios de solo agregado
+
+    Cada registro ocupa record_dtype().itemsize bytes (240 con 17 keypoints,
+    ~8 veces menos que en JSON), así que agregar es escribir al final y leer
+    es mapear el archivo. Dentro de un segmento las marcas de tiempo no
+    decrecen: un segmento se rota al llegar a max_records o si el reloj
+    retrocede, y los segmentos viejos se pueden archivar o borrar enteros.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_ACTION_LOG_DIR, n_keypoints: int = 17,
+                 max_records: int = 100_000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.n_keypoints = n_keypoints
+        self.dtype = record_dtype(n_keypoints)
+        self.max_records = max_records
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._count = 0
+        self._last_ts = float('-inf')
+        self._resume()
+
+    def _resume(self):
+        """Continúa el último segmento si es compatible, descartando un registro incompleto al final"""
+        segments = sorted(self.directory.glob("actions_*.bin"))
+        if not segments:
+            return
+        path = segments[-1]
+        try:
+            header = _read_header(path)
+        except ValueError as e:
+            logger.warning(str(e))
+            return
+        if header is None or header[0] != self.n_keypoints:
+            return
+        count = (path.stat().st_size - HEADER.size) // self.dtype.itemsize
+        if count >= self.max_records:
+            return
+        self._file = open(path, 'r+b')
+        self._file.truncate(HEADER.size + count * self.dtype.itemsize)
+        self._file.seek(0, 2)
+        self._path = path
+        self._count = count
+        if count:
+            self._last_ts = float(open_segment(path)['ts'][-1])
+
+    def _rotate(self, first_ts: float):
+        self._close_file()
+        stamp = int(first_ts * 1000)
+        path = self.directory / f"actions_{stamp:015d}.bin"
+        while path.exists():
+            stamp += 1
+            path = self.directory / f"actions_{stamp:015d}.bin"
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, self.n_keypoints, LABEL_BYTES, self.dtype.itemsize))
+        self._path = path
+        self._count = 0
+        self._last_ts = float('-inf')
+
+    def append(self, action: str, confidence: float, keypoints: Sequence[Sequence[float]],
+               timestamp: Optional[TimeLike] = None):
+        """Agrega una acción reconocida (keypoints: n_keypoints × [x, y, score])"""
+        record = np.zeros(1, dtype=self.dtype)
+        record['ts'] = time.time() if timestamp is None else to_timestamp(timestamp)
+        record['confidence'] = confidence
+        record['action'] = self._encode(action)
+        points = np.asarray(keypoints, dtype=np.float32)
+        if points.shape != (self.n_keypoints, 3):
+            raise ValueError(f"Se esperaban {self.n_keypoints}×3 keypoints, llegaron {points.shape}")
+        record['keypoints'] = points
+        self.extend(record)
+
+    def extend(self, records: np.ndarray):
+        """Agrega un arreglo de registros (record_dtype) en orden de tiempo"""
+        if records.dtype != self.dtype:
+            raise ValueError("Los registros no tienen el formato de este registro de acciones")
+        with self._lock:
+            start = 0
+            while start < len(records):
+                ts = records['ts']
+                if self._file is None or self._count >= self.max_records or ts[start] < self._last_ts:
+                    self._rotate(float(ts[start]))
+                # Tramo que cabe en el segmento actual sin que el tiempo retroceda
+                stop = min(len(records), start + self.max_records - self._count)
+                backwards = np.flatnonzero(np.diff(ts[start:stop]) < 0)
+                if len(backwards):
+                    stop = start + int(backwards[0]) + 1
+                self._file.write(records[start:stop].tobytes())
+                self._count += stop - start
+                self._last_ts = float(ts[stop - 1])
+                start = stop
+            self._file.flush()  # Visible para los lectores sin esperar al cierre
+
+    @staticmethod
+    def _encode(action: str) -> bytes:
+        encoded = action.encode('utf-8')
+        if len(encoded) > LABEL_BYTES:
+            raise ValueError(f"Nombre de acción de más de {LABEL_BYTES} bytes: {action!r}")
+        return encoded
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        with self._lock:
+            self._close_file()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ActionLogReader:
+    """Lectura por rango de tiempo sin cargar el historial completo
+
+    El índice de tiempo son los propios segmentos: primer y último ts de
+    cada uno descartan los que no se solapan con el rango, y dentro de un
+    segmento (ordenado) el rango se ubica con búsqueda binaria sobre la
+    columna ts mapeada en memoria.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_ACTION_LOG_DIR):
+        self.directory = Path(directory)
+        self._index: Dict[Path, ActionSegment] = {}
+
+    def segments(self) -> List[ActionSegment]:
+        """Segmentos ordenados por su primer registro (solo relee los que cambiaron de tamaño)"""
+        segments = []
+        for path in self.directory.glob("actions_*.bin"):
+            cached = self._index.get(path)
+            try:
+                if cached is not None:
+                    size = path.stat().st_size - HEADER.size
+                    if size // record_dtype(cached.n_keypoints).itemsize == cached.count:
+                        segments.append(cached)
+                        continue
+                records = open_segment(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Segmento de acciones ignorado: {str(e)}")
+                continue
+            if cached is None or cached.count != len(records):
+                if not len(records):
+                    continue
+                cached = ActionSegment(path, records.dtype['keypoints'].shape[0], len(records),
+                                       float(records['ts'][0]), float(records['ts'][-1]))
+                self._index[path] = cached
+            segments.append(cached)
+        return sorted(segments, key=lambda s: (s.first_ts, s.path.name))
+
+    def iter_range(self, start: Optional[TimeLike] = None,
+                   end: Optional[TimeLike] = None) -> Iterator[np.ndarray]:
+        """Por segmento, la vista mapeada de los registros con start <= ts < end"""
+        lo = float('-inf') if start is None else to_timestamp(start)
+        hi = float('inf') if end is None else to_timestamp(end)
+        for segment in self.segments():
+            if segment.last_ts < lo or segment.first_ts >= hi:
+                continue
+            records = open_segment(segment.path)[:segment.count]
+            ts = records['ts']
+            i, j = np.searchsorted(ts, lo, 'left'), np.searchsorted(ts, hi, 'left')
+            if j > i:
+                yield records[i:j]
+
+    def read(self, start: Optional[TimeLike] = None, end: Optional[TimeLike] = None) -> np.ndarray:
+        """Registros del rango copiados en un solo arreglo"""
+        parts = [np.array(part) for part in self.iter_range(start, end)]
+        if not parts:
+            return np.empty(0, dtype=record_dtype())
+        return np.concatenate(parts)
+
+    def records(self, start: Optional[TimeLike] = None, end: Optional[TimeLike] = None) -> Iterator[dict]:
+        """Registros del rango con la forma de action_logs.json"""
+        for part in self.iter_range(start, end):
+            for record in part:
+                yield {
+                    'timestamp': datetime.fromtimestamp(float(record['ts'])).isoformat(),
+                    'action': record['action'].decode('utf-8'),
+                    'confidence': float(record['confidence']),
+                    'keypoints': record['keypoints'].tolist(),
+                }
+
+    def __len__(self) -> int:
+        return sum(segment.count for segment in self.segments())
+
+
+def convert_json(source: Path, directory: Path = DEFAULT_ACTION_LOG_DIR, append: bool = False,
+                 max_records: int = 100_000) -> dict:
+    """Convierte un action_logs.json (arreglo de {timestamp, action, confidence, keypoints})"""
+    directory = Path(directory)
+    if not append and any(directory.glob("actions_*.bin")):
+        raise FileExistsError(f"{directory} ya tiene segmentos (usar append=True para agregar)")
+    with open(source, encoding='utf-8') as f:
+        entries = json.load(f)
+    n_keypoints = len(entries[0]['keypoints']) if entries else 17
+    dtype = record_dtype(n_keypoints)
+    records = np.zeros(len(entries), dtype=dtype)
+    valid = np.ones(len(entries), dtype=bool)
+    for i, entry in enumerate(entries):
+        try:
+            records[i] = (to_timestamp(entry['timestamp']), entry.get('confidence', 0.0),
+                          ActionLogWriter._encode(entry['action']),
+                          np.asarray(entry['keypoints'], dtype=np.float32).reshape(n_keypoints, 3))
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Registro {i} de {source} omitido: {str(e)}")
+            valid[i] = False
+    records = records[valid]
+    records = records[np.argsort(records['ts'], kind='stable')]
+    with ActionLogWriter(directory, n_keypoints, max_records) as writer:
+        writer.extend(records)
+    return {'converted': len(records), 'skipped': int((~valid).sum()),
+            'json_bytes': Path(source).stat().st_size, 'binary_bytes': len(records) * dtype.itemsize}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro de acciones en segmentos binarios")
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert = commands.add_parser('convert', help="convierte un action_logs.json")
+    convert.add_argument('source', type=Path)
+    convert.add_argument('directory', type=Path, nargs='?', default=DEFAULT_ACTION_LOG_DIR)
+    convert.add_argument('--append', action='store_true')
+    info = commands.add_parser('info', help="lista los segmentos")
+    info.add_argument('directory', type=Path, nargs='?', default=DEFAULT_ACTION_LOG_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        stats = convert_json(args.source, args.directory, append=args.append)
+        print(f"{stats['converted']} registros convertidos ({stats['skipped']} omitidos): "
+              f"{stats['json_bytes'] / 1024:.0f} KB en JSON -> {stats['binary_bytes'] / 1024:.0f} KB")
+    else:
+        for segment in ActionLogReader(args.directory).segments():
+            print(f"{segment.path.name}: {segment.count} registros, "
+                  f"{datetime.fromtimestamp(segment.first_ts).isoformat()} a "
+                  f"{datetime.fromtimestamp(segment.last_ts).isoformat()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+# app/services/ann_index.py
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("nova.vision")
+
+
+class VectorIndex:
+    """Interfaz de índice por producto punto sobre vectores normalizados con id entero
+
+    search() retorna (scores, ids) de forma (M, k); las posiciones sin
+    resultado llevan id -1 y score -inf.
+    """
+
+    kind = 'base'
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def build(self, vectors: np.ndarray, ids: np.ndarray):
+        raise NotImplementedError
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray):
+        raise NotImplementedError
+
+    def remove(self, ids: np.ndarray):
+        raise NotImplementedError
+
+    def search(self, queries: np.ndarray, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    def save(self, path: Path):
+        raise NotImplementedError
+
+    @classmethod
+    def load(cls, path: Path) -> "VectorIndex":
+        raise NotImplementedError
+
+    @classmethod
+    def exists(cls, path: Path) -> bool:
+        """True si save(path) dejó en disco todo lo que load(path) necesita"""
+        return Path(path).exists()
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+def _top_k(scores: np.ndarray, ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k por fila de una matriz (M, N) de scores, con relleno si N < k"""
+    m, n = scores.shape
+    out_scores = np.full((m, k), -np.inf, dtype=np.float32)
+    out_ids = np.full((m, k), -1, dtype=np.int64)
+    if not n:
+        return out_scores, out_ids
+    kk = min(k, n)
+    top = np.argpartition(-scores, kk - 1, axis=1)[:, :kk] if kk < n else \
+        np.broadcast_to(np.arange(n), (m, n))
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    out_scores[:, :kk] = np.take_along_axis(top_scores, order, axis=1)
+    out_ids[:, :kk] = ids[top]
+    return out_scores, out_ids
+
+
+class FlatIndex(VectorIndex):
+    """Búsqueda exacta: un matmul contra todos los vectores"""
+
+    kind = 'flat'
+
+    def __init__(self, dim: int):
+        super().__init__(dim)
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.ids = np.empty(0, dtype=np.int64)
+
+    def build(self, vectors, ids):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        self.ids = np.asarray(ids, dtype=np.int64)
+
+    def add(self, vectors, ids):
+        self.build(np.concatenate([self.vectors, np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)]),
+                   np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)]))
+
+    def remove(self, ids):
+        keep = ~np.isin(self.ids, np.asarray(ids, dtype=np.int64))
+        self.build(self.vectors[keep], self.ids[keep])
+
+    def search(self, queries, k=5):
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        return _top_k(queries @ self.vectors.T, self.ids, k)
+
+    def save(self, path):
+        np.savez(path, kind=self.kind, vectors=self.vectors, ids=self.ids)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        index = cls(data['vectors'].shape[1])
+        index.build(data['vectors'], data['ids'])
+        return index
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 10,
+                     seed: int = 0) -> np.ndarray:
+    """Centroides normalizados que maximizan el coseno (k-means sobre la esfera)"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        counts = np.bincount(assign, minlength=k)
+        # Listas vacías: se re-siembran con vectores al azar
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+    return centroids.astype(np.float32)
+
+
+class IVFFlatIndex(VectorIndex):
+    """Índice invertido: k-means grueso y búsqueda exacta en las nprobe listas más cercanas
+
+    Cada lista guarda sus vectores en un arreglo con capacidad que se duplica;
+    los lectores toman (vectores, ids, n) publicados de una vez, así que
+    agregar o quitar no altera una búsqueda en curso.
+    """
+
+    kind = 'ivf'
+
+    def __init__(self, dim: int, nlist: Optional[int] = None, nprobe: int = 8,
+                 iterations: int = 10, seed: int = 0):
+        super().__init__(dim)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids = np.empty((0, dim), dtype=np.float32)
+        self._lists = []  # Por lista: (vectores, ids, n)
+        self._where = {}  # id → lista
+        self._lock = threading.Lock()
+
+    def build(self, vectors, ids):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        ids = np.asarray(ids, dtype=np.int64)
+        nlist = self.nlist or max(1, int(round(4 * np.sqrt(len(vectors)))))
+        nlist = max(1, min(nlist, len(vectors)))
+        self.nlist = nlist
+        self.centroids = spherical_kmeans(vectors, nlist, self.iterations, self.seed) if len(vectors) \
+            else np.zeros((1, self.dim), dtype=np.float32)
+        self._lists = [(np.empty((0, self.dim), dtype=np.float32), np.empty(0, dtype=np.int64), 0)
+                       for _ in range(len(self.centroids))]
+        self._where = {}
+        if len(vectors):
+            self.add(vectors, ids)
+
+    def add(self, vectors, ids):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(self._lists):
+            self.build(vectors, ids)
+            return
+        assign = np.argmax(vectors @ self.centroids.T, axis=1)
+        with self._lock:
+            for lst in np.unique(assign):
+                rows = np.flatnonzero(assign == lst)
+                stored, stored_ids, n = self._lists[lst]
+                needed = n + len(rows)
+                if needed > len(stored):
+                    capacity = max(needed, 2 * len(stored), 16)
+                    grown = np.empty((capacity, self.dim), dtype=np.float32)
+                    grown_ids = np.empty(capacity, dtype=np.int64)
+                    grown[:n], grown_ids[:n] = stored[:n], stored_ids[:n]
+                    stored, stored_ids = grown, grown_ids
+                stored[n:needed] = vectors[rows]
+                stored_ids[n:needed] = ids[rows]
+                self._lists[lst] = (stored, stored_ids, needed)
+                for i in ids[rows]:
+                    self._where[int(i)] = int(lst)
+
+    def remove(self, ids):
+        with self._lock:
+            by_list = {}
+            for i in np.asarray(ids, dtype=np.int64).ravel():
+                lst = self._where.pop(int(i), None)
+                if lst is not None:
+                    by_list.setdefault(lst, []).append(int(i))
+            for lst, removed in by_list.items():
+                stored, stored_ids, n = self._lists[lst]
+                keep = ~np.isin(stored_ids[:n], removed)
+                # Copia nueva de la lista: los lectores siguen con la anterior
+                self._lists[lst] = (stored[:n][keep].copy(), stored_ids[:n][keep].copy(), int(keep.sum()))
+
+    def search(self, queries, k=5):
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        out_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        out_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        if not len(self._where) or not len(queries):
+            return out_scores, out_ids
+        lists = self._lists
+        nprobe = min(self.nprobe, len(lists))
+        coarse = queries @ self.centroids.T
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe] if nprobe < len(lists) \
+            else np.broadcast_to(np.arange(len(lists)), coarse.shape)
+        for q, probe in enumerate(probes):
+            parts = [lists[lst] for lst in probe if lists[lst][2]]
+            if not parts:
+                continue
+            vectors = np.concatenate([v[:n] for v, _, n in parts])
+            ids = np.concatenate([i[:n] for _, i, n in parts])
+            scores, found = _top_k((queries[q:q + 1] @ vectors.T), ids, k)
+            out_scores[q], out_ids[q] = scores[0], found[0]
+        return out_scores, out_ids
+
+    def save(self, path):
+        lists = self._lists
+        counts = np.array([n for _, _, n in lists], dtype=np.int64)
+        vectors = np.concatenate([v[:n] for v, _, n in lists]) if lists else np.empty((0, self.dim))
+        ids = np.concatenate([i[:n] for _, i, n in lists]) if lists else np.empty(0, dtype=np.int64)
+        params = {'nprobe': self.nprobe, 'iterations': self.iterations, 'seed': self.seed}
+        np.savez(path, kind=self.kind, centroids=self.centroids, counts=counts,
+                 vectors=vectors.astype(np.float32), ids=ids, params=json.dumps(params))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        params = json.loads(str(data['params']))
+        centroids = data['centroids']
+        index = cls(centroids.shape[1], nlist=len(centroids), **params)
+        index.centroids = centroids
+        offsets = np.concatenate([[0], np.cumsum(data['counts'])])
+        vectors, ids = data['vectors'], data['ids']
+        index._lists = []
+        for lst in range(len(centroids)):
+            start, end = offsets[lst], offsets[lst + 1]
+            index._lists.append((vectors[start:end].copy(), ids[start:end].copy(), int(end - start)))
+            for i in ids[start:end]:
+                index._where[int(i)] = lst
+        return index
+
+    def __len__(self):
+        return len(self._where)
+
+
+class HNSWIndex(VectorIndex):
+    """Grafo HNSW con hnswlib (dependencia opcional); las bajas se marcan como borradas"""
+
+    kind = 'hnsw'
+
+    def __init__(self, dim: int, m: int = 16, ef_construction: int = 200, ef: int = 64):
+        try:
+            import hnswlib
+        except ImportError as e:
+            raise RuntimeError("hnswlib no está instalado (pip install hnswlib)") from e
+        super().__init__(dim)
+        self._hnswlib = hnswlib
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef = ef
+        self._index = None
+        self._count = 0
+
+    def _new(self, capacity: int):
+        index = self._hnswlib.Index(space='ip', dim=self.dim)
+        index.init_index(max_elements=max(capacity, 16), ef_construction=self.ef_construction,
+                         M=self.m, allow_replace_deleted=True)
+        index.set_ef(self.ef)
+        return index
+
+    def build(self, vectors, ids):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        self._index = self._new(2 * len(vectors))
+        self._count = 0
+        if len(vectors):
+            self.add(vectors, ids)
+
+    def add(self, vectors, ids):
+        if self._index is None:
+            self.build(vectors, ids)
+            return
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        needed = self._count + len(vectors)
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(max(needed, 2 * self._index.get_max_elements()))
+        self._index.add_items(vectors, np.asarray(ids, dtype=np.int64), replace_deleted=True)
+        self._count = needed
+
+    def remove(self, ids):
+        for i in np.asarray(ids, dtype=np.int64).ravel():
+            try:
+                self._index.mark_deleted(int(i))
+                self._count -= 1
+            except RuntimeError:
+                pass  # Id inexistente o ya borrado
+
+    def search(self, queries, k=5):
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        out_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        out_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        kk = min(k, self._count)
+        if not kk or not len(queries):
+            return out_scores, out_ids
+        labels, distances = self._index.knn_query(queries, k=kk)
+        out_ids[:, :kk] = labels
+        out_scores[:, :kk] = 1.0 - distances  # hnswlib 'ip' retorna 1 - producto punto
+        return out_scores, out_ids
+
+    @classmethod
+    def exists(cls, path) -> bool:
+        # hnswlib guarda el grafo y los parámetros junto a `path`, no en `path`
+        path = Path(path)
+        return path.with_suffix('.hnsw').exists() and path.with_suffix('.json').exists()
+
+    def save(self, path):
+        path = Path(path)
+        self._index.save_index(str(path.with_suffix('.hnsw')))
+        path.with_suffix('.json').write_text(json.dumps(
+            {'dim': self.dim, 'm': self.m, 'ef_construction': self.ef_construction,
+             'ef': self.ef, 'count': self._count}))
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        params = json.loads(path.with_suffix('.json').read_text())
+        index = cls(params['dim'], params['m'], params['ef_construction'], params['ef'])
+        index._index = index._hnswlib.Index(space='ip', dim=index.dim)
+        index._index.load_index(str(path.with_suffix('.hnsw')), allow_replace_deleted=True)
+        index._index.set_ef(index.ef)
+        index._count = params['count']
+        return index
+
+    def __len__(self):
+        return self._count
+
+
+INDEX_TYPES = {'flat': FlatIndex, 'ivf': IVFFlatIndex, 'hnsw': HNSWIndex}
+
+
+def create_index(kind: str, dim: int, **kwargs) -> VectorIndex:
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Tipo de índice no soportado: {kind}")
+    return INDEX_TYPES[kind](dim, **kwargs)
+
+
+def index_exists(path: Path, kind: str) -> bool:
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Tipo de índice no soportado: {kind}")
+    return INDEX_TYPES[kind].exists(path)
+
+
+def load_index(path: Path, kind: str) -> VectorIndex:
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Tipo de índice no soportado: {kind}")
+    return INDEX_TYPES[kind].load(path)
@@ -18,20 +18,11 @@ class AuthService:
         }
         
         try:
-            conn = self.db.get_connection()
-            if not conn:
-                self.logger.error("No hay conexión a la base de datos")
-                return result
-                
-            cursor = None
-            try:
-                cursor = conn.cursor()
-                cursor.execute("""
+            with self.db.unit_of_work('login', autocommit=True) as uow:
+                row = uow.fetchone("""
                     SELECT id, perfil FROM users 
                     WHERE username = %s AND password = crypt(%s, password)
                     """, (username, password))
-                
-                row = cursor.fetchone()
                 if row:
                     result = {
                         'authenticated': True,
@@ -39,15 +30,9 @@ class AuthService:
                         'profile': row[1]  # Obtener el campo perfil
                     }
                 
-            except DatabaseError as e:
-                self.logger.error(f"Error de base de datos: {str(e)}")
-                conn.rollback()
-            finally:
-                if cursor:
-                    cursor.close()
-                self.db.release_connection(conn)
-                
+        except (DatabaseError, ConnectionError) as e:
+            self.logger.error(f"Error de base de datos: {str(e)}")
         except Exception as e:
             self.logger.error(f"Error al validar credenciales: {str(e)}", exc_info=True)
         
-        return result
\ No newline at end of file
+        return result
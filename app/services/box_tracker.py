@@ -0,0 +1,152 @@
+# app/services/box_tracker.py
+import math
+
+import cv2
+import numpy as np
+
+
+class BoxPropagator:
+    """Propaga cajas entre detecciones con flujo óptico Lucas-Kanade
+
+    Tras cada detección se siembran puntos dentro de cada caja; en los
+    frames intermedios se siguen esos puntos y cada caja se desplaza (y
+    escala) según la mediana del movimiento de sus puntos. El flujo se
+    calcula sobre una versión reducida del frame para mantenerlo barato.
+    """
+
+    def __init__(self, points_per_box: int = 12, max_width: int = 480, min_points: int = 3):
+        self.points_per_box = points_per_box
+        self.max_width = max_width
+        self.min_points = min_points
+        self.boxes = np.empty((0, 4), dtype=np.float32)
+        self._gray = None
+        self._scale = 1.0
+        self._points = np.empty((0, 1, 2), dtype=np.float32)
+        self._owners = np.empty(0, dtype=np.int32)
+        self._lk_params = dict(
+            winSize=(15, 15), maxLevel=2,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03),
+        )
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        self._scale = min(1.0, self.max_width / w)
+        if self._scale < 1.0:
+            frame = cv2.resize(frame, (int(w * self._scale), int(h * self._scale)),
+                               interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    def reset(self, frame: np.ndarray, boxes: np.ndarray):
+        """Reinicia el seguimiento con las cajas de una detección nueva"""
+        self._gray = self._prepare(frame)
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4) * self._scale
+        self._seed()
+
+    def _seed(self):
+        points, owners = [], []
+        h, w = self._gray.shape
+        for i, (x1, y1, x2, y2) in enumerate(self.boxes):
+            x1, y1 = max(int(x1), 0), max(int(y1), 0)
+            x2, y2 = min(int(x2), w), min(int(y2), h)
+            if x2 - x1 < 4 or y2 - y1 < 4:
+                continue
+            found = cv2.goodFeaturesToTrack(
+                self._gray[y1:y2, x1:x2], maxCorners=self.points_per_box,
+                qualityLevel=0.01, minDistance=3)
+            if found is None or len(found) < self.min_points:
+                # Zona sin textura: rejilla fija dentro de la caja
+                gx, gy = np.meshgrid(np.linspace(0.25, 0.75, 3), np.linspace(0.25, 0.75, 3))
+                found = np.stack([gx.ravel() * (x2 - x1), gy.ravel() * (y2 - y1)], axis=1)
+                found = found.reshape(-1, 1, 2)
+            found = found.astype(np.float32) + np.array([x1, y1], dtype=np.float32)
+            points.append(found)
+            owners.append(np.full(len(found), i, dtype=np.int32))
+        if points:
+            self._points = np.concatenate(points)
+            self._owners = np.concatenate(owners)
+        else:
+            self._points = np.empty((0, 1, 2), dtype=np.float32)
+            self._owners = np.empty(0, dtype=np.int32)
+
+    def propagate(self, frame: np.ndarray) -> np.ndarray:
+        """Estima las cajas en el frame actual sin ejecutar el detector"""
+        gray = self._prepare(frame)
+        if self._gray is None or not len(self._points) or gray.shape != self._gray.shape:
+            self._gray = gray
+            return self.current_boxes(frame.shape)
+
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(
+            self._gray, gray, self._points, None, **self._lk_params)
+        ok = status.ravel() == 1
+        old = self._points[ok].reshape(-1, 2)
+        new = new_points[ok].reshape(-1, 2)
+        owners = self._owners[ok]
+
+        for i in range(len(self.boxes)):
+            mask = owners == i
+            if np.count_nonzero(mask) < 2:
+                continue
+            p0, p1 = old[mask], new[mask]
+            shift = np.median(p1 - p0, axis=0)
+            spread0 = np.median(np.linalg.norm(p0 - p0.mean(axis=0), axis=1))
+            spread1 = np.median(np.linalg.norm(p1 - p1.mean(axis=0), axis=1))
+            scale = float(np.clip(spread1 / spread0, 0.9, 1.1)) if spread0 > 1e-3 else 1.0
+            x1, y1, x2, y2 = self.boxes[i]
+            cx, cy = (x1 + x2) / 2 + shift[0], (y1 + y2) / 2 + shift[1]
+            hw, hh = (x2 - x1) * scale / 2, (y2 - y1) * scale / 2
+            self.boxes[i] = (cx - hw, cy - hh, cx + hw, cy + hh)
+
+        self._gray = gray
+        self._points = new[:, np.newaxis, :].astype(np.float32)
+        self._owners = owners
+        if len(self.boxes) and np.bincount(owners, minlength=len(self.boxes)).min() < self.min_points:
+            self._seed()
+        return self.current_boxes(frame.shape)
+
+    def current_boxes(self, shape: tuple) -> np.ndarray:
+        """Cajas en coordenadas del frame original, recortadas a sus bordes"""
+        if not len(self.boxes):
+            return np.empty((0, 4), dtype=np.int32)
+        boxes = self.boxes / self._scale
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+        return boxes.astype(np.int32)
+
+
+class DetectionScheduler:
+    """Decide cada cuántos frames ejecutar el detector según su latencia
+
+    El intervalo N se ajusta para que el costo del detector, repartido entre
+    N frames, quepa en el periodo de frame de la cámara.
+    """
+
+    def __init__(self, min_interval: int = 1, max_interval: int = 10,
+                 headroom: float = 1.2, smoothing: float = 0.2):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.latency = None
+        self.interval = min_interval
+        self._countdown = 0
+
+    def record_latency(self, seconds: float):
+        """Actualiza la media móvil exponencial de la latencia del detector"""
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += self.smoothing * (seconds - self.latency)
+
+    def due(self, frame_period: float) -> bool:
+        """Retorna True si en este frame corresponde ejecutar el detector"""
+        if self.latency is not None and frame_period > 0:
+            needed = math.ceil(self.latency * self.headroom / frame_period)
+            self.interval = max(self.min_interval, min(self.max_interval, needed))
+        if self._countdown <= 0:
+            self._countdown = self.interval - 1
+            return True
+        self._countdown -= 1
+        return False
+
+    def reset(self):
+        self._countdown = 0
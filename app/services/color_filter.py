@@ -0,0 +1,40 @@
+# app/services/color_filter.py
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+# Rangos HSV de OpenCV (H en 0-179) por color; varios rangos se combinan
+COLOR_RANGES: Dict[str, List[Tuple[Tuple[int, int, int], Tuple[int, int, int]]]] = {
+    'red': [((0, 90, 60), (9, 255, 255)), ((170, 90, 60), (179, 255, 255))],
+    'orange': [((10, 90, 80), (21, 255, 255))],
+    'yellow': [((22, 80, 80), (34, 255, 255))],
+    'green': [((35, 60, 40), (85, 255, 255))],
+    'blue': [((86, 80, 40), (130, 255, 255))],
+    'purple': [((131, 60, 40), (160, 255, 255))],
+    'pink': [((161, 50, 120), (169, 255, 255))],
+    'white': [((0, 0, 190), (179, 40, 255))],
+    'gray': [((0, 0, 60), (179, 40, 190))],
+    'black': [((0, 0, 0), (179, 255, 50))],
+}
+
+
+def color_fraction(frame: np.ndarray, box, color: str, sample: int = 32) -> float:
+    """Fracción de píxeles de la caja (reducida a sample×sample) dentro del color"""
+    x1, y1, x2, y2 = (int(v) for v in box)
+    roi = frame[max(y1, 0):y2, max(x1, 0):x2]
+    if roi.size == 0:
+        return 0.0
+    # Se descarta el 20% del borde: suele ser fondo
+    h, w = roi.shape[:2]
+    roi = roi[h // 5:h - h // 5 or h, w // 5:w - w // 5 or w]
+    small = cv2.resize(roi, (sample, sample), interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    mask = np.zeros((sample, sample), dtype=np.uint8)
+    for low, high in COLOR_RANGES[color]:
+        mask |= cv2.inRange(hsv, low, high)
+    return cv2.countNonZero(mask) / float(sample * sample)
+
+
+def matches_color(frame: np.ndarray, box, color: str, min_fraction: float = 0.25) -> bool:
+    return color_fraction(frame, box, color) >= min_fraction
@@ -0,0 +1,336 @@
+# app/services/embedding_store.py
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from app.services.ann_index import VectorIndex, create_index, index_exists, load_index
+
+logger = logging.getLogger("nova.vision")
+
+DEFAULT_EMBEDDINGS_DIR = Path("VISION_LLM/embeddings")
+
+
+class FaceEmbeddingStore:
+    """Galería de embeddings de rostros en disco, consultable con un solo matmul
+
+    - vectors.f32: matriz float32 (capacidad × dim) mapeada en memoria; crece
+      duplicando su capacidad, así que agregar no reescribe lo existente.
+    - ids.npy: por fila (id de imagen, id_rostro); su longitud define cuántas
+      filas son válidas y se reemplaza de forma atómica al final de cada cambio.
+      Las bajas compactan vectors.f32 con archivos *.compact (ver _compact).
+    - meta.json: dimensión, extractor usado, alias por id_rostro y la última
+      versión de galeria_cambios aplicada.
+    Los vectores se guardan normalizados: el coseno es un producto punto.
+    Las consultas usan una copia en RAM que se actualiza de forma incremental:
+    las altas se agregan al final y las bajas publican una copia compactada,
+    así una consulta en curso nunca ve filas a medio escribir.
+    Con `index` ('ivf', 'hnsw', ver ann_index.py) las búsquedas usan un
+    índice aproximado por id de imagen a partir de `min_index_size` filas;
+    se guarda como index_<tipo> (.npz, o .hnsw + .json) con flush_index() y se reconstruye al abrir
+    si no coincide con ids.npy.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_EMBEDDINGS_DIR, dim: Optional[int] = None,
+                 embedder: Optional[str] = None, index: Optional[str] = None,
+                 min_index_size: int = 20000, **index_params):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = self.directory / "vectors.f32"
+        self._ids_path = self.directory / "ids.npy"
+        self._meta_path = self.directory / "meta.json"
+        self._compact_vectors_path = self.directory / "vectors.compact.f32"
+        self._compact_ids_path = self.directory / "ids.compact.npy"
+        self._lock = threading.RLock()
+        self.version = 0  # Aumenta con cada cambio (lo usan las cachés de la galería)
+        meta = self._read_meta() or {}
+        self._recover()
+        self._ids = self._read_ids()
+        if meta and len(self._ids) and (dim not in (None, meta['dim']) or
+                                        embedder not in (None, meta.get('embedder'))):
+            logger.warning(f"La galería usa {meta.get('embedder')} ({meta['dim']} dims), no {embedder}; "
+                           "se descarta y debe reconstruirse")
+            self._ids = np.empty((0, 2), dtype=np.int64)
+            meta = {}
+        self.dim = dim or meta.get('dim', 512)
+        self.embedder = embedder or meta.get('embedder')
+        self.labels: Dict[int, str] = {int(k): v for k, v in meta.get('labels', {}).items()}
+        self.sync_version = int(meta.get('sync_version', 0))
+        capacity = max(len(self._ids), 64)
+        if self._vectors_path.exists():
+            capacity = max(capacity, self._vectors_path.stat().st_size // (4 * self.dim))
+        self._matrix = self._open(capacity)
+        # Única lectura completa del archivo: al abrir la galería
+        self._ram = np.array(self._matrix[:max(len(self._ids) * 2, 64)])
+        self._view = (self._ram[:len(self._ids)], self._ids)
+        self._lookup = self._sorted_ids(self._ids)
+        self.index_kind = index if index != 'flat' else None
+        self.min_index_size = min_index_size
+        self._index_params = index_params
+        self._index_path = self.directory / f"index_{self.index_kind or 'flat'}.npz"
+        self._index_signature = meta.get('index_signature')
+        self.index: Optional[VectorIndex] = None
+        if self.index_kind:
+            self._open_index()
+
+    # Persistencia
+    def _read_meta(self) -> Optional[dict]:
+        if not self._meta_path.exists():
+            return None
+        return json.loads(self._meta_path.read_text(encoding='utf-8'))
+
+    def _read_ids(self) -> np.ndarray:
+        if not self._ids_path.exists():
+            return np.empty((0, 2), dtype=np.int64)
+        return np.load(self._ids_path)
+
+    def _recover(self):
+        """Completa o descarta una compactación que se cortó a la mitad"""
+        if self._compact_vectors_path.exists():
+            # vectors.f32 aún no se reemplazó: sigue alineado con ids.npy
+            self._compact_vectors_path.unlink()
+            if self._compact_ids_path.exists():
+                self._compact_ids_path.unlink()
+        elif self._compact_ids_path.exists():
+            logger.info("Completando la compactación interrumpida de la galería")
+            os.replace(self._compact_ids_path, self._ids_path)
+
+    def _open(self, capacity: int) -> np.memmap:
+        size = capacity * self.dim * 4
+        with open(self._vectors_path, 'ab') as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(self._vectors_path, dtype=np.float32, mode='r+', shape=(capacity, self.dim))
+
+    def _grow(self, needed: int):
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        self._matrix.flush()
+        del self._matrix  # Libera el mapeo antes de extender el archivo
+        self._matrix = self._open(max(needed, capacity * 2))
+
+    def _commit(self, ids: np.ndarray, saved: bool = False):
+        """Publica las filas nuevas: primero los vectores, después el mapa de ids"""
+        self._view = (self._ram[:len(ids)], ids)
+        self._lookup = self._sorted_ids(ids)
+        self._ids = ids
+        self.version += 1
+        self._matrix.flush()
+        if not saved:
+            tmp = self._ids_path.with_suffix('.tmp.npy')
+            np.save(tmp, ids)
+            os.replace(tmp, self._ids_path)
+        self._write_meta()
+
+    def _compact(self, vectors: np.ndarray, ids: np.ndarray):
+        """Reescribe vectors.f32 e ids.npy con solo las filas que quedan
+
+        Ambos se escriben completos en archivos *.compact y se reemplazan en
+        orden: vectores y luego ids. Si el proceso se corta antes del primer
+        reemplazo, _recover() descarta los temporales; si se corta entre los
+        dos, ids.compact.npy ya corresponde a los vectores y se publica.
+        """
+        capacity = self._matrix.shape[0]
+        with open(self._compact_vectors_path, 'wb') as f:
+            vectors.tofile(f)
+            f.truncate(capacity * self.dim * 4)
+        np.save(self._compact_ids_path, ids)
+        self._matrix.flush()
+        del self._matrix  # Libera el mapeo antes de reemplazar el archivo
+        os.replace(self._compact_vectors_path, self._vectors_path)
+        self._matrix = self._open(capacity)
+        os.replace(self._compact_ids_path, self._ids_path)
+
+    def _write_meta(self):
+        meta = {'dim': self.dim, 'embedder': self.embedder, 'count': int(len(self._ids)),
+                'sync_version': self.sync_version, 'index_signature': self._index_signature,
+                'labels': {str(k): v for k, v in self.labels.items()}}
+        tmp = self._meta_path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, self._meta_path)
+
+    # Escritura
+    def add(self, id_rostro: int, image_ids: Iterable[int], vectors: np.ndarray,
+            label: Optional[str] = None):
+        """Agrega los embeddings (ya normalizados) de las imágenes de un rostro"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        image_ids = np.asarray(list(image_ids), dtype=np.int64)
+        if len(image_ids) != len(vectors):
+            raise ValueError("Cantidad de ids e embeddings distinta")
+        with self._lock:
+            count = len(self._ids)
+            self._grow(count + len(vectors))
+            self._matrix[count:count + len(vectors)] = vectors
+            if count + len(vectors) > len(self._ram):
+                ram = np.empty((max(count + len(vectors), len(self._ram) * 2), self.dim), dtype=np.float32)
+                ram[:count] = self._ram[:count]
+                self._ram = ram  # Las vistas publicadas siguen apuntando al arreglo anterior
+            self._ram[count:count + len(vectors)] = vectors
+            if self.index is not None:
+                self.index.add(vectors, image_ids)
+            rows = np.stack([image_ids, np.full(len(image_ids), id_rostro, dtype=np.int64)], axis=1)
+            if label is not None:
+                self.labels[int(id_rostro)] = label
+            self._commit(np.concatenate([self._ids, rows]))
+            self._maybe_build_index()
+
+    def _remove_rows(self, remove: np.ndarray):
+        with self._lock:
+            count = len(self._ids)
+            if not remove.any():
+                return
+            keep = ~remove
+            kept = int(keep.sum())
+            # Copia nueva en RAM (no se toca la que leen las consultas) y
+            # compactación del archivo: las filas válidas quedan al principio
+            ram = np.empty((max(kept * 2, 64), self.dim), dtype=np.float32)
+            ram[:kept] = self._ram[:count][keep]
+            self._ram = ram
+            ids = self._ids[keep]
+            self._compact(ram[:kept], ids)
+            if self.index is not None:
+                self.index.remove(self._ids[remove, 0])
+            self._commit(ids, saved=True)
+            self._maybe_build_index()
+
+    def remove_rostro(self, id_rostro: int):
+        with self._lock:
+            self._remove_rows(self._ids[:, 1] == id_rostro)
+            self.labels.pop(int(id_rostro), None)
+
+    def remove_images(self, image_ids: Iterable[int]):
+        with self._lock:
+            self._remove_rows(np.isin(self._ids[:, 0], np.asarray(list(image_ids), dtype=np.int64)))
+
+    def set_label(self, id_rostro: int, label: str):
+        with self._lock:
+            self.labels[int(id_rostro)] = label
+            self.version += 1
+            self._write_meta()
+
+    def set_sync_version(self, version: int):
+        """Registra hasta qué cambio de la BD está aplicada la galería"""
+        with self._lock:
+            self.sync_version = int(version)
+            self._write_meta()
+
+    # Índice aproximado
+    @staticmethod
+    def _sorted_ids(ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids de imagen ordenados, id_rostro en ese orden) para traducir resultados del índice"""
+        order = np.argsort(ids[:, 0], kind='stable')
+        return ids[order, 0], ids[order, 1]
+
+    def _signature(self) -> list:
+        return [int(len(self._ids)), int(self._ids[:, 0].sum()) if len(self._ids) else 0]
+
+    def _open_index(self):
+        """Carga el índice guardado si corresponde a ids.npy; si no, lo reconstruye"""
+        if len(self._ids) < self.min_index_size:
+            return
+        if index_exists(self._index_path, self.index_kind) and self._index_signature == self._signature():
+            try:
+                self.index = load_index(self._index_path, self.index_kind)
+                return
+            except Exception as e:
+                logger.warning(f"No se pudo cargar el índice {self._index_path}: {str(e)}")
+        self.rebuild_index()
+
+    def _maybe_build_index(self):
+        if self.index_kind and self.index is None and len(self._ids) >= self.min_index_size:
+            self.rebuild_index()
+
+    def rebuild_index(self):
+        """Entrena el índice con toda la galería y lo guarda en disco"""
+        with self._lock:
+            matrix, ids = self._view
+            index = create_index(self.index_kind, self.dim, **self._index_params)
+            index.build(matrix, ids[:, 0])
+            self.index = index
+            logger.info(f"Índice {self.index_kind} de rostros construido ({len(ids)} embeddings)")
+            self.flush_index()
+
+    def flush_index(self):
+        """Guarda el índice; se llama tras un lote de cambios, no en cada alta"""
+        with self._lock:
+            if self.index is None:
+                return
+            self.index.save(self._index_path)
+            self._index_signature = self._signature()
+            self._write_meta()
+
+    # Lectura
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def has_image(self, image_id: int) -> bool:
+        return bool(np.any(self._view[1][:, 0] == image_id))
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectores válidos (N, dim) y su mapa de ids, consistentes entre sí (sin bloquear)"""
+        return self._view
+
+    def search(self, queries: np.ndarray, k: int = 5) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Top-k por coseno para cada consulta: (scores, id_rostro, id_imagen), cada uno (M, k)"""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if self.index is not None:
+            return self._search_index(queries, k)
+        matrix, ids = self.snapshot()
+        k = min(k, len(ids))
+        if not k or not len(queries):
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.float32), empty.astype(np.int64), empty.astype(np.int64)
+        scores = queries @ matrix.T  # (M, N): todas las caras del frame contra toda la galería
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        return np.take_along_axis(top_scores, order, axis=1), ids[top, 1], ids[top, 0]
+
+    def _search_index(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        scores, image_ids = self.index.search(queries, k)
+        sorted_ids, rostros = self._lookup
+        pos = np.minimum(np.searchsorted(sorted_ids, image_ids), max(len(sorted_ids) - 1, 0))
+        found = (image_ids >= 0) & (sorted_ids[pos] == image_ids) if len(sorted_ids) else \
+            np.zeros(image_ids.shape, dtype=bool)
+        # Una imagen borrada mientras se consultaba el índice cuenta como vacía
+        id_rostro = np.where(found, rostros[pos] if len(rostros) else -1, -1)
+        scores = np.where(found, scores, -np.inf).astype(np.float32)
+        keep = min(k, len(sorted_ids))
+        return scores[:, :keep], id_rostro[:, :keep], np.where(found, image_ids, -1)[:, :keep]
+
+    def match(self, queries: np.ndarray, threshold: float = 0.5) -> Tuple[np.ndarray, np.ndarray]:
+        """Mejor identidad por consulta: (id_rostro o -1 bajo el umbral, score)"""
+        scores, rostros, _ = self.search(queries, k=1)
+        if not scores.shape[1]:
+            n = len(scores)
+            return np.full(n, -1, dtype=np.int64), np.zeros(n, dtype=np.float32)
+        best, ids = scores[:, 0], rostros[:, 0].copy()
+        ids[best < threshold] = -1
+        return ids, np.where(np.isfinite(best), best, 0.0).astype(np.float32)
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_embedding_store(dim: Optional[int] = None, embedder: Optional[str] = None) -> FaceEmbeddingStore:
+    """Galería compartida del proceso (registro de rostros y reconocimiento en vivo)
+
+    NOVA_FACE_INDEX ('ivf', 'hnsw') activa el índice aproximado para galerías grandes.
+    """
+    global _default_store
+    with _default_lock:
+        if _default_store is None or (dim is not None and (
+                _default_store.dim != dim or _default_store.embedder not in (None, embedder))):
+            _default_store = FaceEmbeddingStore(DEFAULT_EMBEDDINGS_DIR, dim, embedder,
+                                                index=os.getenv("NOVA_FACE_INDEX"))
+        return _default_store
@@ -0,0 +1,123 @@
+# app/services/emoji_overlay.py
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger("nova.vision")
+
+DEFAULT_EMOJI_DIR = Path("assets/emojis")
+
+
+class EmojiPyramid:
+    """Un emoji RGBA precalculado en varios tamaños, con color premultiplicado
+
+    Cada nivel guarda el color premultiplicado por alfa y 255 - alfa (ambos
+    uint16 de 3 canales), listos para mezclar sin volver a muestrear.
+    """
+
+    def __init__(self, image: np.ndarray, min_size: int = 16, max_size: int = 512, ratio: float = 1.1):
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGRA)
+        elif image.shape[2] == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+        # Se premultiplica a resolución completa y luego se reduce: evita halos en los bordes
+        alpha = image[:, :, 3:4].astype(np.uint16)
+        self._premult = image[:, :, :3].astype(np.uint16) * alpha
+        self._alpha = image[:, :, 3]
+        sizes = [min_size]
+        while sizes[-1] < max_size:
+            sizes.append(min(max_size, max(sizes[-1] + 1, int(round(sizes[-1] * ratio)))))
+        self.sizes = np.asarray(sizes)
+        self.levels: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        for size in sizes:
+            self.levels[size] = self._build(size)
+
+    def _build(self, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        premult = cv2.resize(self._premult, (size, size), interpolation=cv2.INTER_AREA)
+        alpha = cv2.resize(self._alpha, (size, size), interpolation=cv2.INTER_AREA)
+        inv_alpha = np.repeat((255 - alpha.astype(np.uint16))[:, :, np.newaxis], 3, axis=2)
+        # El redondeo del remuestreo no debe superar el máximo c·a permitido
+        np.minimum(premult, (255 - inv_alpha) * 255, out=premult)
+        return premult, inv_alpha
+
+    def level_for(self, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Nivel más pequeño que cubre `size`; los mayores al máximo se crean una vez"""
+        idx = int(np.searchsorted(self.sizes, size))
+        if idx < len(self.sizes):
+            return self.levels[int(self.sizes[idx])]
+        if size not in self.levels:
+            self.levels[size] = self._build(size)
+        return self.levels[size]
+
+
+class EmojiOverlay:
+    """Superpone emojis con mezcla alfa vectorizada sobre rostros del frame
+
+    Carga todos los PNG de un directorio una sola vez (con canal alfa) y
+    mezcla in-place con aritmética uint16: dst = (c·a + dst·(255 - a)) / 255.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_EMOJI_DIR, default: str = 'default',
+                 min_size: int = 16, max_size: int = 512, ratio: float = 1.1):
+        self.pyramids: Dict[str, EmojiPyramid] = {}
+        directory = Path(directory)
+        paths = [directory] if directory.is_file() else sorted(directory.glob('*.png'))
+        for path in paths:
+            image = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+            if image is None:
+                logger.warning(f"No se pudo cargar emoji {path}")
+                continue
+            self.pyramids[path.stem] = EmojiPyramid(image, min_size, max_size, ratio)
+        self.active = default if default in self.pyramids else next(iter(self.pyramids), None)
+        self._scratch = np.empty((0, 0, 3), dtype=np.uint16)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.pyramids)
+
+    @property
+    def available(self) -> bool:
+        return self.active is not None
+
+    def set_active(self, name: str):
+        if name not in self.pyramids:
+            raise ValueError(f"Emoji no disponible: {name}")
+        self.active = name
+
+    def _buffer(self, size: int) -> np.ndarray:
+        if self._scratch.shape[0] < size:
+            self._scratch = np.empty((size, size, 3), dtype=np.uint16)
+        return self._scratch
+
+    def apply(self, frame: np.ndarray, boxes: np.ndarray,
+              assets: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Cubre cada caja con un emoji (el activo, o uno por caja en `assets`)"""
+        for i, (x1, y1, x2, y2) in enumerate(boxes):
+            name = assets[i] if assets is not None else self.active
+            pyramid = self.pyramids.get(name)
+            if pyramid is None:
+                continue
+            self._blend(frame, pyramid, int(x1), int(y1), int(x2), int(y2))
+        return frame
+
+    def _blend(self, frame: np.ndarray, pyramid: EmojiPyramid, x1: int, y1: int, x2: int, y2: int):
+        premult, inv_alpha = pyramid.level_for(max(x2 - x1, y2 - y1))
+        size = premult.shape[0]
+        # Centra el emoji sobre el rostro y recorta a los bordes del frame
+        ex1, ey1 = (x1 + x2 - size) // 2, (y1 + y2 - size) // 2
+        fx1, fy1 = max(ex1, 0), max(ey1, 0)
+        fx2, fy2 = min(ex1 + size, frame.shape[1]), min(ey1 + size, frame.shape[0])
+        if fx2 <= fx1 or fy2 <= fy1:
+            return
+        h, w = fy2 - fy1, fx2 - fx1
+        src = (slice(fy1 - ey1, fy2 - ey1), slice(fx1 - ex1, fx2 - ex1))
+        roi = frame[fy1:fy2, fx1:fx2]
+        acc = self._buffer(size)[:h, :w]
+        # acc = dst·(255 - a) + c·a en uint16 (máximo 255·255, sin desborde)
+        cv2.multiply(roi, inv_alpha[src], dst=acc, dtype=cv2.CV_16U)
+        cv2.add(acc, premult[src], dst=acc)
+        # División entre 255 con redondeo, escrita directamente sobre el frame
+        cv2.convertScaleAbs(acc, dst=roi, alpha=1 / 255.0)
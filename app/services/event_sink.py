@@ -0,0 +1,273 @@
+# app/services/event_sink.py
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("nova.vision")
+
+DEFAULT_EVENTS_DIR = Path("VISION_LLM/events")
+
+# Orden de las columnas en cada fila de evento
+COLUMNS = ('ts', 'stream', 'tipo', 'etiqueta', 'track_id', 'confianza', 'x1', 'y1', 'x2', 'y2', 'usuario')
+
+EventRow = Tuple[float, str, str, str, Optional[int], float, int, int, int, int, Optional[str]]
+
+
+def _iou(a: Sequence[int], b: Sequence[int]) -> float:
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class EventThrottle:
+    """Acota cuántas filas genera un objeto a lo largo del tiempo
+
+    Se escribe una fila cuando una caja aparece, cambia de etiqueta, se
+    mueve (IoU con las cajas escritas menor a iou_threshold) o pasaron
+    `heartbeat` segundos: un objeto quieto produce a lo sumo una fila cada
+    heartbeat, sin importar los FPS. Con track se compara contra la última
+    caja del track; sin track, contra todas las cajas escritas de esa
+    etiqueta en el último heartbeat (varios rostros quietos no se alternan).
+    """
+
+    def __init__(self, heartbeat: float = 5.0, iou_threshold: float = 0.5, forget_after: float = 60.0):
+        self.heartbeat = heartbeat
+        self.iou_threshold = iou_threshold
+        self.forget_after = forget_after
+        self._last: Dict[tuple, Tuple[float, str, tuple]] = {}
+        self._untracked: Dict[tuple, List[Tuple[float, tuple]]] = {}
+        self._pruned_at = 0.0
+
+    def accept(self, ts: float, stream: str, tipo: str, label: str, track_id: int, box: tuple) -> bool:
+        if track_id >= 0:
+            key = (stream, tipo, track_id)
+            last = self._last.get(key)
+            if last is not None and ts - last[0] < self.heartbeat and last[1] == label and \
+                    _iou(last[2], box) >= self.iou_threshold:
+                return False
+            self._last[key] = (ts, label, box)
+        else:
+            # Las cajas escritas hace más de un heartbeat ya no suprimen nada
+            written = [(t, b) for t, b in self._untracked.get((stream, tipo, label), ())
+                       if ts - t < self.heartbeat]
+            if any(_iou(b, box) >= self.iou_threshold for _, b in written):
+                self._untracked[(stream, tipo, label)] = written
+                return False
+            written.append((ts, box))
+            self._untracked[(stream, tipo, label)] = written
+        if ts - self._pruned_at > self.forget_after:
+            self._last = {k: v for k, v in self._last.items() if ts - v[0] < self.forget_after}
+            self._untracked = {k: v for k, v in self._untracked.items() if v and ts - v[-1][0] < self.heartbeat}
+            self._pruned_at = ts
+        return True
+
+
+class PostgresEventBackend:
+    """Escribe lotes con COPY en la tabla particionada eventos_deteccion (migrations/003)"""
+
+    name = 'postgres'
+
+    def __init__(self, db, table: str = 'eventos_deteccion'):
+        self.db = db
+        self.table = table
+        self._months = set()
+
+    def write(self, rows: List[EventRow]):
+        months = {time.strftime('%Y-%m-01', time.gmtime(row[0])) for row in rows} - self._months
+        with self.db.unit_of_work('detection_events') as uow:
+            # La partición del mes se crea antes de la primera fila que la necesita
+            for month in sorted(months):
+                uow.execute("SELECT crear_particion_eventos(%s)", (month,))
+            uow.copy_rows(self.table, COLUMNS, (
+                (datetime.fromtimestamp(row[0], timezone.utc).isoformat(),) + tuple(row[1:]) for row in rows))
+        self._months |= months
+
+
+class SQLiteEventBackend:
+    """Archivo SQLite local: respaldo sin BD o destino principal sin conexión"""
+
+    name = 'sqlite'
+
+    def __init__(self, path: Path = DEFAULT_EVENTS_DIR / "detections.db"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS eventos_deteccion (ts REAL NOT NULL, stream TEXT, tipo TEXT, "
+            "etiqueta TEXT, track_id INTEGER, confianza REAL, x1 INTEGER, y1 INTEGER, x2 INTEGER, "
+            "y2 INTEGER, usuario TEXT)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_eventos_ts ON eventos_deteccion (ts)")
+        self._conn.commit()
+
+    def write(self, rows: List[EventRow]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO eventos_deteccion ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                rows)
+
+    def pending(self, limit: int) -> Tuple[List[int], List[EventRow]]:
+        """Filas más antiguas (rowid, fila) para reenviarlas al destino principal"""
+        with self._lock:
+            result = self._conn.execute(
+                f"SELECT rowid, {', '.join(COLUMNS)} FROM eventos_deteccion ORDER BY rowid LIMIT ?",
+                (limit,)).fetchall()
+        return [r[0] for r in result], [tuple(r[1:]) for r in result]
+
+    def delete(self, rowids: List[int]):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM eventos_deteccion WHERE rowid = ?", [(r,) for r in rowids])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DetectionEventSink:
+    """Persiste detecciones sin que el bucle de frames espere nunca
+
+    record() solo agrega a una cola acotada las arrays del frame (si se
+    llena se descarta lo más antiguo y se cuenta). Un hilo arma las filas,
+    aplica EventThrottle y escribe lotes de hasta batch_size filas cada
+    flush_interval segundos. Si el destino principal falla, el lote va al
+    respaldo y se reenvía cuando el principal vuelve a responder.
+    """
+
+    def __init__(self, backend, fallback: Optional[SQLiteEventBackend] = None, batch_size: int = 1000,
+                 flush_interval: float = 2.0, max_pending: int = 2000,
+                 throttle: Optional[EventThrottle] = None):
+        self.backend = backend
+        self.fallback = fallback
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.throttle = throttle or EventThrottle()
+        self._queue: deque = deque(maxlen=max_pending)  # Un elemento por frame, no por caja
+        self._rows: List[EventRow] = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self.stats = {'frames': 0, 'dropped_frames': 0, 'boxes': 0, 'throttled': 0, 'written': 0,
+                      'fallback_written': 0, 'replayed': 0, 'batches': 0, 'errors': 0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="DetectionEventSinkThread")
+        self._thread.start()
+
+    def stop(self):
+        """Detiene el hilo escribiendo lo pendiente"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        self.flush()
+
+    def record(self, stream: str, tipo: str, labels: Sequence[str], boxes: np.ndarray, confs: np.ndarray,
+               track_ids: Optional[np.ndarray] = None, user: Optional[str] = None,
+               timestamp: Optional[float] = None):
+        """Encola las detecciones de un frame (O(1), sin bloquear)"""
+        if not len(labels):
+            return
+        if len(self._queue) == self._queue.maxlen:
+            self.stats['dropped_frames'] += 1
+        self._queue.append((timestamp or time.time(), stream, tipo, list(labels),
+                            np.array(boxes, dtype=np.int32), np.array(confs, dtype=np.float32),
+                            None if track_ids is None else np.array(track_ids, dtype=np.int64), user))
+        self.stats['frames'] += 1
+
+    def _expand(self):
+        """Convierte los frames encolados en filas, descartando las repetidas"""
+        while self._queue:
+            ts, stream, tipo, labels, boxes, confs, track_ids, user = self._queue.popleft()
+            for i, label in enumerate(labels):
+                track_id = int(track_ids[i]) if track_ids is not None else -1
+                box = tuple(int(v) for v in boxes[i])
+                self.stats['boxes'] += 1
+                if not self.throttle.accept(ts, stream, tipo, label, track_id, box):
+                    self.stats['throttled'] += 1
+                    continue
+                self._rows.append((ts, stream, tipo, label, track_id if track_id >= 0 else None,
+                                   round(float(confs[i]), 4)) + box + (user,))
+
+    def flush(self) -> int:
+        """Escribe todo lo pendiente; retorna cuántas filas se guardaron"""
+        with self._flush_lock:
+            self._expand()
+            written = 0
+            while self._rows:
+                batch, self._rows = self._rows[:self.batch_size], self._rows[self.batch_size:]
+                written += self._write(batch)
+            return written
+
+    def _write(self, batch: List[EventRow]) -> int:
+        try:
+            self.backend.write(batch)
+        except Exception as e:
+            self.stats['errors'] += 1
+            if self.fallback is None:
+                logger.error(f"Se perdieron {len(batch)} eventos de detección: {str(e)}")
+                return 0
+            logger.warning(f"Eventos de detección al respaldo local ({self.backend.name}): {str(e)}")
+            self.fallback.write(batch)
+            self.stats['fallback_written'] += len(batch)
+            return len(batch)
+        self.stats['written'] += len(batch)
+        self.stats['batches'] += 1
+        # El lote ya está en el destino principal: un fallo al reenviar no lo duplica en el respaldo
+        try:
+            self._replay()
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.warning(f"No se pudieron reenviar eventos del respaldo local: {str(e)}")
+        return len(batch)
+
+    def _replay(self):
+        """Reenvía al destino principal un lote de lo guardado en el respaldo"""
+        if self.fallback is None:
+            return
+        rowids, rows = self.fallback.pending(self.batch_size)
+        if rows:
+            self.backend.write(rows)
+            self.fallback.delete(rowids)
+            self.stats['replayed'] += len(rows)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Error escribiendo eventos de detección: {str(e)}", exc_info=True)
+
+
+def create_event_sink(db=None, **kwargs) -> Optional[DetectionEventSink]:
+    """PostgreSQL con respaldo SQLite si hay BD; solo SQLite si no. NOVA_EVENTS=off lo desactiva"""
+    mode = os.getenv("NOVA_EVENTS", "on").lower()
+    if mode in ('off', '0', 'false'):
+        return None
+    local = SQLiteEventBackend()
+    if db is not None and getattr(db, 'connection_pool', None) and mode != 'sqlite':
+        return DetectionEventSink(PostgresEventBackend(db), fallback=local, **kwargs)
+    return DetectionEventSink(local, **kwargs)
@@ -0,0 +1,139 @@
+# app/services/face_embeddings.py
+import logging
+import os
+import threading
+from typing import List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger("nova.vision")
+
+SFACE_MODEL_PATH = 'assets/models/face_recognition_sface_2021dec.onnx'
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """Normaliza filas a norma 1 (el coseno se reduce a un producto punto)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def crop_faces(frame: np.ndarray, boxes: np.ndarray, margin: float = 0.15) -> List[np.ndarray]:
+    """Recorta cada caja con un margen relativo, limitado a los bordes del frame"""
+    h, w = frame.shape[:2]
+    crops = []
+    for x1, y1, x2, y2 in np.asarray(boxes, dtype=np.int32):
+        mx, my = int((x2 - x1) * margin), int((y2 - y1) * margin)
+        crop = frame[max(y1 - my, 0):min(y2 + my, h), max(x1 - mx, 0):min(x2 + mx, w)]
+        crops.append(crop)
+    return crops
+
+
+def largest_face(image: np.ndarray, face_model=None, margin: float = 0.15) -> np.ndarray:
+    """Recorte del rostro más grande de una foto; la imagen completa si no se detecta"""
+    if face_model is None:
+        return image
+    try:
+        results = face_model.predict(source=image, save=False, verbose=False)
+        boxes = results[0].boxes.xyxy.cpu().numpy()
+    except Exception as e:
+        logger.warning(f"No se pudo detectar rostro para el embedding: {str(e)}")
+        return image
+    if not len(boxes):
+        return image
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return crop_faces(image, boxes[[int(np.argmax(areas))]], margin)[0]
+
+
+class FaceEmbedder:
+    """Interfaz: recortes BGR de rostros → matriz (N, dim) float32 normalizada"""
+
+    name = 'base'
+    dim = 0
+
+    def embed(self, faces: Sequence[np.ndarray]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class FacenetEmbedder(FaceEmbedder):
+    """InceptionResnetV1 de facenet-pytorch (dependencia opcional), 512 dimensiones"""
+
+    name = 'facenet'
+    dim = 512
+
+    def __init__(self, device: Optional[str] = None, pretrained: str = 'vggface2', size: int = 160):
+        try:
+            import torch
+            from facenet_pytorch import InceptionResnetV1
+        except ImportError as e:
+            raise RuntimeError("facenet-pytorch no está instalado (pip install facenet-pytorch)") from e
+        self._torch = torch
+        self.device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
+        self.size = size
+        self.model = InceptionResnetV1(pretrained=pretrained).eval().to(self.device)
+
+    def embed(self, faces: Sequence[np.ndarray]) -> np.ndarray:
+        if not len(faces):
+            return np.empty((0, self.dim), dtype=np.float32)
+        batch = np.empty((len(faces), self.size, self.size, 3), dtype=np.float32)
+        for i, face in enumerate(faces):
+            rgb = cv2.cvtColor(cv2.resize(face, (self.size, self.size), interpolation=cv2.INTER_AREA),
+                               cv2.COLOR_BGR2RGB)
+            batch[i] = rgb
+        batch -= 127.5
+        batch /= 128.0
+        torch = self._torch
+        with torch.inference_mode():
+            tensor = torch.from_numpy(batch).permute(0, 3, 1, 2).to(self.device)
+            vectors = self.model(tensor).cpu().numpy()
+        return l2_normalize(vectors)
+
+
+class SFaceEmbedder(FaceEmbedder):
+    """SFace de OpenCV (cv2.FaceRecognizerSF con un modelo ONNX), 128 dimensiones"""
+
+    name = 'sface'
+    dim = 128
+
+    def __init__(self, model_path: str = SFACE_MODEL_PATH):
+        if not os.path.exists(model_path):
+            raise RuntimeError(f"Modelo SFace no encontrado: {model_path}")
+        self.model = cv2.FaceRecognizerSF.create(model_path, "")
+        self.size = 112
+
+    def embed(self, faces: Sequence[np.ndarray]) -> np.ndarray:
+        vectors = np.empty((len(faces), self.dim), dtype=np.float32)
+        for i, face in enumerate(faces):
+            aligned = cv2.resize(face, (self.size, self.size), interpolation=cv2.INTER_AREA)
+            vectors[i] = self.model.feature(aligned).reshape(-1)
+        return l2_normalize(vectors)
+
+
+def create_embedder(name: Optional[str] = None, device: Optional[str] = None) -> FaceEmbedder:
+    """Crea el extractor por nombre o NOVA_FACE_EMBEDDER; sin nombre prueba facenet y luego SFace"""
+    name = name or os.getenv("NOVA_FACE_EMBEDDER")
+    if name == 'facenet':
+        return FacenetEmbedder(device)
+    if name == 'sface':
+        return SFaceEmbedder()
+    if name is not None:
+        raise ValueError(f"Extractor de embeddings no soportado: {name}")
+    try:
+        return FacenetEmbedder(device)
+    except RuntimeError as e:
+        logger.info(f"{str(e)}; se intenta SFace de OpenCV")
+    return SFaceEmbedder()
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder() -> FaceEmbedder:
+    """Extractor compartido del proceso, creado en el primer uso"""
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            _embedder = create_embedder()
+        return _embedder
@@ -0,0 +1,279 @@
+# app/services/face_importer.py
+"""Importación masiva de rostros desde un árbol de carpetas alias/*.jpg
+
+Uso:
+    python -m app.services.face_importer fotos/ --workers 8
+"""
+import argparse
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.services.embedding_store import get_embedding_store
+from app.services.face_embeddings import crop_faces, get_embedder
+from app.services.model_registry import model_registry, FACE_MODEL_PATH
+from app.utils.query_cache import query_cache
+
+logger = logging.getLogger("nova.img_rostro")
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+
+def scan_folder(root: Path) -> List[Tuple[str, Path]]:
+    """(alias, ruta) de cada imagen en root/<alias>/; el nombre de la carpeta es el alias"""
+    root = Path(root)
+    items = []
+    for folder in sorted(p for p in root.iterdir() if p.is_dir()):
+        for path in sorted(folder.rglob('*')):
+            if path.suffix.lower() in IMAGE_EXTENSIONS:
+                items.append((folder.name, path))
+    return items
+
+
+def dhash(image: np.ndarray) -> int:
+    """Hash perceptual de diferencias de 64 bits (resiste recompresión y escalado)"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def hamming(hash_value: int, others: np.ndarray) -> np.ndarray:
+    """Distancia de Hamming entre un hash y un arreglo uint64 de hashes"""
+    xor = np.bitwise_xor(others, np.uint64(hash_value))
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def decode_image(path: str, max_side: int = 1024, min_side: int = 64) -> dict:
+    """Lee, valida y reduce una imagen (se ejecuta en un proceso del pool)"""
+    image = cv2.imread(path)
+    if image is None:
+        return {'path': path, 'error': 'no se pudo decodificar'}
+    h, w = image.shape[:2]
+    if min(h, w) < min_side:
+        return {'path': path, 'error': f'imagen muy pequeña ({w}x{h})'}
+    scale = max_side / max(h, w)
+    if scale < 1:
+        image = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    return {'path': path, 'image': image, 'hash': dhash(image)}
+
+
+class FaceImporter:
+    """Registra en bloque los rostros de un árbol alias/*.jpg
+
+    - Decodificación y validación en un pool de procesos, por lotes.
+    - Detección de rostros por lotes con el modelo de rostros compartido y
+      recorte del más grande (si no hay detector se usa la imagen completa).
+    - Descarte de fotos casi idénticas del mismo alias por hash perceptual.
+    - Un único INSERT ... VALUES por tabla (execute_values) en una transacción;
+      los embeddings se calculan con los recortes ya en memoria.
+    Los alias que ya existen en buscar_rostro reciben las imágenes nuevas.
+    """
+
+    def __init__(self, db, known_faces_dir: Path = Path("VISION_LLM/known_faces"),
+                 workers: Optional[int] = None, batch_size: int = 64, max_side: int = 1024,
+                 min_face: int = 40, dedupe_distance: int = 4, detect: bool = True,
+                 embed: bool = True):
+        self.db = db
+        self.known_faces_dir = Path(known_faces_dir)
+        self.workers = workers or os.cpu_count() or 2
+        self.batch_size = batch_size
+        self.max_side = max_side
+        self.min_face = min_face  # lado mínimo del rostro detectado, en píxeles
+        self.dedupe_distance = dedupe_distance  # bits distintos para considerar duplicado
+        self.detect = detect
+        self.embed = embed
+
+    def _face_model(self):
+        if not self.detect:
+            return None
+        try:
+            return model_registry.get(FACE_MODEL_PATH, warmup=False)
+        except Exception as e:
+            logger.warning(f"Sin detector de rostros, se importan las fotos completas: {str(e)}")
+            return None
+
+    def _crop(self, face_model, images: List[np.ndarray]) -> List[Optional[np.ndarray]]:
+        """Rostro más grande de cada imagen (None si no hay uno válido)"""
+        if face_model is None or not images:
+            return list(images)
+        results = face_model.predict(source=images, save=False, verbose=False)
+        crops = []
+        for image, result in zip(images, results):
+            boxes = result.boxes.xyxy.cpu().numpy()
+            if not len(boxes):
+                crops.append(None)
+                continue
+            sizes = np.minimum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])
+            best = int(np.argmax(sizes))
+            crops.append(crop_faces(image, boxes[[best]])[0] if sizes[best] >= self.min_face else None)
+        return crops
+
+    def _decoded(self, items: List[Tuple[str, Path]], stats: dict) -> Iterator[List[Tuple[str, dict]]]:
+        """Lotes de (alias, imagen decodificada); el pool adelanta a lo sumo `prefetch` lotes"""
+        chunks = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+        prefetch = 2
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for index in range(len(chunks)):
+                while len(pending) < prefetch and index + len(pending) < len(chunks):
+                    chunk = chunks[index + len(pending)]
+                    pending.append((chunk, pool.map(decode_image, [str(path) for _, path in chunk],
+                                                    [self.max_side] * len(chunk),
+                                                    chunksize=max(1, len(chunk) // self.workers))))
+                chunk, decoded = pending.popleft()
+                batch = []
+                for (alias, _), result in zip(chunk, decoded):
+                    if 'error' in result:
+                        stats['invalid'] += 1
+                        logger.warning(f"Imagen descartada {result['path']}: {result['error']}")
+                        continue
+                    batch.append((alias, result))
+                yield batch
+
+    def run(self, root: Path) -> dict:
+        """Importa root/<alias>/*; retorna estadísticas con imágenes por segundo"""
+        start = time.perf_counter()
+        items = scan_folder(root)
+        stats = {'found': len(items), 'invalid': 0, 'duplicates': 0, 'no_face': 0,
+                 'inserted': 0, 'new_rostros': 0, 'embedded': 0,
+                 'decode_s': 0.0, 'detect_s': 0.0, 'embed_s': 0.0, 'db_s': 0.0}
+        if not items:
+            return self._finish(stats, start)
+        face_model = self._face_model()
+        embedder = get_embedder() if self.embed else None
+        self.known_faces_dir.mkdir(parents=True, exist_ok=True)
+
+        hashes: Dict[str, np.ndarray] = {}
+        rows: List[Tuple[str, str]] = []  # (alias, ruta guardada)
+        vectors: List[np.ndarray] = []
+        written: List[Path] = []
+        mark = time.perf_counter()
+        try:
+            for batch in self._decoded(items, stats):
+                stats['decode_s'] += time.perf_counter() - mark
+                keep = []
+                for alias, result in batch:
+                    seen = hashes.get(alias, np.empty(0, dtype=np.uint64))
+                    if len(seen) and hamming(result['hash'], seen).min() <= self.dedupe_distance:
+                        stats['duplicates'] += 1
+                        continue
+                    hashes[alias] = np.append(seen, np.uint64(result['hash']))
+                    keep.append((alias, result))
+                mark = time.perf_counter()
+                crops = self._crop(face_model, [result['image'] for _, result in keep])
+                stats['detect_s'] += time.perf_counter() - mark
+                faces = []
+                for (alias, result), crop in zip(keep, crops):
+                    if crop is None or not crop.size:
+                        stats['no_face'] += 1
+                        continue
+                    dest = self.known_faces_dir / f"{alias}_{result['hash']:016x}.jpg"
+                    if dest.exists():  # Ya importada en una corrida anterior
+                        stats['duplicates'] += 1
+                        continue
+                    cv2.imwrite(str(dest), crop)
+                    written.append(dest)
+                    rows.append((alias, str(dest)))
+                    faces.append(crop)
+                if embedder is not None and faces:
+                    mark = time.perf_counter()
+                    vectors.append(embedder.embed(faces))
+                    stats['embed_s'] += time.perf_counter() - mark
+                mark = time.perf_counter()
+
+            mark = time.perf_counter()
+            ids = self._insert(rows, stats)
+            stats['db_s'] = time.perf_counter() - mark
+        except Exception:
+            for path in written:  # Sin registro en BD no deben quedar archivos huérfanos
+                path.unlink(missing_ok=True)
+            raise
+
+        if embedder is not None and ids:
+            mark = time.perf_counter()
+            self._index(embedder, rows, ids, np.concatenate(vectors), stats)
+            stats['embed_s'] += time.perf_counter() - mark
+        return self._finish(stats, start)
+
+    def _insert(self, rows: List[Tuple[str, str]], stats: dict) -> List[Tuple[int, int]]:
+        """Inserta rostros nuevos e imágenes en una transacción; retorna [(id imagen, id_rostro)]"""
+        if not rows:
+            return []
+        aliases = sorted({alias for alias, _ in rows})
+        with self.db.unit_of_work('import_faces') as uow:
+            rostros = dict(uow.fetchall("SELECT alias, id_rostro FROM buscar_rostro WHERE alias = ANY(%s)",
+                                        (aliases,)))
+            nuevos = [(alias, alias) for alias in aliases if alias not in rostros]
+            if nuevos:
+                rostros.update(uow.execute_values(
+                    "INSERT INTO buscar_rostro (nombre, alias) VALUES %s RETURNING alias, id_rostro",
+                    nuevos, fetch=True))
+                stats['new_rostros'] = len(nuevos)
+            # Un solo INSERT con todas las filas; RETURNING respeta el orden de VALUES
+            ids = uow.execute_values("INSERT INTO imagen (id_rostro, imagen) VALUES %s RETURNING id",
+                                     [(rostros[alias], path) for alias, path in rows], fetch=True)
+        query_cache.invalidate('buscar_rostro', 'imagen')
+        stats['inserted'] = len(ids)
+        return [(row[0], rostros[alias]) for row, (alias, _) in zip(ids, rows)]
+
+    def _index(self, embedder, rows, ids, vectors: np.ndarray, stats: dict):
+        """Agrega a la galería los embeddings ya calculados, un bloque por rostro"""
+        try:
+            store = get_embedding_store(embedder.dim, embedder.name)
+            by_rostro: Dict[int, List[int]] = {}
+            for i, (_, id_rostro) in enumerate(ids):
+                by_rostro.setdefault(id_rostro, []).append(i)
+            for id_rostro, positions in by_rostro.items():
+                store.add(id_rostro, [ids[i][0] for i in positions], vectors[positions],
+                          label=rows[positions[0]][0])
+            store.flush_index()
+            stats['embedded'] = len(ids)
+        except Exception as e:
+            # Las filas ya están en BD; ImgRostroService.rebuild_embeddings() completa lo pendiente
+            logger.warning(f"Embeddings pendientes tras la importación: {str(e)}")
+
+    @staticmethod
+    def _finish(stats: dict, start: float) -> dict:
+        elapsed = time.perf_counter() - start
+        stats['seconds'] = round(elapsed, 3)
+        stats['images_per_sec'] = round(stats['found'] / elapsed, 2) if elapsed > 0 else 0.0
+        for key in ('decode_s', 'detect_s', 'embed_s', 'db_s'):
+            stats[key] = round(stats[key], 3)
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa rostros desde carpetas alias/*.jpg")
+    parser.add_argument('root', type=Path)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--dedupe-distance', type=int, default=4)
+    parser.add_argument('--no-detect', action='store_true', help="importa las fotos completas")
+    parser.add_argument('--no-embed', action='store_true', help="no calcula embeddings")
+    args = parser.parse_args()
+
+    from app.utils.database import Database
+    from app.utils.logger import setup_logging
+    setup_logging()
+    importer = FaceImporter(Database(), workers=args.workers, batch_size=args.batch_size,
+                            dedupe_distance=args.dedupe_distance, detect=not args.no_detect,
+                            embed=not args.no_embed)
+    stats = importer.run(args.root)
+    print(f"{stats['found']} imágenes en {stats['seconds']:.1f} s ({stats['images_per_sec']:.1f} img/s): "
+          f"{stats['inserted']} importadas, {stats['duplicates']} duplicadas, "
+          f"{stats['invalid']} inválidas, {stats['no_face']} sin rostro, "
+          f"{stats['new_rostros']} rostros nuevos")
+    print(f"decodificación {stats['decode_s']:.2f} s, detección {stats['detect_s']:.2f} s, "
+          f"embeddings {stats['embed_s']:.2f} s, BD {stats['db_s']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# app/services/face_recognition.py
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from app.services.embedding_store import FaceEmbeddingStore, get_embedding_store
+from app.services.face_embeddings import FaceEmbedder, crop_faces, get_embedder
+
+logger = logging.getLogger("nova.vision")
+
+
+class FaceRecognizer:
+    """Identifica rostros contra la galería, con un embedding por track
+
+    Solo se calculan embeddings (en un lote por frame) para los tracks que
+    no están en caché o cuya identificación expiró o quedó desactualizada
+    porque la galería cambió. Los tracks sin id (-1) no se identifican.
+    """
+
+    def __init__(self, store: Optional[FaceEmbeddingStore] = None,
+                 embedder: Optional[FaceEmbedder] = None, threshold: float = 0.5,
+                 refresh_after: float = 5.0, max_cache: int = 256):
+        self._store = store
+        self._embedder = embedder
+        self.threshold = threshold
+        self.refresh_after = refresh_after  # segundos antes de reidentificar un track
+        self.max_cache = max_cache
+        # track_id → {'id_rostro', 'alias', 'score', 'embedding', 'version', 'time'}
+        self._cache: "OrderedDict[int, dict]" = OrderedDict()
+        self._listeners: List[Callable[[dict], None]] = []
+        self._loading = None
+        self._retry_at = 0.0
+        self.stats = {'embedded': 0, 'cache_hits': 0, 'matches': 0}
+
+    @property
+    def embedder(self) -> FaceEmbedder:
+        if self._embedder is None:
+            self._embedder = get_embedder()
+        return self._embedder
+
+    @property
+    def store(self) -> FaceEmbeddingStore:
+        if self._store is None:
+            embedder = self.embedder
+            self._store = get_embedding_store(embedder.dim, embedder.name)
+        return self._store
+
+    @property
+    def ready(self) -> bool:
+        return self._embedder is not None and self._store is not None
+
+    def preload(self):
+        """Carga el extractor y la galería en segundo plano"""
+        if self.ready or (self._loading and self._loading.is_alive()) or time.time() < self._retry_at:
+            return
+
+        def load():
+            try:
+                self.store.snapshot()
+            except Exception as e:
+                self._retry_at = time.time() + 30.0  # Evita reintentar en cada frame
+                logger.error(f"No se pudo cargar el reconocimiento de rostros: {str(e)}")
+
+        self._loading = threading.Thread(target=load, daemon=True, name="FaceRecognizerPreload")
+        self._loading.start()
+
+    def add_listener(self, callback: Callable[[dict], None]):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[dict], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def reset(self):
+        self._cache.clear()
+
+    def identify(self, frame: np.ndarray, boxes: np.ndarray, track_ids: np.ndarray) -> List[dict]:
+        """Identidad por caja: {'track_id', 'id_rostro' (-1 desconocido), 'alias', 'score'}"""
+        if len(track_ids) != len(boxes):
+            # Cajas e ids de distintos frames (p. ej. justo tras cambiar de modo)
+            return [self._unknown(-1) for _ in boxes]
+        results = [self._unknown(int(t)) for t in track_ids]
+        if not self.ready:
+            self.preload()  # Mientras carga, los rostros se muestran como desconocidos
+            return results
+        if not len(boxes):
+            return results
+        now = time.time()
+        version = self.store.version
+        pending = []
+        for i, track_id in enumerate(track_ids):
+            track_id = int(track_id)
+            if track_id < 0:
+                continue
+            cached = self._cache.get(track_id)
+            if cached is not None and now - cached['time'] < self.refresh_after:
+                if cached['version'] != version:
+                    self._rematch(track_id, cached, version)
+                self._cache.move_to_end(track_id)
+                results[i] = self._public(track_id, cached)
+                self.stats['cache_hits'] += 1
+            else:
+                pending.append(i)
+        if pending:
+            crops = crop_faces(frame, boxes[pending])
+            valid = [j for j, crop in enumerate(crops) if crop.size]
+            if valid:
+                embeddings = self.embedder.embed([crops[j] for j in valid])
+                ids, scores = self.store.match(embeddings, self.threshold)
+                self.stats['embedded'] += len(valid)
+                for j, embedding, id_rostro, score in zip(valid, embeddings, ids, scores):
+                    i = pending[j]
+                    track_id = int(track_ids[i])
+                    entry = {'id_rostro': int(id_rostro), 'score': float(score), 'embedding': embedding,
+                             'version': version, 'time': now}
+                    self._store_entry(track_id, entry, boxes[i], now)
+                    results[i] = self._public(track_id, entry)
+        return results
+
+    def _rematch(self, track_id: int, entry: dict, version: int):
+        """La galería cambió: se reusa el embedding del track, sin recalcularlo"""
+        ids, scores = self.store.match(entry['embedding'][np.newaxis], self.threshold)
+        entry.update(id_rostro=int(ids[0]), score=float(scores[0]), version=version)
+
+    def _store_entry(self, track_id: int, entry: dict, box, now: float):
+        previous = self._cache.get(track_id)
+        self._cache[track_id] = entry
+        self._cache.move_to_end(track_id)
+        while len(self._cache) > self.max_cache:
+            self._cache.popitem(last=False)
+        if entry['id_rostro'] >= 0 and (previous is None or previous['id_rostro'] != entry['id_rostro']):
+            self.stats['matches'] += 1
+            event = self._public(track_id, entry)
+            event.update(type='face_match', box=[int(v) for v in box], timestamp=now)
+            logger.info(f"Rostro reconocido: {event['alias']} ({event['score']:.2f}), track {track_id}")
+            for callback in self._listeners:
+                try:
+                    callback(event)
+                except Exception as e:
+                    logger.error(f"Error en listener de rostros: {str(e)}", exc_info=True)
+
+    def forget(self, active_ids):
+        """Descarta de la caché los tracks que ya no están activos"""
+        active = {int(t) for t in active_ids}
+        for track_id in [t for t in self._cache if t not in active]:
+            del self._cache[track_id]
+
+    def _public(self, track_id: int, entry: dict) -> dict:
+        id_rostro = entry['id_rostro']
+        alias = self.store.labels.get(id_rostro) if id_rostro >= 0 else None
+        return {'track_id': track_id, 'id_rostro': id_rostro, 'alias': alias, 'score': entry['score']}
+
+    @staticmethod
+    def _unknown(track_id: int) -> dict:
+        return {'track_id': track_id, 'id_rostro': -1, 'alias': None, 'score': 0.0}
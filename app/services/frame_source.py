@@ -0,0 +1,270 @@
+# app/services/frame_source.py
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+class FrameSource:
+    """Fuente de frames con interfaz compatible con cv2.VideoCapture
+
+    Con realtime=True los frames se entregan al ritmo de `fps`; con
+    realtime=False se entregan tan rápido como se consuman, sin descartar
+    ninguno, para medir throughput fuera de línea.
+    """
+
+    def __init__(self, fps: float = 30.0, realtime: bool = True, loop: bool = False):
+        self.fps = fps
+        self.realtime = realtime
+        self.loop = loop
+        self.frame_index = 0
+        self._opened = False
+        self._t0 = None
+
+    @property
+    def lossless(self) -> bool:
+        """Indica si el consumidor debe procesar todos los frames"""
+        return not self.realtime
+
+    def open(self) -> bool:
+        self._opened = self._open()
+        self.frame_index = 0
+        self._t0 = None
+        return self._opened
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self._opened:
+            return False, None
+        frame = self._read_frame()
+        if frame is None and self.loop and self.frame_index > 0:
+            self._rewind()
+            frame = self._read_frame()
+        if frame is None:
+            return False, None
+        self._pace()
+        self.frame_index += 1
+        return True, frame
+
+    def release(self):
+        self._opened = False
+        self._close()
+
+    def _pace(self):
+        """Espera hasta el instante de presentación del frame actual"""
+        if not self.realtime or self.fps <= 0:
+            return
+        now = time.perf_counter()
+        if self._t0 is None:
+            self._t0 = now
+            return
+        delay = self._t0 + self.frame_index / self.fps - now
+        if delay > 0:
+            time.sleep(delay)
+
+    # Métodos a implementar por cada fuente
+    def _open(self) -> bool:
+        return True
+
+    def _read_frame(self) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+    def _rewind(self):
+        pass
+
+    def _close(self):
+        pass
+
+
+class CameraSource(FrameSource):
+    """Webcam por índice o stream de red (rtsp://, http://)"""
+
+    def __init__(self, device: Union[int, str] = 0, realtime: bool = True):
+        super().__init__(fps=0, realtime=realtime)
+        self.device = device
+        self.capture = None
+
+    def _open(self) -> bool:
+        self.capture = cv2.VideoCapture(self.device)
+        if not self.capture.isOpened():
+            return False
+        # Evita que OpenCV acumule frames viejos en su buffer interno
+        self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        return True
+
+    def _read_frame(self) -> Optional[np.ndarray]:
+        ret, frame = self.capture.read()
+        return frame if ret else None
+
+    def _pace(self):
+        pass  # El dispositivo ya marca el ritmo
+
+    def _close(self):
+        if self.capture:
+            self.capture.release()
+            self.capture = None
+
+
+class VideoFileSource(FrameSource):
+    """Archivo de video grabado"""
+
+    def __init__(self, path: Union[str, Path], realtime: bool = True, loop: bool = False):
+        super().__init__(realtime=realtime, loop=loop)
+        self.path = str(path)
+        self.capture = None
+
+    def _open(self) -> bool:
+        self.capture = cv2.VideoCapture(self.path)
+        if not self.capture.isOpened():
+            return False
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        return True
+
+    def _read_frame(self) -> Optional[np.ndarray]:
+        ret, frame = self.capture.read()
+        return frame if ret else None
+
+    def _rewind(self):
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def _close(self):
+        if self.capture:
+            self.capture.release()
+            self.capture = None
+
+
+class ImageFolderSource(FrameSource):
+    """Directorio de imágenes leídas en orden alfabético"""
+
+    def __init__(self, directory: Union[str, Path], fps: float = 30.0,
+                 realtime: bool = True, loop: bool = False):
+        super().__init__(fps=fps, realtime=realtime, loop=loop)
+        self.directory = Path(directory)
+        self.files: List[Path] = []
+        self._pos = 0
+
+    def _open(self) -> bool:
+        if not self.directory.is_dir():
+            return False
+        self.files = sorted(
+            p for p in self.directory.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS
+        )
+        self._pos = 0
+        return bool(self.files)
+
+    def _read_frame(self) -> Optional[np.ndarray]:
+        while self._pos < len(self.files):
+            frame = cv2.imread(str(self.files[self._pos]))
+            self._pos += 1
+            if frame is not None:
+                return frame
+        return None
+
+    def _rewind(self):
+        self._pos = 0
+
+
+class NpyStackSource(FrameSource):
+    """Pila de frames en un archivo .npy con forma (N, H, W, 3)"""
+
+    def __init__(self, path: Union[str, Path], fps: float = 30.0,
+                 realtime: bool = True, loop: bool = False):
+        super().__init__(fps=fps, realtime=realtime, loop=loop)
+        self.path = Path(path)
+        self.stack = None
+        self._pos = 0
+
+    def _open(self) -> bool:
+        if not self.path.exists():
+            return False
+        stack = np.load(self.path, mmap_mode='r')
+        if stack.ndim == 3:
+            stack = stack[np.newaxis]
+        if stack.ndim != 4 or stack.dtype != np.uint8:
+            raise ValueError(f"Pila de frames no válida: {stack.shape} {stack.dtype}")
+        self.stack = stack
+        self._pos = 0
+        return len(stack) > 0
+
+    def _read_frame(self) -> Optional[np.ndarray]:
+        if self._pos >= len(self.stack):
+            return None
+        # Copia contigua: los consumidores dibujan sobre el frame
+        frame = np.array(self.stack[self._pos])
+        self._pos += 1
+        return frame
+
+    def _rewind(self):
+        self._pos = 0
+
+    def _close(self):
+        self.stack = None
+
+
+class SyntheticSource(FrameSource):
+    """Generador determinista de frames para pruebas sin cámara"""
+
+    def __init__(self, width: int = 640, height: int = 480, fps: float = 30.0,
+                 num_frames: Optional[int] = None, seed: int = 0,
+                 realtime: bool = True, loop: bool = False):
+        super().__init__(fps=fps, realtime=realtime, loop=loop)
+        self.width = width
+        self.height = height
+        self.num_frames = num_frames
+        self.seed = seed
+        self._pos = 0
+
+    def _open(self) -> bool:
+        rng = np.random.default_rng(self.seed)
+        # Fondo fijo con ruido y rectángulos que se desplazan linealmente
+        self._background = rng.integers(0, 64, (self.height, self.width, 3), dtype=np.uint8)
+        self._boxes = rng.integers(20, min(self.width, self.height) // 3, (4, 2))
+        self._origins = rng.integers(0, min(self.width, self.height), (4, 2))
+        self._velocities = rng.integers(-6, 7, (4, 2))
+        self._colors = rng.integers(64, 256, (4, 3))
+        self._pos = 0
+        return True
+
+    def _read_frame(self) -> Optional[np.ndarray]:
+        if self.num_frames is not None and self._pos >= self.num_frames:
+            return None
+        frame = self._background.copy()
+        limits = np.array([self.width, self.height])
+        positions = (self._origins + self._velocities * self._pos) % limits
+        for (x, y), (w, h), color in zip(positions, self._boxes, self._colors):
+            frame[y:y + h, x:x + w] = color
+        self._pos += 1
+        return frame
+
+    def _rewind(self):
+        self._pos = 0
+
+
+def create_source(spec: Union[int, str, Path, FrameSource] = 0, realtime: bool = True,
+                  loop: bool = False) -> FrameSource:
+    """Crea una fuente a partir de un índice, URL, ruta o 'synthetic[:WxH]'"""
+    if isinstance(spec, FrameSource):
+        return spec
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return CameraSource(int(spec), realtime=realtime)
+    spec = str(spec)
+    if '://' in spec:
+        return CameraSource(spec, realtime=realtime)
+    if spec.startswith('synthetic'):
+        width, height = 640, 480
+        if ':' in spec:
+            width, height = (int(v) for v in spec.split(':', 1)[1].lower().split('x'))
+        return SyntheticSource(width, height, realtime=realtime, loop=loop)
+    path = Path(spec)
+    if path.is_dir():
+        return ImageFolderSource(path, realtime=realtime, loop=loop)
+    if path.suffix.lower() == '.npy':
+        return NpyStackSource(path, realtime=realtime, loop=loop)
+    return VideoFileSource(path, realtime=realtime, loop=loop)
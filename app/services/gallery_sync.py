@@ -0,0 +1,235 @@
+# app/services/gallery_sync.py
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+from app.services.embedding_store import FaceEmbeddingStore, get_embedding_store
+from app.services.face_embeddings import FaceEmbedder, get_embedder, largest_face
+from app.services.model_registry import model_registry, FACE_MODEL_PATH
+
+logger = logging.getLogger("nova.vision")
+
+
+def index_images(id_rostro: int, alias: str, imagenes: List[Tuple[int, str]],
+                 embedder: Optional[FaceEmbedder] = None,
+                 store: Optional[FaceEmbeddingStore] = None) -> int:
+    """Calcula y guarda los embeddings de [(id imagen, ruta)]; retorna cuántos se indexaron"""
+    embedder = embedder if embedder is not None else get_embedder()
+    if store is None:  # Una galería vacía es falsa (__len__ == 0)
+        store = get_embedding_store(embedder.dim, embedder.name)
+    try:
+        face_model = model_registry.get(FACE_MODEL_PATH, warmup=False)
+    except Exception:
+        face_model = None  # Sin detector se usa la foto completa
+    ids, rostros = [], []
+    for id_imagen, img_path in imagenes:
+        if store.has_image(id_imagen):
+            continue
+        image = cv2.imread(str(img_path))
+        if image is None:
+            logger.warning(f"No se pudo leer imagen {img_path}")
+            continue
+        ids.append(id_imagen)
+        rostros.append(largest_face(image, face_model))
+    if not rostros:
+        return 0
+    store.add(id_rostro, ids, embedder.embed(rostros), label=alias)
+    return len(ids)
+
+
+class GallerySync:
+    """Mantiene la galería de embeddings al día con buscar_rostro/imagen
+
+    Un hilo consulta periódicamente la tabla galeria_cambios (alimentada por
+    triggers, ver migrations/001_galeria_cambios.sql) desde la última versión
+    aplicada y replica solo esas altas, bajas y cambios de alias. Todo el
+    trabajo (consultas y embeddings) ocurre en este hilo: el de video solo
+    ve la nueva versión de la galería cuando ya está publicada.
+    """
+
+    def __init__(self, db, store: Optional[FaceEmbeddingStore] = None,
+                 embedder: Optional[FaceEmbedder] = None, interval: float = 0.5,
+                 batch_size: int = 500, gap_timeout: float = 5.0, recheck_for: float = 600.0):
+        self.db = db
+        self.db.prepare('galeria_cambios',
+                        "SELECT version, tabla, operacion, id_rostro, id_imagen FROM galeria_cambios "
+                        "WHERE version > %s ORDER BY version LIMIT %s")
+        self._store = store
+        self._embedder = embedder
+        self.interval = interval
+        self.batch_size = batch_size
+        # Una versión que falta puede ser una transacción aún sin confirmar:
+        # se espera gap_timeout antes de saltarla, y durante recheck_for se
+        # vuelve a consultar por si confirma tarde (p. ej. una importación grande)
+        self.gap_timeout = gap_timeout
+        self.recheck_for = recheck_for
+        self._gaps: Dict[int, float] = {}  # Primera versión del hueco -> cuándo se vio
+        self._skipped: List[list] = []  # [desde, hasta, cuándo se saltó, versiones aplicadas tarde]
+        self._rechecked_at = 0.0
+        self._applied = set()
+        self._stop = threading.Event()
+        self._thread = None
+        self.on_change: Optional[Callable[[dict], None]] = None
+        self.stats = {'polls': 0, 'inserted': 0, 'deleted': 0, 'relabeled': 0, 'errors': 0}
+
+    @property
+    def embedder(self) -> FaceEmbedder:
+        if self._embedder is None:
+            self._embedder = get_embedder()
+        return self._embedder
+
+    @property
+    def store(self) -> FaceEmbeddingStore:
+        if self._store is None:
+            self._store = get_embedding_store(self.embedder.dim, self.embedder.name)
+        return self._store
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="GallerySyncThread")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Error sincronizando galería de rostros: {str(e)}", exc_info=True)
+                self._stop.wait(5.0)
+            self._stop.wait(self.interval)
+
+    def poll_once(self) -> int:
+        """Aplica los cambios pendientes; retorna cuántos se aplicaron"""
+        self.stats['polls'] += 1
+        store = self.store
+        changes, images, aliases = self._fetch(store.sync_version)
+        applied = 0
+        if changes:
+            applied += self._apply(store, changes, images, aliases, self._applied)
+            self._advance(store, [row[0] for row in changes])
+        applied += self._recheck(store)
+        if applied:
+            store.flush_index()
+        if applied and self.on_change:
+            self.on_change(dict(self.stats))
+        return applied
+
+    def _apply(self, store: FaceEmbeddingStore, changes: List[tuple], images: dict, aliases: dict,
+               done: set) -> int:
+        """Replica en la galería los cambios que no estén en `done` y los agrega a ese conjunto"""
+        applied = 0
+        inserts: Dict[Tuple[int, str], List[Tuple[int, str]]] = {}
+        insert_versions = []
+        for version, tabla, operacion, id_rostro, id_imagen in changes:
+            if version in done:
+                continue
+            if tabla == 'imagen' and operacion == 'I':
+                if id_imagen in images:
+                    path, alias = images[id_imagen]
+                    inserts.setdefault((id_rostro, alias), []).append((id_imagen, path))
+                insert_versions.append(version)  # Se marcan al terminar de embeber
+                continue
+            elif tabla == 'imagen' and operacion == 'D':
+                store.remove_images([id_imagen])
+                self.stats['deleted'] += 1
+            elif tabla == 'buscar_rostro' and operacion == 'D':
+                store.remove_rostro(id_rostro)
+                self.stats['deleted'] += 1
+            elif tabla == 'buscar_rostro' and operacion == 'U' and id_rostro in aliases:
+                store.set_label(id_rostro, aliases[id_rostro])
+                self.stats['relabeled'] += 1
+            done.add(version)
+            applied += 1
+        for (id_rostro, alias), imagenes in inserts.items():
+            self.stats['inserted'] += index_images(id_rostro, alias, imagenes, self.embedder, store)
+        done.update(insert_versions)
+        return applied + len(insert_versions)
+
+    def _advance(self, store: FaceEmbeddingStore, versions: List[int]):
+        """Mueve el cursor hasta el primer hueco que aún puede llenarse
+
+        Los huecos se manejan como rangos: saltar millones de versiones
+        purgadas cuesta lo mismo que saltar una.
+        """
+        now = time.time()
+        cursor = store.sync_version
+        for version in sorted(versions):
+            if version <= cursor:
+                continue
+            if version > cursor + 1:
+                if cursor == 0:
+                    # Galería nueva: lo anterior a la primera versión devuelta se purgó o no existe
+                    self._skip(cursor + 1, version - 1, now, warn=False)
+                elif now - self._gaps.setdefault(cursor + 1, now) >= self.gap_timeout:
+                    self._skip(cursor + 1, version - 1, now)
+                else:
+                    break
+            cursor = version
+        if cursor != store.sync_version:
+            store.set_sync_version(cursor)
+            self._applied = {v for v in self._applied if v > cursor}
+            self._gaps = {v: t for v, t in self._gaps.items() if v > cursor}
+
+    def _skip(self, first: int, last: int, now: float, warn: bool = True):
+        if warn:
+            logger.warning(f"Versiones {first}-{last} de galeria_cambios sin confirmar tras "
+                           f"{self.gap_timeout:g} s; se revisarán durante {self.recheck_for:g} s")
+        self._skipped.append([first, last, now, set()])
+        del self._skipped[:-256]  # Solo los huecos más recientes
+
+    def _recheck(self, store: FaceEmbeddingStore) -> int:
+        """Aplica los cambios que se confirmaron después de saltar su versión"""
+        now = time.time()
+        self._skipped = [gap for gap in self._skipped if now - gap[2] < self.recheck_for]
+        if not self._skipped or now - self._rechecked_at < self.gap_timeout:
+            return 0
+        self._rechecked_at = now
+        applied = 0
+        for first, last, _, done in self._skipped:
+            # `done` avanza en orden de versión: se continúa tras la última aplicada
+            changes, images, aliases = self._fetch(max([first - 1] + list(done)), last)
+            if changes:
+                logger.info(f"{len(changes)} cambios tardíos de galeria_cambios ({first}-{last}) aplicados")
+                applied += self._apply(store, changes, images, aliases, done)
+        return applied
+
+    def _fetch(self, since: int, until: Optional[int] = None):
+        """Cambios posteriores a `since` (hasta `until`), rutas de las imágenes nuevas y alias modificados"""
+        images, aliases = {}, {}
+        # Se consulta cada `interval` segundos: sentencia preparada y sin transacción
+        with self.db.unit_of_work('gallery_sync', autocommit=True) as uow:
+            if until is None:
+                changes = uow.fetch_prepared('galeria_cambios', (since, self.batch_size))
+            else:
+                changes = uow.fetchall(
+                    "SELECT version, tabla, operacion, id_rostro, id_imagen FROM galeria_cambios "
+                    "WHERE version > %s AND version <= %s ORDER BY version LIMIT %s",
+                    (since, until, self.batch_size))
+            new_images = [row[4] for row in changes if row[1] == 'imagen' and row[2] == 'I']
+            if new_images:
+                rows = uow.fetchall(
+                    "SELECT i.id, i.imagen, r.alias FROM imagen i "
+                    "JOIN buscar_rostro r ON r.id_rostro = i.id_rostro WHERE i.id = ANY(%s)",
+                    (new_images,))
+                for id_imagen, path, alias in rows:
+                    images[id_imagen] = (path, alias)
+            renamed = [row[3] for row in changes if row[1] == 'buscar_rostro' and row[2] == 'U']
+            if renamed:
+                aliases = dict(uow.fetchall("SELECT id_rostro, alias FROM buscar_rostro WHERE id_rostro = ANY(%s)",
+                                            (renamed,)))
+        return changes, images, aliases
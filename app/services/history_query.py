@@ -0,0 +1,217 @@
+# app/services/history_query.py
+import argparse
+import logging
+import math
+import sqlite3
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.action_log import (ActionLogReader, ActionSegment, DEFAULT_ACTION_LOG_DIR, TimeLike,
+                                     open_segment, to_timestamp)
+from app.services.event_sink import DEFAULT_EVENTS_DIR
+
+logger = logging.getLogger("nova.vision")
+
+Histogram = Tuple[np.ndarray, Dict[str, np.ndarray]]
+
+
+def _bounds(start: Optional[TimeLike], end: Optional[TimeLike]) -> Tuple[float, float]:
+    return (float('-inf') if start is None else to_timestamp(start),
+            float('inf') if end is None else to_timestamp(end))
+
+
+def _buckets(start: TimeLike, end: TimeLike, bucket: float) -> Tuple[float, float, int]:
+    lo, hi = to_timestamp(start), to_timestamp(end)
+    if bucket <= 0 or hi <= lo:
+        raise ValueError("El histograma requiere end > start y bucket > 0")
+    return lo, hi, math.ceil((hi - lo) / bucket)
+
+
+class ActionHistory:
+    """Conteos e histogramas de acciones por rango de tiempo sobre ST_GCN/action_logs
+
+    Por segmento se extraen solo dos columnas (ts float64 y la acción como
+    código uint16, ~10 bytes por registro) y se guardan en un LRU de
+    max_cached_segments segmentos; el rango se ubica con searchsorted y el
+    conteo es un bincount. La memoria depende de los segmentos en caché, no
+    de cuántos meses tenga el historial.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_ACTION_LOG_DIR, max_cached_segments: int = 64):
+        self.reader = ActionLogReader(directory)
+        self.max_cached_segments = max_cached_segments
+        self._columns: "OrderedDict[Path, Tuple[int, np.ndarray, np.ndarray, List[str]]]" = OrderedDict()
+
+    def _segment_columns(self, segment: ActionSegment) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        cached = self._columns.get(segment.path)
+        if cached is not None and cached[0] == segment.count:  # El segmento activo crece: se relee
+            self._columns.move_to_end(segment.path)
+            return cached[1:]
+        records = open_segment(segment.path)[:segment.count]
+        ts = np.array(records['ts'])
+        labels, codes = np.unique(records['action'], return_inverse=True)
+        columns = (segment.count, ts, codes.astype(np.uint16), [label.decode('utf-8') for label in labels])
+        self._columns[segment.path] = columns
+        self._columns.move_to_end(segment.path)
+        while len(self._columns) > self.max_cached_segments:
+            self._columns.popitem(last=False)
+        return columns[1:]
+
+    def _slices(self, start: Optional[TimeLike], end: Optional[TimeLike]
+                ) -> Iterator[Tuple[np.ndarray, np.ndarray, List[str]]]:
+        """(ts, códigos, etiquetas) de cada segmento restringidos a start <= ts < end"""
+        lo, hi = _bounds(start, end)
+        for segment in self.reader.segments():
+            if segment.last_ts < lo or segment.first_ts >= hi:
+                continue
+            ts, codes, labels = self._segment_columns(segment)
+            i, j = np.searchsorted(ts, lo, 'left'), np.searchsorted(ts, hi, 'left')
+            if j > i:
+                yield ts[i:j], codes[i:j], labels
+
+    def count(self, start: Optional[TimeLike] = None, end: Optional[TimeLike] = None,
+              action: Optional[str] = None) -> int:
+        """Cantidad de registros del rango, de una acción o de todas"""
+        total = 0
+        for ts, codes, labels in self._slices(start, end):
+            if action is None:
+                total += len(ts)
+            elif action in labels:
+                total += int(np.count_nonzero(codes == labels.index(action)))
+        return total
+
+    def counts(self, start: Optional[TimeLike] = None, end: Optional[TimeLike] = None) -> Dict[str, int]:
+        """Registros por acción en el rango, de mayor a menor"""
+        totals: Dict[str, int] = {}
+        for ts, codes, labels in self._slices(start, end):
+            for label, n in zip(labels, np.bincount(codes, minlength=len(labels))):
+                if n:
+                    totals[label] = totals.get(label, 0) + int(n)
+        return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+    def histogram(self, start: TimeLike, end: TimeLike, bucket: float,
+                  action: Optional[str] = None) -> Histogram:
+        """Inicio de cada intervalo de `bucket` segundos y conteos por acción en cada uno"""
+        lo, hi, n = _buckets(start, end, bucket)
+        result: Dict[str, np.ndarray] = {}
+        for ts, codes, labels in self._slices(lo, hi):
+            bins = ((ts - lo) // bucket).astype(np.int64)
+            matrix = np.bincount(codes.astype(np.int64) * n + bins,
+                                 minlength=len(labels) * n).reshape(len(labels), n)
+            for label, row in zip(labels, matrix):
+                if (action is None or label == action) and row.any():
+                    result[label] = result.get(label, 0) + row
+        return lo + bucket * np.arange(n), result
+
+
+class DetectionHistory:
+    """Las mismas consultas sobre eventos_deteccion (event_sink)
+
+    La agregación se hace en la base: PostgreSQL recorta el rango con el
+    índice BRIN y las particiones por mes, y solo viajan los grupos. Si se
+    indica, se suma lo que aún está en el respaldo SQLite local.
+    """
+
+    def __init__(self, db=None, local_path: Optional[Path] = DEFAULT_EVENTS_DIR / "detections.db"):
+        self.db = db
+        self.local_path = Path(local_path) if local_path else None
+
+    @staticmethod
+    def _where(start, end, label, tipo, stream, postgres: bool) -> Tuple[str, list]:
+        ts = "ts >= to_timestamp(%s) AND ts < to_timestamp(%s)" if postgres else "ts >= ? AND ts < ?"
+        lo, hi = _bounds(start, end)
+        clauses, params = [ts], [max(lo, 0.0), min(hi, 1e11)]
+        for column, value in (('etiqueta', label), ('tipo', tipo), ('stream', stream)):
+            if value is not None:
+                clauses.append(f"{column} = {'%s' if postgres else '?'}")
+                params.append(value)
+        return " WHERE " + " AND ".join(clauses), params
+
+    def _query(self, select: str, group_by: str, start, end, label, tipo, stream,
+               extra: Tuple = (), pg_select: Optional[str] = None) -> List[tuple]:
+        """Filas agrupadas de cada fuente; extra son parámetros de la parte SELECT"""
+        rows: List[tuple] = []
+        if self.db is not None:
+            where, params = self._where(start, end, label, tipo, stream, postgres=True)
+            with self.db.unit_of_work('detection_history', autocommit=True) as uow:
+                rows += uow.fetchall(f"SELECT {pg_select or select} FROM eventos_deteccion{where}{group_by}",
+                                     list(extra) + params)
+        if self.local_path is not None and self.local_path.exists():
+            where, params = self._where(start, end, label, tipo, stream, postgres=False)
+            conn = sqlite3.connect(f"file:{self.local_path}?mode=ro", uri=True)
+            try:
+                rows += conn.execute(f"SELECT {select.replace('%s', '?')} FROM eventos_deteccion{where}{group_by}",
+                                     list(extra) + params).fetchall()
+            finally:
+                conn.close()
+        return rows
+
+    def count(self, start: Optional[TimeLike] = None, end: Optional[TimeLike] = None,
+              label: Optional[str] = None, tipo: Optional[str] = None, stream: Optional[str] = None) -> int:
+        return sum(row[0] for row in self._query("count(*)", "", start, end, label, tipo, stream))
+
+    def counts(self, start: Optional[TimeLike] = None, end: Optional[TimeLike] = None,
+               tipo: Optional[str] = None, stream: Optional[str] = None) -> Dict[str, int]:
+        """Detecciones por etiqueta (clase u alias) en el rango, de mayor a menor"""
+        totals: Dict[str, int] = {}
+        for label, n in self._query("etiqueta, count(*)", " GROUP BY etiqueta", start, end, None, tipo, stream):
+            totals[label] = totals.get(label, 0) + int(n)
+        return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+    def histogram(self, start: TimeLike, end: TimeLike, bucket: float, label: Optional[str] = None,
+                  tipo: Optional[str] = None, stream: Optional[str] = None) -> Histogram:
+        lo, hi, n = _buckets(start, end, bucket)
+        rows = self._query("etiqueta, CAST((ts - %s) / %s AS INTEGER) AS b, count(*)", " GROUP BY 1, 2",
+                           lo, hi, label, tipo, stream, extra=(lo, bucket),
+                           pg_select="etiqueta, floor((extract(epoch FROM ts) - %s) / %s)::bigint AS b, count(*)")
+        result: Dict[str, np.ndarray] = {}
+        for name, b, count in rows:
+            row = result.setdefault(name, np.zeros(n, dtype=np.int64))
+            row[min(int(b), n - 1)] += count
+        return lo + bucket * np.arange(n), result
+
+
+def _print_histogram(edges: np.ndarray, result: Dict[str, np.ndarray]):
+    for label, row in result.items():
+        print(label)
+        for edge, n in zip(edges, row):
+            if n:
+                print(f"  {datetime.fromtimestamp(edge).isoformat(timespec='seconds')}  {int(n)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas por rango de tiempo sobre acciones y detecciones")
+    parser.add_argument('source', choices=['actions', 'detections'])
+    parser.add_argument('--start', help="ISO, p. ej. 2025-08-04T10:00")
+    parser.add_argument('--end')
+    parser.add_argument('--label', help="acción, clase o alias")
+    parser.add_argument('--bucket', type=float, default=None, help="segundos por intervalo del histograma")
+    parser.add_argument('--local-only', action='store_true', help="detecciones: solo el SQLite local")
+    args = parser.parse_args()
+
+    if args.source == 'actions':
+        history = ActionHistory()
+    else:
+        db = None
+        if not args.local_only:
+            from app.utils.database import Database
+            db = Database()
+        history = DetectionHistory(db)
+
+    if args.bucket:
+        if not (args.start and args.end):
+            parser.error("--bucket requiere --start y --end")
+        _print_histogram(*history.histogram(args.start, args.end, args.bucket, args.label))
+    elif args.label:
+        print(history.count(args.start, args.end, args.label))
+    else:
+        for label, n in history.counts(args.start, args.end).items():
+            print(f"{label}: {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,9 @@ import os
 import shutil
 from psycopg2 import DatabaseError
 from pathlib import Path
+from app.services.embedding_store import get_embedding_store
+from app.services.gallery_sync import index_images
+from app.utils.query_cache import query_cache, listen_from_env
 
 logger = logging.getLogger("nova.img_rostro")
 
@@ -13,78 +16,62 @@ class ImgRostroService:
         self.logger = logger
         self.known_faces_dir = Path("VISION_LLM/known_faces")
         self.known_faces_dir.mkdir(parents=True, exist_ok=True)
+        # Consultas repetidas al navegar la gestión de rostros: se planifican una vez por conexión
+        self.db.prepare('rostro_by_id', "SELECT id_rostro, nombre, alias FROM buscar_rostro WHERE id_rostro = %s")
+        self.db.prepare('imagenes_by_rostro', "SELECT id, imagen FROM imagen WHERE id_rostro = %s ORDER BY id")
+        listen_from_env(db)
     
     def list_rostros(self):
         """Lista todos los rostros registrados"""
         rostros = []
         try:
-            conn = self.db.get_connection()
-            if not conn:
-                self.logger.error("No hay conexión a la base de datos")
-                return rostros
-                
-            cursor = None
-            try:
-                cursor = conn.cursor()
-                cursor.execute("SELECT id_rostro, nombre, alias FROM buscar_rostro ORDER BY id_rostro")
-                rostros = [{'id_rostro': row[0], 'nombre': row[1], 'alias': row[2]} for row in cursor.fetchall()]
-            except DatabaseError as e:
-                self.logger.error(f"Error al listar rostros: {str(e)}")
-                conn.rollback()
-            finally:
-                if cursor:
-                    cursor.close()
-                self.db.release_connection(conn)
-                
+            rostros = query_cache.get_or_load(('list_rostros',), ('buscar_rostro',), self._load_rostros)
+        except (DatabaseError, ConnectionError) as e:
+            self.logger.error(f"Error al listar rostros: {str(e)}")
         except Exception as e:
             self.logger.error(f"Error inesperado al listar rostros: {str(e)}", exc_info=True)
         
         return rostros
     
+    def _load_rostros(self):
+        with self.db.unit_of_work('list_rostros', autocommit=True) as uow:
+            rows = uow.fetchall("SELECT id_rostro, nombre, alias FROM buscar_rostro ORDER BY id_rostro")
+        return [{'id_rostro': row[0], 'nombre': row[1], 'alias': row[2]} for row in rows]
+    
     def add_rostro(self, nombre: str, alias: str, imagenes: list) -> bool:
         """Agrega un nuevo rostro con sus imágenes"""
         try:
-            conn = self.db.get_connection()
-            if not conn:
-                self.logger.error("No hay conexión a la base de datos")
-                return False
-                
-            cursor = None
-            try:
-                cursor = conn.cursor()
-                
-                # Insertar en tabla buscar_rostro
-                cursor.execute(
+            # Guardar imágenes en el directorio de rostros conocidos
+            destinos = []
+            for img_path in imagenes:
+                dest_path = self.known_faces_dir / f"{alias}_{Path(img_path).name}"
+                shutil.copy(img_path, dest_path)
+                destinos.append(str(dest_path))
+            
+            # Rostro e imágenes en una sola sentencia (un viaje a la BD, atómica)
+            with self.db.unit_of_work('add_rostro', autocommit=True) as uow:
+                insert_rostro = uow.mogrify(
                     "INSERT INTO buscar_rostro (nombre, alias) VALUES (%s, %s) RETURNING id_rostro",
                     (nombre, alias))
-                
-                id_rostro = cursor.fetchone()[0]
-                
-                # Guardar imágenes en sistema de archivos y en BD
-                for img_path in imagenes:
-                    img_name = f"{alias}_{Path(img_path).name}"
-                    dest_path = self.known_faces_dir / img_name
-                    
-                    # Copiar imagen al directorio de rostros conocidos
-                    shutil.copy(img_path, dest_path)
-                    
-                    # Insertar en tabla imagen
-                    cursor.execute(
-                        "INSERT INTO imagen (id_rostro, imagen) VALUES (%s, %s)",
-                        (id_rostro, str(dest_path)))
-                
-                conn.commit()
-                return True
-                
-            except DatabaseError as e:
-                self.logger.error(f"Error al agregar rostro: {str(e)}")
-                conn.rollback()
-                return False
-            finally:
-                if cursor:
-                    cursor.close()
-                self.db.release_connection(conn)
-                
+                if not destinos:
+                    uow.execute(insert_rostro)
+                    query_cache.invalidate('buscar_rostro')
+                    return True
+                rows = uow.execute_values(
+                    f"WITH r AS ({insert_rostro.replace('%', '%%')}) "
+                    "INSERT INTO imagen (id_rostro, imagen) "
+                    "SELECT r.id_rostro, v.imagen FROM r CROSS JOIN (VALUES %s) AS v (imagen) "
+                    "RETURNING id_rostro, id, imagen",
+                    [(dest,) for dest in destinos], fetch=True)
+            query_cache.invalidate('buscar_rostro', 'imagen')
+            
+            # El embedding se calcula una sola vez, al registrar
+            self.index_images(rows[0][0], alias, [(row[1], row[2]) for row in rows])
+            return True
+            
+        except (DatabaseError, ConnectionError) as e:
+            self.logger.error(f"Error al agregar rostro: {str(e)}")
+            return False
         except Exception as e:
             self.logger.error(f"Error inesperado al agregar rostro: {str(e)}", exc_info=True)
             return False
@@ -92,28 +79,19 @@ class ImgRostroService:
     def update_rostro(self, id_rostro: int, nombre: str, alias: str) -> bool:
         """Actualiza un rostro existente"""
         try:
-            conn = self.db.get_connection()
-            if not conn:
-                self.logger.error("No hay conexión a la base de datos")
-                return False
-                
-            cursor = None
-            try:
-                cursor = conn.cursor()
-                cursor.execute(
+            with self.db.unit_of_work('update_rostro', autocommit=True) as uow:
+                uow.execute(
                     "UPDATE buscar_rostro SET nombre = %s, alias = %s WHERE id_rostro = %s",
                     (nombre, alias, id_rostro))
-                conn.commit()
-                return cursor.rowcount > 0
-            except DatabaseError as e:
-                self.logger.error(f"Error al actualizar rostro: {str(e)}")
-                conn.rollback()
-                return False
-            finally:
-                if cursor:
-                    cursor.close()
-                self.db.release_connection(conn)
-                
+                updated = uow.rowcount > 0
+            query_cache.invalidate('buscar_rostro')
+            if updated:
+                self._update_embeddings(lambda store: id_rostro in store.labels
+                                        and store.set_label(id_rostro, alias))
+            return updated
+        except (DatabaseError, ConnectionError) as e:
+            self.logger.error(f"Error al actualizar rostro: {str(e)}")
+            return False
         except Exception as e:
             self.logger.error(f"Error inesperado al actualizar rostro: {str(e)}", exc_info=True)
             return False
@@ -121,45 +99,29 @@ class ImgRostroService:
     def delete_rostro(self, id_rostro: int) -> bool:
         """Elimina un rostro y sus imágenes asociadas"""
         try:
-            conn = self.db.get_connection()
-            if not conn:
-                self.logger.error("No hay conexión a la base de datos")
-                return False
-                
-            cursor = None
-            try:
-                cursor = conn.cursor()
-                
-                # Obtener imágenes asociadas
-                cursor.execute("SELECT imagen FROM imagen WHERE id_rostro = %s", (id_rostro,))
-                imagenes = [row[0] for row in cursor.fetchall()]
-                
-                # Eliminar de tabla imagen
-                cursor.execute("DELETE FROM imagen WHERE id_rostro = %s", (id_rostro,))
+            with self.db.unit_of_work('delete_rostro') as uow:
+                # Eliminar de tabla imagen, obteniendo las rutas en el mismo viaje
+                rows = uow.fetchall("DELETE FROM imagen WHERE id_rostro = %s RETURNING imagen", (id_rostro,))
+                imagenes = [row[0] for row in rows]
                 
                 # Eliminar de tabla buscar_rostro
-                cursor.execute("DELETE FROM buscar_rostro WHERE id_rostro = %s", (id_rostro,))
-                
-                conn.commit()
-                
-                # Eliminar archivos de imágenes
-                for img_path in imagenes:
-                    try:
-                        os.remove(img_path)
-                    except OSError as e:
-                        self.logger.warning(f"No se pudo eliminar imagen {img_path}: {str(e)}")
-                
-                return True
-                
-            except DatabaseError as e:
-                self.logger.error(f"Error al eliminar rostro: {str(e)}")
-                conn.rollback()
-                return False
-            finally:
-                if cursor:
-                    cursor.close()
-                self.db.release_connection(conn)
-                
+                uow.execute("DELETE FROM buscar_rostro WHERE id_rostro = %s", (id_rostro,))
+            query_cache.invalidate('buscar_rostro', 'imagen')
+            
+            self._update_embeddings(lambda store: store.remove_rostro(id_rostro))
+            
+            # Eliminar archivos de imágenes
+            for img_path in imagenes:
+                try:
+                    os.remove(img_path)
+                except OSError as e:
+                    self.logger.warning(f"No se pudo eliminar imagen {img_path}: {str(e)}")
+            
+            return True
+            
+        except (DatabaseError, ConnectionError) as e:
+            self.logger.error(f"Error al eliminar rostro: {str(e)}")
+            return False
         except Exception as e:
             self.logger.error(f"Error inesperado al eliminar rostro: {str(e)}", exc_info=True)
             return False
@@ -167,53 +129,86 @@ class ImgRostroService:
     def get_rostro_by_id(self, id_rostro: int):
         """Obtiene un rostro por su ID"""
         try:
-            conn = self.db.get_connection()
-            if not conn:
-                self.logger.error("No hay conexión a la base de datos")
-                return None
-                
-            cursor = None
-            try:
-                cursor = conn.cursor()
-                cursor.execute("SELECT id_rostro, nombre, alias FROM buscar_rostro WHERE id_rostro = %s", (id_rostro,))
-                row = cursor.fetchone()
-                return {'id_rostro': row[0], 'nombre': row[1], 'alias': row[2]} if row else None
-            except DatabaseError as e:
-                self.logger.error(f"Error al obtener rostro: {str(e)}")
-                conn.rollback()
-                return None
-            finally:
-                if cursor:
-                    cursor.close()
-                self.db.release_connection(conn)
-                
+            return query_cache.get_or_load(('get_rostro_by_id', id_rostro), ('buscar_rostro',),
+                                           lambda: self._load_rostro(id_rostro))
+        except (DatabaseError, ConnectionError) as e:
+            self.logger.error(f"Error al obtener rostro: {str(e)}")
+            return None
         except Exception as e:
             self.logger.error(f"Error inesperado al obtener rostro: {str(e)}", exc_info=True)
             return None
     
+    def _load_rostro(self, id_rostro: int):
+        with self.db.unit_of_work('get_rostro_by_id', autocommit=True) as uow:
+            rows = uow.fetch_prepared('rostro_by_id', (id_rostro,))
+        return {'id_rostro': rows[0][0], 'nombre': rows[0][1], 'alias': rows[0][2]} if rows else None
+    
     def get_imagenes_by_rostro(self, id_rostro: int):
         """Obtiene las imágenes asociadas a un rostro"""
         imagenes = []
         try:
-            conn = self.db.get_connection()
-            if not conn:
-                self.logger.error("No hay conexión a la base de datos")
-                return imagenes
-                
-            cursor = None
-            try:
-                cursor = conn.cursor()
-                cursor.execute("SELECT id, imagen FROM imagen WHERE id_rostro = %s", (id_rostro,))
-                imagenes = [{'id': row[0], 'imagen': row[1]} for row in cursor.fetchall()]
-            except DatabaseError as e:
-                self.logger.error(f"Error al obtener imágenes: {str(e)}")
-                conn.rollback()
-            finally:
-                if cursor:
-                    cursor.close()
-                self.db.release_connection(conn)
-                
+            imagenes = query_cache.get_or_load(('get_imagenes_by_rostro', id_rostro), ('imagen',),
+                                               lambda: self._load_imagenes(id_rostro))
+        except (DatabaseError, ConnectionError) as e:
+            self.logger.error(f"Error al obtener imágenes: {str(e)}")
         except Exception as e:
             self.logger.error(f"Error inesperado al obtener imágenes: {str(e)}", exc_info=True)
         
-        return imagenes
\ No newline at end of file
+        return imagenes
+    
+    def _load_imagenes(self, id_rostro: int):
+        with self.db.unit_of_work('get_imagenes_by_rostro', autocommit=True) as uow:
+            rows = uow.fetch_prepared('imagenes_by_rostro', (id_rostro,))
+        return [{'id': row[0], 'imagen': row[1]} for row in rows]
+    
+    def cache_stats(self) -> dict:
+        """Aciertos y fallos de la caché de lecturas"""
+        return query_cache.get_stats()
+    
+    def _update_embeddings(self, change):
+        """Aplica un cambio a la galería sin afectar el resultado de la operación en BD"""
+        try:
+            change(get_embedding_store())
+        except Exception as e:
+            self.logger.warning(f"No se pudo actualizar la galería de embeddings: {str(e)}")
+    
+    def index_images(self, id_rostro: int, alias: str, imagenes: list) -> int:
+        """Calcula y guarda los embeddings de [(id imagen, ruta)]; retorna cuántos se indexaron"""
+        try:
+            return index_images(id_rostro, alias, imagenes)
+        except Exception as e:
+            # El registro en BD ya quedó hecho; rebuild_embeddings() completa lo pendiente
+            self.logger.warning(f"Embeddings pendientes para rostro {id_rostro}: {str(e)}")
+            return 0
+    
+    def import_folder(self, root, **options) -> dict:
+        """Importa en bloque un árbol alias/*.jpg (ver FaceImporter); retorna estadísticas"""
+        from app.services.face_importer import FaceImporter
+        importer = FaceImporter(self.db, self.known_faces_dir, **options)
+        stats = importer.run(Path(root))
+        self.logger.info(f"Importación de {root}: {stats['inserted']} imágenes, "
+                         f"{stats['images_per_sec']:.1f} img/s")
+        return stats
+    
+    def rebuild_embeddings(self) -> int:
+        """Indexa las imágenes registradas que aún no tienen embedding"""
+        pendientes = {}
+        try:
+            with self.db.unit_of_work('rebuild_embeddings', autocommit=True) as uow:
+                rows = uow.fetchall(
+                    "SELECT i.id, i.id_rostro, i.imagen, r.alias FROM imagen i "
+                    "JOIN buscar_rostro r ON r.id_rostro = i.id_rostro ORDER BY i.id")
+            store = get_embedding_store()
+            for id_imagen, id_rostro, img_path, alias in rows:
+                if not store.has_image(id_imagen):
+                    pendientes.setdefault((id_rostro, alias), []).append((id_imagen, img_path))
+        except (DatabaseError, ConnectionError) as e:
+            self.logger.error(f"Error al listar imágenes para embeddings: {str(e)}")
+        except Exception as e:
+            self.logger.error(f"Error inesperado al reconstruir embeddings: {str(e)}", exc_info=True)
+        
+        indexed = sum(self.index_images(id_rostro, alias, imagenes)
+                      for (id_rostro, alias), imagenes in pendientes.items())
+        if indexed:
+            get_embedding_store().flush_index()
+        return indexed
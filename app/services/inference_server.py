@@ -0,0 +1,177 @@
+# app/services/inference_server.py
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.services.model_registry import model_registry, OBJECT_MODEL_PATH
+
+logger = logging.getLogger("nova.vision")
+
+
+class BatchInferenceServer:
+    """Servidor de inferencia compartido que agrupa frames de varias cámaras
+
+    Cada stream deja su frame más reciente en un slot; el hilo del servidor
+    junta hasta `max_batch_size` slots (esperando como máximo `max_wait`
+    segundos a que lleguen más) y ejecuta un único `model.predict` sobre la
+    pila. Los resultados se devuelven a cada stream por su Future.
+    El modelo sale de model_registry (uno por pesos y dispositivo) y el hilo
+    arranca solo con el primer stream registrado o el primer frame.
+    """
+
+    def __init__(self, weights: str = OBJECT_MODEL_PATH, device: Optional[str] = None,
+                 max_batch_size: int = 8, max_wait: float = 0.01, model=None, **predict_kwargs):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size debe ser al menos 1")
+        self.weights = weights
+        self.device = device
+        self._model = model  # Solo para inyectar un modelo ya cargado (pruebas, benchmarks)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.predict_kwargs = {'save': False, 'verbose': False, **predict_kwargs}
+        self._pending: Dict[str, tuple] = {}  # stream_id -> (frame, future, t_submit)
+        self._streams = set()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.stats = {'batches': 0, 'frames': 0, 'superseded': 0, 'last_batch_ms': 0.0}
+
+    @property
+    def model(self):
+        if self._model is not None:
+            return self._model
+        return model_registry.get(self.weights, self.device)
+
+    @property
+    def names(self) -> Optional[dict]:
+        """Clases del modelo, o None si aún no está cargado"""
+        if self._model is None and not model_registry.is_loaded(self.weights, self.device):
+            return None
+        return self.model.names
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def register_stream(self, stream_id: str):
+        with self._cond:
+            self._streams.add(stream_id)
+        self.preload()
+        self.start()
+
+    def preload(self):
+        """Carga el modelo en segundo plano si aún no está cargado"""
+        if self._model is None:
+            model_registry.preload(self.weights, self.device)
+
+    def unregister_stream(self, stream_id: str):
+        with self._cond:
+            self._streams.discard(stream_id)
+            pending = self._pending.pop(stream_id, None)
+        if pending:
+            pending[1].cancel()
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True, name="BatchInferenceThread")
+        self._thread.start()
+        logger.info(f"Servidor de inferencia iniciado (batch={self.max_batch_size}, espera={self.max_wait}s)")
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._cond.notify_all()
+        for _, future, _ in pending:
+            future.cancel()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def submit(self, stream_id: str, frame: np.ndarray) -> Future:
+        """Deja el frame más reciente de un stream; reemplaza uno aún no procesado"""
+        future = Future()
+        if not self._running:
+            self.start()
+        with self._cond:
+            self._streams.add(stream_id)
+            previous = self._pending.get(stream_id)
+            self._pending[stream_id] = (frame, future, time.perf_counter())
+            self._cond.notify_all()
+        if previous:
+            previous[1].cancel()
+            self.stats['superseded'] += 1
+        return future
+
+    def infer(self, stream_id: str, frame: np.ndarray, timeout: Optional[float] = 5.0):
+        """Envía un frame y espera su resultado (equivalente a predict()[0])"""
+        return self.submit(stream_id, frame).result(timeout=timeout)
+
+    def _collect_batch(self) -> list:
+        """Espera el primer frame y luego hasta max_wait por el resto del batch"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or not self._running)
+            if not self._running:
+                return []
+            deadline = min(t for _, _, t in self._pending.values()) + self.max_wait
+            expected = min(self.max_batch_size, max(len(self._streams), 1))
+            while self._running and len(self._pending) < expected:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            # Prioriza los frames que llevan más tiempo esperando
+            ordered = sorted(self._pending.items(), key=lambda item: item[1][2])
+            batch = ordered[:self.max_batch_size]
+            for stream_id, _ in batch:
+                del self._pending[stream_id]
+            return batch
+
+    def _serve(self):
+        while self._running:
+            batch = self._collect_batch()
+            batch = [(sid, req) for sid, req in batch if req[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            frames = [req[0] for _, req in batch]
+            try:
+                start = time.perf_counter()
+                results = self.model.predict(source=frames, **self.predict_kwargs)
+                self.stats['last_batch_ms'] = (time.perf_counter() - start) * 1000
+                self.stats['batches'] += 1
+                self.stats['frames'] += len(frames)
+                for (_, (_, future, _)), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Error en inferencia por lotes: {str(e)}", exc_info=True)
+                for _, (_, future, _) in batch:
+                    future.set_exception(e)
+
+
+_inference_server = None
+_server_lock = threading.Lock()
+
+
+def get_inference_server() -> Optional[BatchInferenceServer]:
+    """Servidor compartido por todas las cámaras del proceso; None si NOVA_BATCH_INFERENCE=off
+
+    NOVA_BATCH_SIZE y NOVA_BATCH_WAIT_MS ajustan el tamaño máximo del lote y la espera.
+    """
+    global _inference_server
+    if os.getenv("NOVA_BATCH_INFERENCE", "on").lower() in ('off', '0', 'false'):
+        return None
+    with _server_lock:
+        if _inference_server is None:
+            _inference_server = BatchInferenceServer(
+                max_batch_size=int(os.getenv("NOVA_BATCH_SIZE", "8")),
+                max_wait=float(os.getenv("NOVA_BATCH_WAIT_MS", "10")) / 1000)
+        return _inference_server
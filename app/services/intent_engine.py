@@ -0,0 +1,371 @@
+# app/services/intent_engine.py
+import logging
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("nova.voice")
+
+# Verbos → intención
+VERBS = {
+    'start': ['iniciar', 'inicia', 'inicie', 'comenzar', 'comienza', 'empieza', 'empezar',
+              'arranca', 'arrancar', 'enciende', 'encender', 'activa la camara', 'abre la camara'],
+    'stop': ['detener', 'deten', 'detente', 'para', 'parar', 'apaga', 'apagar', 'alto',
+             'termina', 'terminar', 'cierra la camara'],
+    'search': ['busca', 'buscar', 'buscame', 'encuentra', 'encontrar', 'localiza', 'localizar',
+               'sigue', 'seguir', 'detecta', 'detectar', 'muestra', 'mostrar', 'resalta', 'marca'],
+    'mask': ['enmascara', 'enmascarar', 'oculta', 'ocultar', 'tapa', 'tapar', 'cubre', 'cubrir',
+             'censura', 'censurar', 'esconde', 'esconder', 'anonimiza', 'anonimizar'],
+    'unmask': ['desenmascara', 'desenmascarar', 'sin mascara', 'sin enmascarar', 'quita la mascara',
+               'quitar mascara', 'no enmascares', 'descubre'],
+    'clear': ['olvida', 'cancela', 'cancelar', 'limpia', 'limpiar', 'ya no busques', 'deja de buscar'],
+}
+
+# Palabras que fijan el modo de detección
+MODES = {
+    'face': ['rostro', 'rostros', 'cara', 'caras', 'modo rostro', 'modo rostros', 'modo cara'],
+    'recognize': ['reconoce', 'reconocer', 'reconocimiento', 'quien es', 'quienes son', 'identifica',
+                  'identificar', 'modo reconocer', 'modo reconocimiento'],
+    'object': ['objeto', 'objetos', 'modo objeto', 'modo objetos'],
+}
+
+# Métodos de enmascaramiento (ver app.services.masking.MASK_METHODS)
+MASKS = {
+    'm1': ['desenfoque', 'desenfocar', 'desenfoca', 'difumina', 'difuminar', 'difuminado',
+           'borroso', 'blur', 'gaussiano'],
+    'm2': ['pixel', 'pixeles', 'pixela', 'pixelar', 'pixelado', 'pixelacion', 'mosaico'],
+    'm3': ['caja negra', 'cuadro negro', 'recuadro negro', 'bloque negro'],
+    'm4': ['emoji', 'emojis', 'carita', 'caritas', 'emoticono'],
+}
+
+# Colores en español → nombre de app.services.color_filter.COLOR_RANGES
+COLORS = {
+    'red': ['rojo', 'roja', 'rojos', 'rojas'],
+    'orange': ['naranja', 'naranjas', 'anaranjado', 'anaranjada'],
+    'yellow': ['amarillo', 'amarilla', 'amarillos', 'amarillas'],
+    'green': ['verde', 'verdes'],
+    'blue': ['azul', 'azules'],
+    'purple': ['morado', 'morada', 'violeta', 'purpura'],
+    'pink': ['rosa', 'rosado', 'rosada'],
+    'white': ['blanco', 'blanca', 'blancos', 'blancas'],
+    'gray': ['gris', 'grises', 'plomo'],
+    'black': ['negro', 'negra', 'negros', 'negras'],
+}
+
+# Alias en español de las clases COCO de YOLOv8 (el plural simple se agrega al compilar)
+OBJECT_ALIASES = {
+    'person': ['persona', 'gente', 'humano', 'hombre', 'mujer', 'nino', 'nina'],
+    'bicycle': ['bicicleta', 'bici'],
+    'car': ['carro', 'auto', 'coche', 'automovil', 'vehiculo'],
+    'motorcycle': ['moto', 'motocicleta'],
+    'airplane': ['avion', 'aeroplano'],
+    'bus': ['bus', 'autobus', 'omnibus', 'micro'],
+    'train': ['tren'],
+    'truck': ['camion', 'camioneta'],
+    'boat': ['bote', 'barco', 'lancha'],
+    'traffic light': ['semaforo'],
+    'fire hydrant': ['hidrante', 'grifo contra incendios'],
+    'stop sign': ['senal de alto', 'senal de pare', 'pare'],
+    'parking meter': ['parquimetro'],
+    'bench': ['banca', 'banco'],
+    'bird': ['pajaro', 'ave'],
+    'cat': ['gato', 'gata'],
+    'dog': ['perro', 'perra', 'can'],
+    'horse': ['caballo'],
+    'sheep': ['oveja'],
+    'cow': ['vaca'],
+    'elephant': ['elefante'],
+    'bear': ['oso'],
+    'zebra': ['cebra'],
+    'giraffe': ['jirafa'],
+    'backpack': ['mochila'],
+    'umbrella': ['paraguas', 'sombrilla'],
+    'handbag': ['bolso', 'cartera'],
+    'tie': ['corbata'],
+    'suitcase': ['maleta', 'valija'],
+    'frisbee': ['frisbi', 'disco volador'],
+    'skis': ['esqui', 'esquis'],
+    'snowboard': ['tabla de nieve'],
+    'sports ball': ['pelota', 'balon'],
+    'kite': ['cometa', 'papalote'],
+    'baseball bat': ['bate', 'bate de beisbol'],
+    'baseball glove': ['guante', 'guante de beisbol'],
+    'skateboard': ['patineta', 'monopatin'],
+    'surfboard': ['tabla de surf'],
+    'tennis racket': ['raqueta'],
+    'bottle': ['botella'],
+    'wine glass': ['copa', 'copa de vino'],
+    'cup': ['taza', 'vaso'],
+    'fork': ['tenedor'],
+    'knife': ['cuchillo'],
+    'spoon': ['cuchara'],
+    'bowl': ['tazon', 'cuenco', 'plato hondo'],
+    'banana': ['platano', 'banana', 'banano'],
+    'apple': ['manzana'],
+    'sandwich': ['sandwich', 'emparedado'],
+    'orange': ['mandarina'],  # 'naranja' se reserva para el color
+    'broccoli': ['brocoli'],
+    'carrot': ['zanahoria'],
+    'hot dog': ['hot dog', 'perro caliente', 'pancho'],
+    'pizza': ['pizza'],
+    'donut': ['dona', 'rosquilla'],
+    'cake': ['pastel', 'torta', 'tarta'],
+    'chair': ['silla'],
+    'couch': ['sofa', 'sillon'],
+    'potted plant': ['planta', 'maceta'],
+    'bed': ['cama'],
+    'dining table': ['mesa', 'comedor'],
+    'toilet': ['inodoro', 'retrete', 'escusado'],
+    'tv': ['television', 'televisor', 'tele', 'pantalla'],
+    'laptop': ['laptop', 'portatil', 'computadora portatil'],
+    'mouse': ['raton', 'mouse'],
+    'remote': ['control remoto', 'control'],
+    'keyboard': ['teclado'],
+    'cell phone': ['celular', 'telefono', 'movil', 'telefono celular'],
+    'microwave': ['microondas'],
+    'oven': ['horno'],
+    'toaster': ['tostadora'],
+    'sink': ['lavabo', 'lavamanos', 'fregadero'],
+    'refrigerator': ['refrigerador', 'nevera', 'heladera', 'refri'],
+    'book': ['libro'],
+    'clock': ['reloj'],
+    'vase': ['jarron', 'florero'],
+    'scissors': ['tijeras', 'tijera'],
+    'teddy bear': ['osito', 'oso de peluche', 'peluche'],
+    'hair drier': ['secador', 'secadora de pelo'],
+    'toothbrush': ['cepillo de dientes'],
+}
+
+# Palabras que no aportan significado y se ignoran al tokenizar
+STOPWORDS = {'el', 'la', 'los', 'las', 'un', 'una', 'unos', 'unas', 'de', 'del', 'al', 'a',
+             'con', 'por', 'favor', 'porfa', 'nova', 'oye', 'me', 'mi', 'y', 'en', 'que', 'usa', 'usar'}
+
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin tildes (ni ñ) ni puntuación, espacios simples"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens normalizados sin palabras vacías (se aplica igual a frases y comandos)"""
+    return [t for t in normalize(text).split() if t not in STOPWORDS]
+
+
+def _plural(word: str) -> str:
+    if word.endswith('z'):
+        return word[:-1] + 'ces'
+    return word + ('s' if word[-1] in 'aeiou' else 'es')
+
+
+class TokenTrie:
+    """Trie sobre palabras: coincidencia por frase completa con la más larga primero"""
+
+    __slots__ = ('root',)
+
+    def __init__(self):
+        self.root: Dict = {}
+
+    def add(self, phrase: str, value: Tuple[str, str]):
+        node = self.root
+        for token in tokenize(phrase):
+            node = node.setdefault(token, {})
+        node.setdefault(None, value)  # Se conserva el primer significado registrado
+
+    def scan(self, tokens: List[str]) -> List[Tuple[str, str]]:
+        """Recorre los tokens una vez, emitiendo la coincidencia más larga en cada posición"""
+        matches = []
+        root = self.root
+        i, n = 0, len(tokens)
+        while i < n:
+            node, best, best_end, j = root, None, i + 1, i
+            while j < n:
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                value = node.get(None)
+                if value is not None:
+                    best, best_end = value, j
+            if best is not None:
+                matches.append(best)
+            i = best_end
+        return matches
+
+
+class IntentParser:
+    """Gramática de comandos compilada en un trie de palabras
+
+    Las clases se toman de `model.names` (solo las que el modelo conoce), con
+    sus alias en español; los alias de rostros conocidos se pueden actualizar
+    sin recompilar el resto.
+    """
+
+    def __init__(self, class_names: Optional[Iterable[str]] = None,
+                 face_aliases: Iterable[str] = ()):
+        self.class_names = set(class_names) if class_names is not None else set(OBJECT_ALIASES)
+        self.face_aliases = {}
+        self._base = self._compile_base()
+        self.trie = self._base
+        self.set_face_aliases(face_aliases)
+
+    def _compile_base(self) -> TokenTrie:
+        trie = TokenTrie()
+        # Primero las categorías más específicas: ganan si una frase se repite
+        for method, words in MASKS.items():
+            for word in words:
+                trie.add(word, ('mask', method))
+        for intent, words in VERBS.items():
+            for word in words:
+                trie.add(word, ('verb', intent))
+        for mode, words in MODES.items():
+            for word in words:
+                trie.add(word, ('mode', mode))
+        for color, words in COLORS.items():
+            for word in words:
+                trie.add(word, ('color', color))
+        for name in sorted(self.class_names):
+            aliases = OBJECT_ALIASES.get(name, [])
+            for alias in aliases:
+                alias = normalize(alias)
+                trie.add(alias, ('object', name))
+                if ' ' not in alias:
+                    trie.add(_plural(alias), ('object', name))
+            trie.add(name, ('object', name))
+        return trie
+
+    def set_face_aliases(self, aliases: Iterable[str]):
+        """Registra los alias de rostros conocidos (p. ej. de buscar_rostro.alias)"""
+        self.face_aliases = {normalize(a): a for a in aliases if a and normalize(a)}
+        if not self.face_aliases:
+            self.trie = self._base
+            return
+        trie = TokenTrie()
+        trie.root = self._copy(self._base.root)
+        for key, alias in self.face_aliases.items():
+            trie.add(key, ('face', alias))
+        self.trie = trie
+
+    @classmethod
+    def _copy(cls, node: Dict) -> Dict:
+        return {k: (cls._copy(v) if isinstance(v, dict) else v) for k, v in node.items()}
+
+    def parse(self, text: str) -> dict:
+        """Convierte un comando en una intención con sus argumentos"""
+        tokens = tokenize(text)
+        found = {'verb': None, 'object': None, 'color': None, 'mask': None, 'mode': None, 'face': None}
+        for kind, value in self.trie.scan(tokens):
+            if found[kind] is None:
+                found[kind] = value
+        return self._resolve(found, text)
+
+    @staticmethod
+    def _resolve(found: dict, text: str) -> dict:
+        verb = found['verb']
+        intent = verb
+        mask = found['mask']
+        if verb == 'unmask':
+            intent, mask = 'mask', 'm0'
+        elif verb == 'mask' or (verb is None and mask is not None):
+            intent = 'mask'
+            if mask is None and found['color'] == 'black':
+                mask = 'm3'  # "tapa con negro"
+        elif verb in (None, 'search'):
+            if found['face'] is not None:
+                intent = 'find_face'
+            elif found['object'] is not None:
+                intent = 'search'
+            elif found['mode'] is not None:
+                intent = 'mode'
+            else:
+                intent = 'unknown'
+        if intent == 'mask' and mask is None:
+            mask = 'm4'  # "enmascara" sin método: emoji por defecto
+        return {
+            'intent': intent,
+            'object': found['object'],
+            'color': found['color'],
+            'mask': mask,
+            'mode': found['mode'],
+            'face': found['face'],
+            'text': text,
+        }
+
+
+# Nombres en español para las respuestas
+MASK_NAMES = {'m0': 'sin enmascarar', 'm1': 'desenfoque', 'm2': 'pixelado', 'm3': 'caja negra', 'm4': 'emoji'}
+COLOR_NAMES = {color: words[0] for color, words in COLORS.items()}
+
+
+class CommandDispatcher:
+    """Ejecuta las intenciones sobre los setters de VideoController"""
+
+    def __init__(self, controller, parser: Optional[IntentParser] = None):
+        self.controller = controller
+        self.parser = parser
+        self._names_key = None
+
+    def _ensure_parser(self):
+        """Compila la gramática con model.names en cuanto el modelo está disponible"""
+        names = self.controller.get_class_names()
+        key = tuple(sorted(names.values())) if names else None
+        if self.parser is None or (key is not None and key != self._names_key):
+            aliases = self.parser.face_aliases.values() if self.parser else ()
+            self.parser = IntentParser(key, aliases)
+            self._names_key = key
+        return self.parser
+
+    def set_face_aliases(self, aliases: Iterable[str]):
+        self._ensure_parser().set_face_aliases(aliases)
+
+    def handle(self, text: str) -> str:
+        intent = self._ensure_parser().parse(text)
+        logger.debug(f"Intención: {intent}")
+        handler = getattr(self, f"_on_{intent['intent']}", None)
+        if handler is None:
+            return f"No entendí el comando: {text}"
+        try:
+            return handler(intent)
+        except ValueError as e:
+            return str(e)
+
+    def _on_start(self, intent):
+        if self.controller.start_video():
+            return "Video iniciado"
+        return "No se pudo iniciar el video"
+
+    def _on_stop(self, intent):
+        self.controller.stop_video()
+        return "Video detenido"
+
+    def _on_search(self, intent):
+        self.controller.set_detection_mode('object')
+        self.controller.set_target_object(intent['object'])
+        self.controller.set_target_color(intent['color'])
+        color = f" {COLOR_NAMES[intent['color']]}" if intent['color'] else ""
+        return f"Buscando {intent['object']}{color}"
+
+    def _on_find_face(self, intent):
+        self.controller.set_detection_mode('recognize')
+        self.controller.set_target_face(intent['face'])
+        return f"Buscando a {intent['face']}"
+
+    def _on_mode(self, intent):
+        self.controller.set_detection_mode(intent['mode'])
+        return {'face': "Modo rostros", 'recognize': "Modo reconocimiento de rostros"}.get(
+            intent['mode'], "Modo objetos")
+
+    def _on_mask(self, intent):
+        self.controller.set_detection_mode('face')
+        self.controller.set_mask_method(intent['mask'])
+        return f"Enmascarando con {MASK_NAMES[intent['mask']]}" if intent['mask'] != 'm0' \
+            else "Rostros sin enmascarar"
+
+    def _on_clear(self, intent):
+        self.controller.set_target_object(None)
+        self.controller.set_target_color(None)
+        self.controller.set_target_face(None)
+        return "Búsqueda cancelada"
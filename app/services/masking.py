@@ -0,0 +1,77 @@
+# app/services/masking.py
+from pathlib import Path
+from typing import Optional, Sequence
+
+import cv2
+import numpy as np
+
+from app.services.emoji_overlay import EmojiOverlay, DEFAULT_EMOJI_DIR
+
+MASK_METHODS = ('m0', 'm1', 'm2', 'm3', 'm4')
+
+
+class MaskingEngine:
+    """Enmascara todos los rostros de un frame en una pasada, escribiendo in-place
+
+    - m1: desenfoque sobre una versión reducida de tamaño fijo que luego se
+      amplía sobre la región, así el costo del filtro no crece con el rostro.
+    - m2: pixelado reduciendo a `pixel_blocks` bloques y ampliando in-place.
+    - m3: caja negra por asignación de slice.
+    - m4: emoji con mezcla alfa desde una pirámide precalculada (EmojiOverlay).
+    """
+
+    def __init__(self, emoji_dir: Path = DEFAULT_EMOJI_DIR, pixel_blocks: int = 16,
+                 blur_size: int = 16):
+        self.pixel_blocks = pixel_blocks
+        self.blur_size = blur_size
+        # Buffers reutilizados entre rostros y frames
+        self._small = np.empty((blur_size, blur_size, 3), dtype=np.uint8)
+        self._blocks = np.empty((pixel_blocks, pixel_blocks, 3), dtype=np.uint8)
+        self.emoji_overlay = EmojiOverlay(emoji_dir)
+
+    def apply(self, frame: np.ndarray, boxes: np.ndarray, method: str,
+              emojis: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Aplica el método a todas las cajas (N, 4) del frame y lo retorna
+
+        Con m4, `emojis` permite elegir un emoji distinto por caja.
+        """
+        if method == 'm0' or not len(boxes):
+            return frame
+        h, w = frame.shape[:2]
+        boxes = np.array(boxes, dtype=np.int32).reshape(-1, 4)
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+        valid = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+        boxes = boxes[valid]
+
+        if method == 'm3':
+            for x1, y1, x2, y2 in boxes:
+                frame[y1:y2, x1:x2] = 0
+        elif method == 'm1':
+            for x1, y1, x2, y2 in boxes:
+                self._blur(frame[y1:y2, x1:x2])
+        elif method == 'm2':
+            for x1, y1, x2, y2 in boxes:
+                self._pixelate(frame[y1:y2, x1:x2])
+        elif method == 'm4':
+            if not self.emoji_overlay.available:
+                return self.apply(frame, boxes, 'm3')
+            if emojis is not None:
+                emojis = [name for name, keep in zip(emojis, valid) if keep]
+            self.emoji_overlay.apply(frame, boxes, emojis)
+        else:
+            raise ValueError("Método de enmascaramiento no válido")
+        return frame
+
+    def _blur(self, roi: np.ndarray):
+        cv2.resize(roi, (self.blur_size, self.blur_size), dst=self._small,
+                   interpolation=cv2.INTER_LINEAR)
+        cv2.GaussianBlur(self._small, (5, 5), 0, dst=self._small)
+        cv2.resize(self._small, (roi.shape[1], roi.shape[0]), dst=roi,
+                   interpolation=cv2.INTER_LINEAR)
+
+    def _pixelate(self, roi: np.ndarray):
+        cv2.resize(roi, (self.pixel_blocks, self.pixel_blocks), dst=self._blocks,
+                   interpolation=cv2.INTER_LINEAR)
+        cv2.resize(self._blocks, (roi.shape[1], roi.shape[0]), dst=roi,
+                   interpolation=cv2.INTER_NEAREST)
@@ -0,0 +1,156 @@
+# app/services/model_registry.py
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("nova.vision")
+
+OBJECT_MODEL_PATH = 'assets/models/yolov8n.pt'
+FACE_MODEL_PATH = 'assets/models/yolov8-face.pt'
+
+
+def _rss_bytes() -> int:
+    """Memoria residente actual del proceso (0 si no está disponible)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return 0
+
+
+class SharedModel:
+    """Modelo YOLO compartido entre servicios con predict serializado"""
+
+    def __init__(self, model, key: Tuple[str, Optional[str]]):
+        self._model = model
+        self._lock = threading.Lock()
+        self.key = key
+
+    def predict(self, *args, **kwargs):
+        with self._lock:
+            return self._model.predict(*args, **kwargs)
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            return self._model(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+class ModelRegistry:
+    """Registro de modelos del proceso, indexado por (ruta de pesos, dispositivo)
+
+    Los modelos se cargan en el primer uso, se comparten entre servicios y
+    se calientan en segundo plano con una imagen vacía.
+    """
+
+    def __init__(self, warmup_size: int = 640):
+        self.warmup_size = warmup_size
+        self._models: Dict[tuple, SharedModel] = {}
+        self._key_locks: Dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[tuple, dict] = {}
+
+    def get(self, weights: str, device: Optional[str] = None, warmup: bool = True) -> SharedModel:
+        """Retorna el modelo, cargándolo si es la primera vez que se pide"""
+        key = (str(weights), device)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._models:
+                self._models[key] = self._load(key)
+                if warmup:
+                    self._start_warmup(key)
+            return self._models[key]
+
+    def preload(self, weights: str, device: Optional[str] = None):
+        """Carga y calienta el modelo en segundo plano"""
+        def load():
+            try:
+                self.get(weights, device)
+            except Exception:
+                pass  # Ya registrado en _load; el próximo get() lo reintenta
+
+        threading.Thread(
+            target=load, daemon=True,
+            name=f"ModelPreload-{os.path.basename(str(weights))}"
+        ).start()
+
+    def is_loaded(self, weights: str, device: Optional[str] = None) -> bool:
+        return (str(weights), device) in self._models
+
+    def unload(self, weights: str, device: Optional[str] = None):
+        key = (str(weights), device)
+        with self._lock:
+            self._models.pop(key, None)
+            self._stats.pop(key, None)
+
+    def stats(self) -> Dict[str, dict]:
+        """Tiempo de carga/calentamiento y memoria por modelo"""
+        return {f"{weights}@{device or 'auto'}": dict(info)
+                for (weights, device), info in self._stats.items()}
+
+    def _load(self, key: tuple) -> SharedModel:
+        weights, device = key
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        try:
+            from ultralytics import YOLO
+            model = YOLO(weights)
+            if device is not None:
+                model.to(device)
+                model.overrides['device'] = device
+        except Exception as e:
+            logger.error(f"Error al cargar modelo {weights}: {str(e)}")
+            raise
+        load_time = time.perf_counter() - start
+        self._stats[key] = {
+            'load_time_s': round(load_time, 3),
+            'warmup_time_s': None,
+            'params_mb': round(self._param_bytes(model) / 2**20, 2),
+            'rss_delta_mb': round(max(_rss_bytes() - rss_before, 0) / 2**20, 2),
+        }
+        logger.info(f"Modelo {weights} cargado en {load_time:.2f}s ({self._stats[key]['params_mb']} MB)")
+        return SharedModel(model, key)
+
+    @staticmethod
+    def _param_bytes(model) -> int:
+        try:
+            return sum(p.numel() * p.element_size() for p in model.model.parameters())
+        except Exception:
+            return 0
+
+    def _start_warmup(self, key: tuple):
+        threading.Thread(target=self._warmup, args=(key,), daemon=True,
+                         name=f"ModelWarmup-{os.path.basename(key[0])}").start()
+
+    def _warmup(self, key: tuple):
+        model = self._models.get(key)
+        if model is None:
+            return
+        dummy = np.zeros((self.warmup_size, self.warmup_size, 3), dtype=np.uint8)
+        start = time.perf_counter()
+        try:
+            model.predict(source=dummy, save=False, verbose=False)
+        except Exception as e:
+            logger.warning(f"Calentamiento fallido para {key[0]}: {str(e)}")
+            return
+        self._stats[key]['warmup_time_s'] = round(time.perf_counter() - start, 3)
+        logger.debug(f"Modelo {key[0]} calentado en {self._stats[key]['warmup_time_s']}s")
+
+
+# Registro global del proceso
+model_registry = ModelRegistry()
@@ -0,0 +1,56 @@
+# app/services/motion_gate.py
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Decide si un frame cambió lo suficiente como para volver a detectar
+
+    Compara una versión reducida en escala de grises del frame con la del
+    último frame en que se ejecutó el detector. Si la fracción de píxeles
+    que cambiaron es menor que `threshold`, se reutilizan las cajas
+    anteriores. Cada `force_every` frames se fuerza una detección completa.
+    """
+
+    def __init__(self, threshold: float = 0.02, pixel_delta: int = 12,
+                 size: tuple = (64, 48), force_every: int = 15):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.size = size
+        self.force_every = force_every
+        self._reference = None
+        self._since_detection = 0
+        self.checks = 0
+        self.skipped = 0
+        self.last_change = 1.0
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def should_detect(self, frame: np.ndarray) -> bool:
+        """Retorna True si hay que ejecutar el detector sobre este frame"""
+        self.checks += 1
+        thumb = self._thumbnail(frame)
+        if self._reference is None or self._since_detection + 1 >= self.force_every:
+            self.last_change = 1.0
+        else:
+            diff = cv2.absdiff(thumb, self._reference)
+            self.last_change = np.count_nonzero(diff > self.pixel_delta) / diff.size
+        if self.last_change < self.threshold:
+            self._since_detection += 1
+            self.skipped += 1
+            return False
+        self._reference = thumb
+        self._since_detection = 0
+        return True
+
+    def reset(self):
+        self._reference = None
+        self._since_detection = 0
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.skipped / self.checks if self.checks else 0.0
@@ -0,0 +1,211 @@
+# app/services/object_tracker.py
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger("nova.vision")
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU entre cada caja de `a` (N, 4) y cada caja de `b` (M, 4)"""
+    if not len(a) or not len(b):
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    a = a.astype(np.float32)[:, None, :]
+    b = b.astype(np.float32)[None, :, :]
+    iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+
+def greedy_match(scores: np.ndarray, threshold: float):
+    """Asignación greedy por mayor puntaje; retorna pares (fila, columna)"""
+    if not scores.size:
+        return []
+    rows, cols = np.nonzero(scores >= threshold)
+    order = np.argsort(-scores[rows, cols], kind='stable')
+    used_rows, used_cols, pairs = set(), set(), []
+    for r, c in zip(rows[order], cols[order]):
+        if r not in used_rows and c not in used_cols:
+            used_rows.add(r)
+            used_cols.add(c)
+            pairs.append((int(r), int(c)))
+    return pairs
+
+
+class ObjectTracker:
+    """Tracker multiobjeto estilo ByteTrack implementado con NumPy
+
+    El estado de los tracks vive en arreglos compactos (una fila por track).
+    Cada actualización predice las cajas con velocidad constante, asocia
+    primero las detecciones de alta confianza y luego las de baja confianza
+    con los tracks que quedaron libres, y crea tracks nuevos solo a partir
+    de detecciones de alta confianza. Los eventos 'enter' y 'leave' se
+    notifican a los listeners registrados. update() corre en el hilo de
+    inferencia y active_tracks() en cualquier otro: ambos toman un lock.
+    """
+
+    def __init__(self, high_thresh: float = 0.5, low_thresh: float = 0.1,
+                 match_iou: float = 0.3, low_match_iou: float = 0.5,
+                 min_hits: int = 2, max_age: float = 1.5):
+        self.high_thresh = high_thresh
+        self.low_thresh = low_thresh
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.min_hits = min_hits
+        self.max_age = max_age  # segundos sin verse antes de descartar el track
+        self._next_id = 1
+        self._listeners: List[Callable[[dict], None]] = []
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.boxes = np.empty((0, 4), dtype=np.float32)
+        self.velocity = np.empty((0, 4), dtype=np.float32)
+        self.classes = np.empty(0, dtype=np.int32)
+        self.scores = np.empty(0, dtype=np.float32)
+        self.first_seen = np.empty(0, dtype=np.float64)
+        self.last_seen = np.empty(0, dtype=np.float64)
+        self.hits = np.empty(0, dtype=np.int32)
+        self.confirmed = np.empty(0, dtype=bool)
+
+    def add_listener(self, callback: Callable[[dict], None]):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[dict], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def update(self, boxes: np.ndarray, classes: np.ndarray, scores: np.ndarray,
+               timestamp: Optional[float] = None) -> np.ndarray:
+        """Asocia las detecciones de un frame; retorna el id de track por detección (-1 si no tiene)"""
+        now = time.time() if timestamp is None else timestamp
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        classes = np.asarray(classes, dtype=np.int32)
+        scores = np.asarray(scores, dtype=np.float32)
+        with self._lock:
+            det_ids, events = self._update(boxes, classes, scores, now)
+        self._dispatch(events)  # Fuera del lock: un listener puede consultar active_tracks()
+        return det_ids
+
+    def _update(self, boxes: np.ndarray, classes: np.ndarray, scores: np.ndarray, now: float):
+        det_ids = np.full(len(boxes), -1, dtype=np.int64)
+
+        predicted = self.boxes + self.velocity
+        # Solo se asocian cajas de la misma clase
+        same_class = self.classes[:, None] == classes[None, :]
+        iou = iou_matrix(predicted, boxes) * same_class
+
+        high = np.flatnonzero(scores >= self.high_thresh)
+        low = np.flatnonzero((scores >= self.low_thresh) & (scores < self.high_thresh))
+        matched_tracks, matched_dets = [], []
+        for t, d in greedy_match(iou[:, high], self.match_iou):
+            matched_tracks.append(t)
+            matched_dets.append(high[d])
+        free_tracks = np.setdiff1d(np.arange(len(self.ids)), matched_tracks)
+        for t, d in greedy_match(iou[np.ix_(free_tracks, low)], self.low_match_iou):
+            matched_tracks.append(free_tracks[t])
+            matched_dets.append(low[d])
+
+        events = []
+        if matched_tracks:
+            t = np.asarray(matched_tracks)
+            d = np.asarray(matched_dets)
+            self.velocity[t] = 0.5 * self.velocity[t] + 0.5 * (boxes[d] - self.boxes[t])
+            self.boxes[t] = boxes[d]
+            self.scores[t] = scores[d]
+            self.last_seen[t] = now
+            self.hits[t] += 1
+            newly = t[~self.confirmed[t] & (self.hits[t] >= self.min_hits)]
+            self.confirmed[newly] = True
+            events += [self._event('enter', i, now) for i in newly]
+            det_ids[d] = np.where(self.confirmed[t], self.ids[t], -1)
+
+        # Tracks no asociados: avanzan con su velocidad hasta expirar; los
+        # tentativos (aún sin confirmar) se descartan en cuanto fallan una asociación
+        unmatched = np.setdiff1d(np.arange(len(self.ids)), matched_tracks)
+        self.boxes[unmatched] = predicted[unmatched]
+        expired = unmatched[(now - self.last_seen[unmatched] > self.max_age) | ~self.confirmed[unmatched]]
+        events += [self._event('leave', i, now) for i in expired if self.confirmed[i]]
+        if len(expired):
+            self._keep(np.setdiff1d(np.arange(len(self.ids)), expired))
+
+        new = np.setdiff1d(high, matched_dets)
+        if len(new):
+            ids = np.arange(self._next_id, self._next_id + len(new))
+            self._next_id += len(new)
+            self._append(ids, boxes[new], classes[new], scores[new], now)
+            if self.min_hits <= 1:
+                rows = np.arange(len(self.ids) - len(new), len(self.ids))
+                self.confirmed[rows] = True
+                events += [self._event('enter', i, now) for i in rows]
+                det_ids[new] = ids
+        return det_ids, events
+
+    def active_tracks(self, now: Optional[float] = None) -> List[dict]:
+        """Tracks confirmados con su id, clase, caja, edad y última vez visto"""
+        now = time.time() if now is None else now
+        with self._lock:
+            return [self._describe(i, now) for i in np.flatnonzero(self.confirmed)]
+
+    def _describe(self, i: int, now: float) -> dict:
+        return {
+            'track_id': int(self.ids[i]),
+            'class_id': int(self.classes[i]),
+            'box': self.boxes[i].round().astype(int).tolist(),
+            'score': float(self.scores[i]),
+            'age': now - float(self.first_seen[i]),
+            'first_seen': float(self.first_seen[i]),
+            'last_seen': float(self.last_seen[i]),
+            'hits': int(self.hits[i]),
+        }
+
+    def _event(self, kind: str, i: int, now: float) -> dict:
+        event = self._describe(i, now)
+        event['type'] = kind
+        event['timestamp'] = now
+        return event
+
+    def _dispatch(self, events: List[dict]):
+        for event in events:
+            for callback in self._listeners:
+                try:
+                    callback(event)
+                except Exception as e:
+                    logger.error(f"Error en listener de tracks: {str(e)}", exc_info=True)
+
+    def _append(self, ids, boxes, classes, scores, now):
+        n = len(ids)
+        self.ids = np.concatenate([self.ids, ids])
+        self.boxes = np.concatenate([self.boxes, boxes])
+        self.velocity = np.concatenate([self.velocity, np.zeros((n, 4), dtype=np.float32)])
+        self.classes = np.concatenate([self.classes, classes])
+        self.scores = np.concatenate([self.scores, scores])
+        self.first_seen = np.concatenate([self.first_seen, np.full(n, now)])
+        self.last_seen = np.concatenate([self.last_seen, np.full(n, now)])
+        self.hits = np.concatenate([self.hits, np.ones(n, dtype=np.int32)])
+        self.confirmed = np.concatenate([self.confirmed, np.zeros(n, dtype=bool)])
+
+    def _keep(self, rows: np.ndarray):
+        self.ids = self.ids[rows]
+        self.boxes = self.boxes[rows]
+        self.velocity = self.velocity[rows]
+        self.classes = self.classes[rows]
+        self.scores = self.scores[rows]
+        self.first_seen = self.first_seen[rows]
+        self.last_seen = self.last_seen[rows]
+        self.hits = self.hits[rows]
+        self.confirmed = self.confirmed[rows]
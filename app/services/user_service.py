@@ -1,6 +1,7 @@
 # app/services/user_service.py
 import logging
 from psycopg2 import DatabaseError
+from app.utils.query_cache import query_cache, listen_from_env
 
 logger = logging.getLogger("nova.user")
 
@@ -8,59 +9,38 @@ class UserService:
     def __init__(self, db):
         self.db = db
         self.logger = logger
+        listen_from_env(db)
     
     def list_users(self):
         """Lista todos los usuarios"""
         users = []
         try:
-            conn = self.db.get_connection()
-            if not conn:
-                self.logger.error("No hay conexión a la base de datos")
-                return users
-                
-            cursor = None
-            try:
-                cursor = conn.cursor()
-                cursor.execute("SELECT id, username, perfil FROM users ORDER BY id")
-                users = [{'id': row[0], 'username': row[1], 'profile': row[2]} for row in cursor.fetchall()]
-            except DatabaseError as e:
-                self.logger.error(f"Error al listar usuarios: {str(e)}")
-                conn.rollback()
-            finally:
-                if cursor:
-                    cursor.close()
-                self.db.release_connection(conn)
-                
+            users = query_cache.get_or_load(('list_users',), ('users',), self._load_users)
+        except (DatabaseError, ConnectionError) as e:
+            self.logger.error(f"Error al listar usuarios: {str(e)}")
         except Exception as e:
             self.logger.error(f"Error inesperado al listar usuarios: {str(e)}", exc_info=True)
         
         return users
     
+    def _load_users(self):
+        with self.db.unit_of_work('list_users', autocommit=True) as uow:
+            rows = uow.fetchall("SELECT id, username, perfil FROM users ORDER BY id")
+        return [{'id': row[0], 'username': row[1], 'profile': row[2]} for row in rows]
+    
     def add_user(self, username: str, password: str, profile: int) -> bool:
         """Agrega un nuevo usuario"""
         try:
-            conn = self.db.get_connection()
-            if not conn:
-                self.logger.error("No hay conexión a la base de datos")
-                return False
-                
-            cursor = None
-            try:
-                cursor = conn.cursor()
-                cursor.execute(
+            # Una sola sentencia: es atómica sin abrir transacción
+            with self.db.unit_of_work('add_user', autocommit=True) as uow:
+                uow.execute(
                     "INSERT INTO users (username, password, perfil) VALUES (%s, crypt(%s, gen_salt('bf')), %s)",
                     (username, password, profile))
-                conn.commit()
-                return True
-            except DatabaseError as e:
-                self.logger.error(f"Error al agregar usuario: {str(e)}")
-                conn.rollback()
-                return False
-            finally:
-                if cursor:
-                    cursor.close()
-                self.db.release_connection(conn)
-                
+            query_cache.invalidate('users')
+            return True
+        except (DatabaseError, ConnectionError) as e:
+            self.logger.error(f"Error al agregar usuario: {str(e)}")
+            return False
         except Exception as e:
             self.logger.error(f"Error inesperado al agregar usuario: {str(e)}", exc_info=True)
             return False
@@ -68,33 +48,21 @@ class UserService:
     def update_user(self, user_id: int, username: str, password: str = None, profile: int = None) -> bool:
         """Actualiza un usuario existente"""
         try:
-            conn = self.db.get_connection()
-            if not conn:
-                self.logger.error("No hay conexión a la base de datos")
-                return False
-                
-            cursor = None
-            try:
-                cursor = conn.cursor()
+            with self.db.unit_of_work('update_user', autocommit=True) as uow:
                 if password:
-                    cursor.execute(
+                    uow.execute(
                         "UPDATE users SET username = %s, password = crypt(%s, gen_salt('bf')), perfil = %s WHERE id = %s",
                         (username, password, profile, user_id))
                 else:
-                    cursor.execute(
+                    uow.execute(
                         "UPDATE users SET username = %s, perfil = %s WHERE id = %s",
                         (username, profile, user_id))
-                conn.commit()
-                return cursor.rowcount > 0
-            except DatabaseError as e:
-                self.logger.error(f"Error al actualizar usuario: {str(e)}")
-                conn.rollback()
-                return False
-            finally:
-                if cursor:
-                    cursor.close()
-                self.db.release_connection(conn)
-                
+                updated = uow.rowcount > 0
+            query_cache.invalidate('users')
+            return updated
+        except (DatabaseError, ConnectionError) as e:
+            self.logger.error(f"Error al actualizar usuario: {str(e)}")
+            return False
         except Exception as e:
             self.logger.error(f"Error inesperado al actualizar usuario: {str(e)}", exc_info=True)
             return False
@@ -102,26 +70,14 @@ class UserService:
     def delete_user(self, user_id: int) -> bool:
         """Elimina un usuario"""
         try:
-            conn = self.db.get_connection()
-            if not conn:
-                self.logger.error("No hay conexión a la base de datos")
-                return False
-                
-            cursor = None
-            try:
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
-                conn.commit()
-                return cursor.rowcount > 0
-            except DatabaseError as e:
-                self.logger.error(f"Error al eliminar usuario: {str(e)}")
-                conn.rollback()
-                return False
-            finally:
-                if cursor:
-                    cursor.close()
-                self.db.release_connection(conn)
-                
+            with self.db.unit_of_work('delete_user', autocommit=True) as uow:
+                uow.execute("DELETE FROM users WHERE id = %s", (user_id,))
+                deleted = uow.rowcount > 0
+            query_cache.invalidate('users')
+            return deleted
+        except (DatabaseError, ConnectionError) as e:
+            self.logger.error(f"Error al eliminar usuario: {str(e)}")
+            return False
         except Exception as e:
             self.logger.error(f"Error inesperado al eliminar usuario: {str(e)}", exc_info=True)
-            return False
\ No newline at end of file
+            return False
@@ -1,36 +1,118 @@
 # app/services/video_service.py
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import threading
-import pyttsx3
-import speech_recognition as sr
+import time
 from typing import List, Tuple, Optional, Callable
 import os
-from pathlib import Path
+import logging
+from app.utils.ring_buffer import RingBuffer, StageCounter
+from app.utils.metrics import MetricsRegistry, MetricsReporter, MetricsHTTPServer
+from app.services.frame_source import create_source
+from app.services.masking import MaskingEngine, MASK_METHODS
+from app.services.motion_gate import MotionGate
+from app.services.box_tracker import BoxPropagator, DetectionScheduler
+from app.services.object_tracker import ObjectTracker
+from app.services.model_registry import model_registry, OBJECT_MODEL_PATH, FACE_MODEL_PATH
+from app.services.voice_service import VoiceWorker
+from app.services.color_filter import COLOR_RANGES, matches_color
+from app.services.face_recognition import FaceRecognizer
+from app.services.embedding_store import get_embedding_store
+from app.services.gallery_sync import GallerySync
+
+logger = logging.getLogger("nova.vision")
+
+# Paleta BGR para dibujar cajas por clase
+CLASS_COLORS = [
+    (56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+    (10, 249, 72), (23, 204, 146), (134, 219, 61), (211, 188, 0), (209, 85, 0),
+    (255, 194, 0), (147, 69, 52), (255, 115, 100), (236, 24, 0), (255, 56, 132),
+]
 
 class VideoService:
-    def __init__(self):
+    def __init__(self, inference_server=None, stream_id: Optional[str] = None,
+                 device: Optional[str] = None):
         self.camera = None
         self.window_active = False
         self.detected_objects = []
-        self.model = YOLO('assets/models/yolov8n.pt')
-        self.face_model = YOLO('assets/models/yolov8-face.pt')
-        self.detection_mode = 'object'  # 'object' o 'face'
+        # Con un servidor compartido, varias cámaras usan un solo modelo en lotes
+        self.inference_server = inference_server
+        self.stream_id = stream_id or f"stream-{id(self):x}"
+        self.device = device
+        if inference_server is None:
+            model_registry.preload(OBJECT_MODEL_PATH, device)
+        else:
+            inference_server.preload()
+        self.detection_mode = 'object'  # 'object', 'face' o 'recognize'
         self.target_object = None
+        self.target_color = None  # Filtra el objeto buscado por color dominante
+        self.target_face = None  # Alias de un rostro conocido a buscar
         self._mask_method = 'm0'  # Usando property ahora
-        self.listening = False
-        self.recognizer = sr.Recognizer()
-        self.voice_engine = pyttsx3.init()
+        self.motion_gating = True
+        self.motion_gate = MotionGate()
+        self.face_boxes = np.empty((0, 4), dtype=np.int32)
+        self.face_confs = np.empty(0, dtype=np.float32)
+        # Detección cada N frames (N adaptativo) con seguimiento intermedio
+        self._object_scheduler = DetectionScheduler()
+        self._face_scheduler = DetectionScheduler()
+        self._object_propagator = BoxPropagator()
+        self._face_propagator = BoxPropagator()
+        self.object_boxes = np.empty((0, 4), dtype=np.int32)
+        self.object_classes = np.empty(0, dtype=np.int32)
+        self.object_confs = np.empty(0, dtype=np.float32)
+        # Identidades persistentes sobre las cajas de YOLO
+        self.object_tracker = ObjectTracker()
+        self.object_track_ids = np.empty(0, dtype=np.int64)
+        # Reconocimiento: ids de track por rostro y un embedding por track
+        self.face_tracker = ObjectTracker(high_thresh=0.3, min_hits=1)
+        self.face_track_ids = np.empty(0, dtype=np.int64)
+        self.face_recognizer = FaceRecognizer()
+        self.recognized_faces: List[dict] = []
+        self.gallery_sync = None  # Requiere BD: ver set_gallery_db
+        # Persistencia de detecciones en lotes fuera del bucle de frames
+        self.event_sink = None
+        self.event_user = None
+        # Voz en hilos propios: ni la UI ni el pipeline esperan al audio
+        self.voice = VoiceWorker()
         self.frame_callback = None
-        self._load_emoji()  # Precargar recursos
+        # Pipeline desacoplado: buffers acotados que descartan lo más antiguo
+        self._capture_buffer = RingBuffer(capacity=2)
+        self._render_buffer = RingBuffer(capacity=2)
+        self._stage_counters = {
+            'capture': StageCounter(),
+            'inference': StageCounter(),
+            'render': StageCounter(),
+        }
+        self._threads = []
+        self._capture_done = threading.Event()
+        self._inference_done = threading.Event()
+        self._lossless = False
+        self.source_spec = 0  # Webcam por defecto
+        self.masking_engine = MaskingEngine()  # Precarga el emoji
+        # Instrumentación del camino crítico por frame
+        self.metrics = MetricsRegistry()
+        self._register_gauges()
+        self.metrics_reporter = MetricsReporter(
+            self.metrics, interval=float(os.getenv("NOVA_METRICS_INTERVAL", "30")), logger=logger)
+        self.metrics_server = None
+        if os.getenv("NOVA_METRICS_PORT"):
+            self.start_metrics_endpoint(int(os.getenv("NOVA_METRICS_PORT")))
 
-    def _load_emoji(self):
-        """Precarga el emoji para enmascaramiento"""
-        self.emoji = None
-        emoji_path = Path("assets/emojis/default.png")
-        if emoji_path.exists():
-            self.emoji = cv2.imread(str(emoji_path))
+    @property
+    def model(self):
+        """Modelo de objetos compartido, cargado en el primer uso"""
+        if self.inference_server is not None:
+            return self.inference_server.model
+        return model_registry.get(OBJECT_MODEL_PATH, self.device)
+
+    @property
+    def face_model(self):
+        """Modelo de rostros compartido, cargado solo si se usa el modo rostro"""
+        return model_registry.get(FACE_MODEL_PATH, self.device)
+
+    @property
+    def listening(self) -> bool:
+        return self.voice.listening
 
     @property
     def mask_method(self):
@@ -38,7 +120,7 @@ class VideoService:
 
     @mask_method.setter
     def mask_method(self, value):
-        if value in ['m0', 'm1', 'm2', 'm3', 'm4']:
+        if value in MASK_METHODS:
             self._mask_method = value
         else:
             raise ValueError("Método de enmascaramiento no válido")
@@ -47,148 +129,463 @@ class VideoService:
         self.frame_callback = callback
 
     def set_detection_mode(self, mode: str):
-        if mode in ['object', 'face']:
+        if mode in ['object', 'face', 'recognize']:
             self.detection_mode = mode
+            self._object_scheduler.reset()
+            self._face_scheduler.reset()
+            # Cajas e ids de la sesión anterior no se mezclan con las nuevas: el
+            # primer frame del nuevo modo siempre detecta
+            self.motion_gate.reset()
+            self.face_boxes = np.empty((0, 4), dtype=np.int32)
+            self.face_confs = np.empty(0, dtype=np.float32)
+            self.face_track_ids = np.empty(0, dtype=np.int64)
+            self.recognized_faces = []
+            if mode in ('face', 'recognize'):
+                model_registry.preload(FACE_MODEL_PATH, self.device)
+            if mode == 'recognize':
+                self.face_tracker.reset()
+                self.face_recognizer.reset()
+                self.face_recognizer.preload()
+                if self.gallery_sync:
+                    self.gallery_sync.start()
+            elif self.gallery_sync:
+                self.gallery_sync.stop()
         else:
             raise ValueError("Modo de detección no válido")
 
-    def set_target_object(self, object_name: str):
+    def set_target_object(self, object_name: Optional[str]):
         self.target_object = object_name
 
-    def start_camera(self) -> bool:
+    def set_target_color(self, color: Optional[str]):
+        if color is not None and color not in COLOR_RANGES:
+            raise ValueError(f"Color no soportado: {color}")
+        self.target_color = color
+
+    def set_target_face(self, alias: Optional[str]):
+        self.target_face = alias
+
+    def set_gallery_db(self, db, on_change: Optional[Callable[[dict], None]] = None):
+        """Sincroniza la galería con buscar_rostro/imagen mientras se reconocen rostros"""
+        if self.gallery_sync:
+            self.gallery_sync.stop()
+        self.gallery_sync = GallerySync(db)
+        self.gallery_sync.on_change = on_change
+        if self.detection_mode == 'recognize':
+            self.gallery_sync.start()
+
+    def set_event_sink(self, sink, user: Optional[str] = None):
+        """Registra cada detección (ver event_sink.DetectionEventSink) atribuida a `user`"""
+        if self.event_sink is not None and self.event_sink is not sink:
+            self.event_sink.stop()
+        self.event_sink = sink
+        self.event_user = user
+        if sink is not None and self.window_active:
+            sink.start()
+
+    def _record_events(self, tipo: str, labels: List[str], boxes: np.ndarray, confs: np.ndarray,
+                       track_ids: Optional[np.ndarray] = None):
+        if self.event_sink is not None and len(labels):
+            self.event_sink.record(self.stream_id, tipo, labels, boxes, confs, track_ids, self.event_user)
+
+    def get_recognized_faces(self) -> List[dict]:
+        """Identidades de los rostros del último frame en modo 'recognize'"""
+        return list(self.recognized_faces)
+
+    def add_face_listener(self, callback: Callable[[dict], None]):
+        """Notifica cada vez que un track se identifica con un rostro registrado"""
+        self.face_recognizer.add_listener(callback)
+
+    def remove_face_listener(self, callback: Callable[[dict], None]):
+        self.face_recognizer.remove_listener(callback)
+
+    def get_face_aliases(self) -> List[str]:
+        """Alias de los rostros con embeddings en la galería"""
+        try:
+            return sorted(set(get_embedding_store().labels.values()))
+        except Exception as e:
+            logger.warning(f"No se pudo leer la galería de rostros: {str(e)}")
+            return []
+
+    def get_class_names(self) -> Optional[dict]:
+        """Clases del modelo de objetos, o None si aún no está cargado"""
+        if self.inference_server is not None:
+            return self.inference_server.names
+        if model_registry.is_loaded(OBJECT_MODEL_PATH, self.device):
+            return self.model.names
+        return None
+
+    def set_source(self, source):
+        """Define la fuente de frames: índice de webcam, URL, ruta o FrameSource"""
+        self.source_spec = source
+
+    def start_camera(self, source=None) -> bool:
+        if source is not None:
+            self.set_source(source)
+        if self.camera is not None and not self.window_active:
+            self.stop_camera()  # La fuente anterior ya terminó
         if self.camera is None or not self.camera.isOpened():
-            self.camera = cv2.VideoCapture(0)
-            if self.camera.isOpened():
+            self.camera = create_source(self.source_spec)
+            if self.camera.open():
                 self.window_active = True
-                threading.Thread(
-                    target=self._process_video, 
-                    daemon=True,
-                    name="VideoProcessingThread"
-                ).start()
+                self._lossless = self.camera.lossless
+                if self.inference_server is not None:
+                    self.inference_server.register_stream(self.stream_id)
+                self._capture_buffer.clear()
+                self._render_buffer.clear()
+                self._capture_done.clear()
+                self._inference_done.clear()
+                self.motion_gate.reset()
+                self._object_scheduler.reset()
+                self._face_scheduler.reset()
+                self.object_tracker.reset()
+                for counter in self._stage_counters.values():
+                    counter.reset()
+                self._threads = [
+                    threading.Thread(target=self._capture_loop, daemon=True, name="VideoCaptureThread"),
+                    threading.Thread(target=self._inference_loop, daemon=True, name="VideoInferenceThread"),
+                    threading.Thread(target=self._render_loop, daemon=True, name="VideoRenderThread"),
+                ]
+                for thread in self._threads:
+                    thread.start()
+                self.metrics_reporter.start()
+                if self.event_sink is not None:
+                    self.event_sink.start()
                 return True
+            self.camera.release()
+            self.camera = None
         return False
 
     def stop_camera(self):
         self.window_active = False
+        self.metrics_reporter.stop()
+        current = threading.current_thread()
+        for thread in self._threads:
+            if thread is not current:
+                thread.join(timeout=1.0)
+        self._threads = []
+        if self.inference_server is not None:
+            self.inference_server.unregister_stream(self.stream_id)
+        if self.event_sink is not None:
+            self.event_sink.stop()
         if self.camera:
             self.camera.release()
-            cv2.destroyAllWindows()
             self.camera = None
 
-    def _process_video(self):
+    def get_pipeline_stats(self) -> dict:
+        """Retorna FPS por etapa y profundidad/descartes de cada buffer"""
+        return {
+            'fps': {name: round(c.fps, 2) for name, c in self._stage_counters.items()},
+            'frames': {name: c.count for name, c in self._stage_counters.items()},
+            'detect_interval': {'object': self._object_scheduler.interval,
+                                'face': self._face_scheduler.interval},
+            'motion_gate': {'skip_ratio': round(self.motion_gate.skip_ratio, 3),
+                            'last_change': round(self.motion_gate.last_change, 4)},
+            'queues': {
+                'capture': {'depth': len(self._capture_buffer), 'dropped': self._capture_buffer.dropped},
+                'render': {'depth': len(self._render_buffer), 'dropped': self._render_buffer.dropped},
+            },
+        }
+
+    def _register_gauges(self):
+        for name, buffer in (('capture', self._capture_buffer), ('render', self._render_buffer)):
+            self.metrics.register_gauge(f"{name}_queue_depth", lambda b=buffer: len(b))
+            self.metrics.register_gauge(f"{name}_dropped_frames", lambda b=buffer: b.dropped)
+        for name, counter in self._stage_counters.items():
+            self.metrics.register_gauge(f"{name}_fps", lambda c=counter: round(c.fps, 2))
+
+    def get_metrics(self) -> dict:
+        """Resumen de latencias por etapa, contadores y gauges"""
+        return self.metrics.snapshot()
+
+    def start_metrics_endpoint(self, port: int = 9108, host: str = '127.0.0.1'):
+        """Expone /metrics (texto Prometheus) y /metrics.json en un puerto local"""
+        if self.metrics_server is None:
+            self.metrics_server = MetricsHTTPServer(self.metrics, port, host)
+            try:
+                self.metrics_server.start()
+            except OSError as e:
+                logger.error(f"No se pudo iniciar el endpoint de métricas: {str(e)}")
+                self.metrics_server = None
+        return self.metrics_server
+
+    def get_active_tracks(self) -> List[dict]:
+        """Objetos presentes con id estable, edad y última vez visto"""
+        tracks = self.object_tracker.active_tracks()
+        for track in tracks:
+            track['label'] = self.model.names[track['class_id']]
+        return tracks
+
+    def is_object_present(self, label: str) -> bool:
+        """Responde si hay un track activo de la clase indicada sin re-detectar"""
+        return any(t['label'] == label for t in self.get_active_tracks())
+
+    def add_track_listener(self, callback: Callable[[dict], None]):
+        """Registra un callback para los eventos 'enter'/'leave' de objetos
+
+        Se invoca desde el hilo de inferencia; el evento incluye 'label'.
+        """
+        def with_label(event: dict):
+            event['label'] = self.model.names[event['class_id']]
+            callback(event)
+        self.object_tracker.add_listener(with_label)
+
+    def get_model_stats(self) -> dict:
+        """Tiempo de carga y memoria de los modelos compartidos"""
+        return model_registry.stats()
+
+    # Etapas del pipeline: captura -> inferencia -> render
+    def _next_frame(self, buffer: RingBuffer) -> Optional[np.ndarray]:
+        """En tiempo real toma el frame más reciente; fuera de línea, todos en orden"""
+        if self._lossless:
+            return buffer.get(timeout=0.1)
+        return buffer.get_latest(timeout=0.1)
+
+    def _capture_loop(self):
+        """Lee frames de la fuente sin esperar a la inferencia"""
         try:
             while self.window_active:
-                ret, frame = self.camera.read()
+                with self.metrics.timer('capture'):
+                    ret, frame = self.camera.read()
                 if not ret:
                     break
-                
+                self._capture_buffer.put(frame, block=self._lossless, timeout=1.0)
+                self._stage_counters['capture'].tick()
+        except Exception as e:
+            logger.error(f"Error en hilo de captura: {str(e)}", exc_info=True)
+        finally:
+            self._capture_done.set()
+
+    def _inference_loop(self):
+        """Procesa siempre el frame capturado más reciente"""
+        try:
+            while self.window_active:
+                frame = self._next_frame(self._capture_buffer)
+                if frame is None:
+                    if self._capture_done.is_set() and not len(self._capture_buffer):
+                        break
+                    continue
+                try:
+                    with self.metrics.timer('process'):
+                        processed_frame = self.process_frame(frame)
+                except Exception as e:
+                    self.metrics.increment('frame_errors')
+                    logger.error(f"Error procesando frame: {str(e)}")
+                    continue
+                self._render_buffer.put(processed_frame, block=self._lossless, timeout=1.0)
+                self._stage_counters['inference'].tick()
+        finally:
+            self._inference_done.set()
+
+    def _render_loop(self):
+        """Entrega el frame procesado más reciente al callback"""
+        try:
+            while self.window_active:
+                frame = self._next_frame(self._render_buffer)
+                if frame is None:
+                    if self._inference_done.is_set() and not len(self._render_buffer):
+                        break
+                    continue
                 try:
-                    processed_frame = self._process_frame(frame)
                     if self.frame_callback:
-                        self.frame_callback(processed_frame)
+                        with self.metrics.timer('callback'):
+                            self.frame_callback(frame)
                 except Exception as e:
-                    print(f"Error procesando frame: {str(e)}")
+                    self.metrics.increment('callback_errors')
+                    logger.error(f"Error mostrando frame: {str(e)}")
                     continue
-                
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    self.stop_camera()
-                    break
+                self._stage_counters['render'].tick()
         except Exception as e:
-            print(f"Error en hilo de video: {str(e)}")
+            logger.error(f"Error en hilo de video: {str(e)}", exc_info=True)
+        finally:
+            # Fin de la fuente: el pipeline terminó de drenar
+            self.window_active = False
 
-    def _process_frame(self, frame: np.ndarray) -> np.ndarray:
+    def process_frame(self, frame: np.ndarray) -> np.ndarray:
+        """Detección, seguimiento y dibujo de un frame según el modo (lo usa el hilo de inferencia)"""
         if self.detection_mode == 'object':
             return self._detect_objects(frame)
+        if self.detection_mode == 'recognize':
+            return self._recognize_faces(frame)
         return self._detect_faces(frame)
 
+    def _predict_objects(self, frame: np.ndarray) -> list:
+        if self.inference_server is not None:
+            return [self.inference_server.infer(self.stream_id, frame)]
+        return self.model.predict(source=frame, save=False, verbose=False)
+
+    def _frame_period(self) -> float:
+        """Periodo nativo de la fuente, o el medido si no lo informa"""
+        fps = getattr(self.camera, 'fps', 0) or self._stage_counters['capture'].fps
+        return 1.0 / fps if fps > 0 else 1.0 / 30
+
+    def predict_object_boxes(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Ejecuta el detector de objetos y retorna (cajas, clases, confianzas)"""
+        start = time.perf_counter()
+        results = self._predict_objects(frame)
+        elapsed = time.perf_counter() - start
+        self._object_scheduler.record_latency(elapsed)
+        self._record_predict_speed(results[0], elapsed)
+        boxes = results[0].boxes
+        if not len(boxes):
+            return (np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.int32),
+                    np.empty(0, dtype=np.float32))
+        return (boxes.xyxy.cpu().numpy().astype(np.int32),
+                boxes.cls.cpu().numpy().astype(np.int32),
+                boxes.conf.cpu().numpy().astype(np.float32))
+
+    def _record_predict_speed(self, result, elapsed: float):
+        """Desglosa la inferencia con los tiempos que reporta ultralytics (ms)"""
+        self.metrics.observe('detect', elapsed)
+        speed = getattr(result, 'speed', None) or {}
+        for key, stage in (('preprocess', 'preprocess'), ('inference', 'predict'),
+                           ('postprocess', 'postprocess')):
+            if speed.get(key) is not None:
+                self.metrics.observe(stage, speed[key] / 1000)
+
     def _detect_objects(self, frame: np.ndarray) -> np.ndarray:
-        results = self.model.predict(source=frame, save=False, verbose=False)
-        self.detected_objects = []
-        
-        for r in results:
-            for box in r.boxes:
-                label = self.model.names[int(box.cls[0])]
-                self.detected_objects.append(label)
-                
-                if self.target_object and label == self.target_object:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 3)
-        
-        return results[0].plot()
+        # YOLO cada N frames; en los intermedios las cajas se propagan por flujo óptico
+        if self._object_scheduler.due(self._frame_period()):
+            boxes, self.object_classes, self.object_confs = self.predict_object_boxes(frame)
+            self._object_propagator.reset(frame, boxes)
+            self.object_track_ids = self.object_tracker.update(boxes, self.object_classes, self.object_confs)
+            self.detected_objects = [self.model.names[int(c)] for c in self.object_classes]
+            self._record_events('object', self.detected_objects, boxes, self.object_confs,
+                                self.object_track_ids)
+        else:
+            with self.metrics.timer('track'):
+                boxes = self._object_propagator.propagate(frame)
+        self.object_boxes = boxes
+        with self.metrics.timer('draw'):
+            return self._draw_objects(frame, boxes, self.object_classes, self.object_confs,
+                                      self.object_track_ids)
 
-    def _detect_faces(self, frame: np.ndarray) -> np.ndarray:
+    def _draw_objects(self, frame: np.ndarray, boxes: np.ndarray, classes: np.ndarray,
+                      confs: np.ndarray, track_ids: np.ndarray) -> np.ndarray:
+        for (x1, y1, x2, y2), cls, conf, track_id in zip(boxes, classes, confs, track_ids):
+            label = self.model.names[int(cls)]
+            text = f"{label} #{track_id} {conf:.2f}" if track_id >= 0 else f"{label} {conf:.2f}"
+            if self.target_object and label == self.target_object and (
+                    self.target_color is None or matches_color(frame, (x1, y1, x2, y2), self.target_color)):
+                color, thickness = (0, 0, 255), 3
+            else:
+                color, thickness = CLASS_COLORS[int(cls) % len(CLASS_COLORS)], 2
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness)
+            cv2.putText(frame, text, (x1, max(y1 - 6, 12)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
+        return frame
+
+    def predict_face_boxes(self, frame: np.ndarray) -> np.ndarray:
+        """Ejecuta el detector de rostros y retorna cajas (N, 4) enteras"""
+        start = time.perf_counter()
         results = self.face_model.predict(source=frame, save=False, verbose=False)
-        
-        for r in results:
-            for box in r.boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                face_roi = frame[y1:y2, x1:x2]
-                
-                if self.mask_method == 'm1':
-                    masked = self._apply_blur(face_roi)
-                elif self.mask_method == 'm2':
-                    masked = self._apply_pixelation(face_roi)
-                elif self.mask_method == 'm3':
-                    masked = self._apply_black_box(face_roi)
-                elif self.mask_method == 'm4':
-                    masked = self._apply_emoji(face_roi)
-                else:
-                    masked = face_roi  # Sin enmascaramiento
-                
-                frame[y1:y2, x1:x2] = masked
-        
+        elapsed = time.perf_counter() - start
+        self._face_scheduler.record_latency(elapsed)
+        self._record_predict_speed(results[0], elapsed)
+        boxes = [r.boxes.xyxy.cpu().numpy() for r in results if len(r.boxes)]
+        if not boxes:
+            self.face_confs = np.empty(0, dtype=np.float32)
+            return np.empty((0, 4), dtype=np.int32)
+        self.face_confs = np.concatenate([r.boxes.conf.cpu().numpy() for r in results
+                                          if len(r.boxes)]).astype(np.float32)
+        return np.concatenate(boxes).astype(np.int32)
+
+    def _detect_faces(self, frame: np.ndarray) -> np.ndarray:
+        # Escenas estáticas: se reutilizan las cajas si el frame casi no cambió
+        if self.motion_gating and not self.motion_gate.should_detect(frame):
+            self.metrics.increment('detections_skipped')
+            return self._mask_faces(frame, self.face_boxes)
+        if self._face_scheduler.due(self._frame_period()):
+            self.face_boxes = self.predict_face_boxes(frame)
+            self._face_propagator.reset(frame, self.face_boxes)
+            self._record_events('face', ['rostro'] * len(self.face_boxes), self.face_boxes, self.face_confs)
+        else:
+            with self.metrics.timer('track'):
+                self.face_boxes = self._face_propagator.propagate(frame)
+        return self._mask_faces(frame, self.face_boxes)
+
+    def _recognize_faces(self, frame: np.ndarray) -> np.ndarray:
+        detected = False
+        if self.motion_gating and not self.motion_gate.should_detect(frame):
+            self.metrics.increment('detections_skipped')
+        elif self._face_scheduler.due(self._frame_period()):
+            self.face_boxes = self.predict_face_boxes(frame)
+            self._face_propagator.reset(frame, self.face_boxes)
+            n = len(self.face_boxes)
+            self.face_track_ids = self.face_tracker.update(
+                self.face_boxes, np.zeros(n, dtype=np.int32), np.ones(n, dtype=np.float32))
+            self.face_recognizer.forget(self.face_tracker.ids)
+            detected = True
+        else:
+            with self.metrics.timer('track'):
+                self.face_boxes = self._face_propagator.propagate(frame)
+        # Solo los tracks nuevos (o con la identificación vencida) se embeben
+        with self.metrics.timer('recognize'):
+            self.recognized_faces = self.face_recognizer.identify(frame, self.face_boxes, self.face_track_ids)
+        if detected:
+            self._record_events('recognize',
+                                [f['alias'] or 'desconocido' for f in self.recognized_faces],
+                                self.face_boxes,
+                                np.array([f['score'] for f in self.recognized_faces], dtype=np.float32),
+                                self.face_track_ids)
+        with self.metrics.timer('draw'):
+            return self._draw_faces(frame, self.face_boxes, self.recognized_faces)
+
+    def _draw_faces(self, frame: np.ndarray, boxes: np.ndarray, identities: List[dict]) -> np.ndarray:
+        for (x1, y1, x2, y2), identity in zip(boxes, identities):
+            if identity['alias'] is None:
+                color, text = (160, 160, 160), "Desconocido"
+            elif self.target_face and identity['alias'] == self.target_face:
+                color, text = (0, 0, 255), f"{identity['alias']} {identity['score']:.2f}"
+            else:
+                color, text = (0, 200, 0), f"{identity['alias']} {identity['score']:.2f}"
+            thickness = 3 if color == (0, 0, 255) else 2
+            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), color, thickness)
+            cv2.putText(frame, text, (int(x1), max(int(y1) - 6, 12)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
         return frame
 
-    # Métodos de enmascaramiento
-    def _apply_blur(self, face_roi: np.ndarray) -> np.ndarray:
-        """Aplica desenfoque gaussiano"""
-        return cv2.GaussianBlur(face_roi, (99, 99), 30)
-
-    def _apply_pixelation(self, face_roi: np.ndarray) -> np.ndarray:
-        """Aplica efecto pixelado"""
-        (h, w) = face_roi.shape[:2]
-        temp = cv2.resize(face_roi, (16, 16), interpolation=cv2.INTER_LINEAR)
-        return cv2.resize(temp, (w, h), interpolation=cv2.INTER_NEAREST)
-
-    def _apply_black_box(self, face_roi: np.ndarray) -> np.ndarray:
-        """Aplica caja negra"""
-        return np.zeros_like(face_roi)
-
-    def _apply_emoji(self, face_roi: np.ndarray) -> np.ndarray:
-        """Aplica emoji precargado"""
-        if self.emoji is not None:
-            h, w = face_roi.shape[:2]
-            emoji_resized = cv2.resize(self.emoji, (w, h))
-            return emoji_resized
-        return self._apply_black_box(face_roi)
-
-    # Métodos de voz (existente)
-    def toggle_listening(self):
-        """Alterna el modo de escucha por voz"""
-        if not self.listening:
-            try:
-                with sr.Microphone() as source:
-                    self.recognizer.adjust_for_ambient_noise(source)
-                    audio = self.recognizer.listen(source, timeout=5)
-                    text = self.recognizer.recognize_google(audio, language='es-ES')
-                    return True, text
-            except Exception as e:
-                return False, f"Error en reconocimiento de voz: {str(e)}"
+    def _mask_faces(self, frame: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+        with self.metrics.timer('masking'):
+            return self.masking_engine.apply(frame, boxes, self.mask_method)
+
+    def set_detect_interval(self, max_interval: int, min_interval: int = 1):
+        """Limita cada cuántos frames se ejecuta el detector (1 = todos)"""
+        for scheduler in (self._object_scheduler, self._face_scheduler):
+            scheduler.min_interval = min_interval
+            scheduler.max_interval = max(min_interval, max_interval)
+            scheduler.reset()
+
+    def set_motion_gating(self, enabled: bool, threshold: Optional[float] = None,
+                          force_every: Optional[int] = None):
+        """Activa la detección de rostros solo ante cambios en la escena"""
+        self.motion_gating = enabled
+        if threshold is not None:
+            self.motion_gate.threshold = threshold
+        if force_every is not None:
+            self.motion_gate.force_every = force_every
+        self.motion_gate.reset()
+
+    # Métodos de voz
+    def start_listening(self, on_text: Callable[[str], None],
+                        on_error: Optional[Callable[[str], None]] = None):
+        """Inicia la escucha continua; los textos reconocidos llegan a on_text desde otro hilo"""
+        self.voice.on_text = on_text
+        self.voice.on_error = on_error
+        if self.voice.start_listening():
+            return True, "Escuchando..."
         return False, "Escucha ya activa"
 
-    def process_command(self, command: str) -> str:
-        """Procesa comandos básicos"""
-        command = command.lower()
-        if "detener" in command or "parar" in command:
-            self.stop_camera()
-            return "Video detenido"
-        elif "iniciar" in command or "comenzar" in command:
-            if self.start_camera():
-                return "Video iniciado"
-            return "No se pudo iniciar el video"
-        return f"Comando recibido: {command}"
+    def stop_listening(self):
+        self.voice.stop_listening()
+
+    def toggle_listening(self, on_text: Optional[Callable[[str], None]] = None,
+                         on_error: Optional[Callable[[str], None]] = None):
+        """Alterna el modo de escucha por voz sin bloquear"""
+        if self.listening:
+            self.stop_listening()
+            return False, "Escucha detenida"
+        return self.start_listening(on_text or self.voice.on_text, on_error or self.voice.on_error)
 
     def speak(self, text: str):
-        """Reproduce texto por voz"""
-        self.voice_engine.say(text)
-        self.voice_engine.runAndWait()
\ No newline at end of file
+        """Encola texto para reproducir por voz (retorna de inmediato)"""
+        self.voice.speak(text)
\ No newline at end of file
@@ -1,22 +1,26 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
-from typing import List
+from typing import List, Optional
 import logging
+from app.services.model_registry import model_registry, OBJECT_MODEL_PATH, FACE_MODEL_PATH
 
 logger = logging.getLogger("nova.vision")
 
 class VisionService:
-    def __init__(self):
-        try:
-            logger.info("Inicializando VisionService")
-            self.object_model = YOLO('assets/models/yolov8n.pt')
-            self.face_model = YOLO('assets/models/yolov8-face.pt')
-            logger.info("Modelos YOLO cargados exitosamente")
-        except Exception as e:
-            logger.error(f"Error al cargar modelos YOLO: {str(e)}")
-            raise
-    
+    def __init__(self, device: Optional[str] = None):
+        logger.info("Inicializando VisionService")
+        self.device = device
+
+    @property
+    def object_model(self):
+        """Modelo de objetos compartido del registro, cargado en el primer uso"""
+        return model_registry.get(OBJECT_MODEL_PATH, self.device)
+
+    @property
+    def face_model(self):
+        """Modelo de rostros compartido del registro, cargado en el primer uso"""
+        return model_registry.get(FACE_MODEL_PATH, self.device)
+
     def detect_objects(self, frame: np.ndarray) -> List[str]:
         try:
             logger.debug("Iniciando detección de objetos")
@@ -0,0 +1,312 @@
+# app/services/voice_service.py
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+import speech_recognition as sr
+
+logger = logging.getLogger("nova.voice")
+
+
+class RecognizerBackend:
+    """Interfaz de reconocimiento: recibe un segmento de audio y retorna texto"""
+
+    name = 'base'
+
+    def recognize(self, audio: sr.AudioData) -> Optional[str]:
+        """Texto reconocido, o None si el segmento no contiene habla"""
+        raise NotImplementedError
+
+
+class GoogleRecognizer(RecognizerBackend):
+    """Reconocimiento en línea con la API web de Google"""
+
+    name = 'google'
+
+    def __init__(self, language: str = 'es-ES'):
+        self.language = language
+        self._recognizer = sr.Recognizer()
+
+    def recognize(self, audio: sr.AudioData) -> Optional[str]:
+        try:
+            return self._recognizer.recognize_google(audio, language=self.language)
+        except sr.UnknownValueError:
+            return None
+
+
+class VoskRecognizer(RecognizerBackend):
+    """Reconocimiento local sin conexión con Vosk (dependencia opcional)"""
+
+    name = 'vosk'
+
+    def __init__(self, model_path: str = 'assets/models/vosk-es', sample_rate: int = 16000):
+        try:
+            from vosk import Model
+        except ImportError as e:
+            raise RuntimeError("Vosk no está instalado (pip install vosk)") from e
+        self.model = Model(model_path)
+        self.sample_rate = sample_rate
+
+    def recognize(self, audio: sr.AudioData) -> Optional[str]:
+        from vosk import KaldiRecognizer
+        recognizer = KaldiRecognizer(self.model, self.sample_rate)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2))
+        text = json.loads(recognizer.FinalResult()).get('text', '')
+        return text or None
+
+
+class StubRecognizer(RecognizerBackend):
+    """Retorna textos predefinidos en orden (pruebas y demos sin micrófono)"""
+
+    name = 'stub'
+
+    def __init__(self, responses: Iterable[str] = ()):
+        self._responses = queue.Queue()
+        for text in responses:
+            self._responses.put(text)
+
+    def add(self, text: str):
+        self._responses.put(text)
+
+    def recognize(self, audio) -> Optional[str]:
+        try:
+            return self._responses.get_nowait()
+        except queue.Empty:
+            return None
+
+
+def create_recognizer(name: Optional[str] = None, language: str = 'es-ES') -> RecognizerBackend:
+    """Crea el backend por nombre ('google', 'vosk', 'stub'); por defecto NOVA_ASR_BACKEND"""
+    name = (name or os.getenv("NOVA_ASR_BACKEND", 'google')).lower()
+    if name == 'google':
+        return GoogleRecognizer(language)
+    if name == 'vosk':
+        return VoskRecognizer(os.getenv("NOVA_VOSK_MODEL", 'assets/models/vosk-es'))
+    if name == 'stub':
+        return StubRecognizer()
+    raise ValueError(f"Backend de reconocimiento no soportado: {name}")
+
+
+class SpeechOutput:
+    """Cola de síntesis de voz atendida por un único hilo
+
+    pyttsx3 debe usarse desde el hilo que creó el motor, así que el motor se
+    crea dentro del worker. Si la cola se llena se descarta el mensaje más
+    antiguo: una respuesta atrasada ya no le sirve al usuario.
+    """
+
+    def __init__(self, max_pending: int = 3, engine_factory: Optional[Callable] = None):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._engine_factory = engine_factory
+        self._thread = None
+        self._lock = threading.Lock()
+        self.spoken = 0
+        self.dropped = 0
+
+    def say(self, text: str):
+        """Encola el texto y retorna de inmediato"""
+        if not text:
+            return
+        self._ensure_thread()
+        while True:
+            try:
+                self._queue.put_nowait(text)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def clear(self):
+        """Descarta los mensajes pendientes"""
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def stop(self):
+        if self._thread and self._thread.is_alive():
+            self.clear()
+            self._queue.put(None)
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="SpeechOutputThread")
+                self._thread.start()
+
+    def _create_engine(self):
+        if self._engine_factory is not None:
+            return self._engine_factory()
+        import pyttsx3
+        return pyttsx3.init()
+
+    def _run(self):
+        try:
+            engine = self._create_engine()
+        except Exception as e:
+            logger.error(f"No se pudo iniciar la síntesis de voz: {str(e)}")
+            self.clear()
+            return
+        while True:
+            text = self._queue.get()
+            if text is None:
+                break
+            try:
+                engine.say(text)
+                engine.runAndWait()
+                self.spoken += 1
+            except Exception as e:
+                logger.error(f"Error en síntesis de voz: {str(e)}")
+
+
+class VoiceWorker:
+    """Escucha continua, reconocimiento y síntesis fuera del hilo de la UI
+
+    Un hilo captura del micrófono y segmenta frases por energía (VAD de
+    speech_recognition con umbral dinámico); otro hilo las pasa al backend
+    de reconocimiento. Los resultados llegan a `on_text` / `on_error` desde
+    esos hilos: la UI debe reenviarlos a su propio hilo (p. ej. con señales).
+    """
+
+    def __init__(self, backend: Optional[RecognizerBackend] = None,
+                 on_text: Optional[Callable[[str], None]] = None,
+                 on_error: Optional[Callable[[str], None]] = None,
+                 phrase_time_limit: float = 8.0, pause_threshold: float = 0.6,
+                 max_pending: int = 4, microphone_factory: Callable = sr.Microphone):
+        self._backend = backend
+        self.on_text = on_text
+        self.on_error = on_error
+        self.phrase_time_limit = phrase_time_limit
+        self.microphone_factory = microphone_factory
+        self.segmenter = sr.Recognizer()
+        self.segmenter.dynamic_energy_threshold = True
+        self.segmenter.pause_threshold = pause_threshold
+        self.speech = SpeechOutput()
+        self._segments = queue.Queue(maxsize=max_pending)
+        # Cada sesión de escucha tiene su propio evento de parada: un hilo de
+        # captura viejo (bloqueado en listen()) nunca ve ni detiene la sesión nueva
+        self._session: Optional[threading.Event] = None
+        self._capture_thread = None
+        self._recognize_thread = None
+        self.stats = {'segments': 0, 'recognized': 0, 'empty': 0, 'dropped': 0, 'errors': 0}
+
+    @property
+    def backend(self) -> RecognizerBackend:
+        """Backend de reconocimiento, creado en el primer uso"""
+        if self._backend is None:
+            self._backend = create_recognizer()
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend: RecognizerBackend):
+        self._backend = backend
+
+    @property
+    def listening(self) -> bool:
+        return self._session is not None and not self._session.is_set()
+
+    def start_listening(self) -> bool:
+        """Inicia la escucha continua; retorna False si ya estaba activa"""
+        if self.listening:
+            return False
+        previous = self._capture_thread
+        if previous is not None and previous.is_alive():
+            # La sesión anterior ya tiene su parada pedida: se espera a que suelte el micrófono
+            previous.join(timeout=self.phrase_time_limit + 1.0)
+            if previous.is_alive():
+                logger.warning("La captura de audio anterior aún no termina")
+        self._session = threading.Event()
+        self._ensure_recognizer_thread()
+        self._capture_thread = threading.Thread(target=self._capture_loop, args=(self._session,),
+                                                daemon=True, name="VoiceCaptureThread")
+        self._capture_thread.start()
+        return True
+
+    def stop_listening(self):
+        """Detiene la captura sin esperar a que termine la frase en curso"""
+        if self._session is not None:
+            self._session.set()
+
+    def feed(self, audio: sr.AudioData) -> bool:
+        """Encola un segmento de audio para reconocer (sin pasar por el micrófono)"""
+        self._ensure_recognizer_thread()
+        try:
+            self._segments.put_nowait(audio)
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+        self.stats['segments'] += 1
+        return True
+
+    def speak(self, text: str):
+        self.speech.say(text)
+
+    def shutdown(self):
+        self.stop_listening()
+        if self._recognize_thread and self._recognize_thread.is_alive():
+            self._segments.put(None)
+            self._recognize_thread.join(timeout=2.0)
+        self._recognize_thread = None
+        self.speech.stop()
+
+    def _ensure_recognizer_thread(self):
+        if self._recognize_thread is None or not self._recognize_thread.is_alive():
+            self._recognize_thread = threading.Thread(target=self._recognize_loop, daemon=True,
+                                                      name="VoiceRecognizeThread")
+            self._recognize_thread.start()
+
+    def _emit_error(self, message: str):
+        self.stats['errors'] += 1
+        logger.error(message)
+        if self.on_error:
+            self.on_error(message)
+
+    def _capture_loop(self, stopped: threading.Event):
+        try:
+            with self.microphone_factory() as source:
+                self.segmenter.adjust_for_ambient_noise(source, duration=0.5)
+                while not stopped.is_set():
+                    try:
+                        # El timeout corto permite revisar la bandera de parada
+                        audio = self.segmenter.listen(source, timeout=1.0,
+                                                      phrase_time_limit=self.phrase_time_limit)
+                    except sr.WaitTimeoutError:
+                        continue
+                    if not stopped.is_set():
+                        self.feed(audio)
+        except Exception as e:
+            self._emit_error(f"Error en captura de audio: {str(e)}")
+        finally:
+            stopped.set()  # Solo termina su propia sesión
+
+    def _recognize_loop(self):
+        while True:
+            audio = self._segments.get()
+            if audio is None:
+                break
+            start = time.perf_counter()
+            try:
+                text = self.backend.recognize(audio)
+            except Exception as e:
+                self._emit_error(f"Error en reconocimiento de voz: {str(e)}")
+                continue
+            if not text:
+                self.stats['empty'] += 1
+                continue
+            self.stats['recognized'] += 1
+            logger.debug(f"Reconocido en {time.perf_counter() - start:.2f}s: {text}")
+            if self.on_text:
+                try:
+                    self.on_text(text)
+                except Exception as e:
+                    logger.error(f"Error procesando comando de voz: {str(e)}")
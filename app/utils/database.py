@@ -1,57 +1,325 @@
 # app/utils/database.py
+import asyncio
+import csv
+import io
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
 import psycopg2
 from psycopg2 import pool, OperationalError
-import logging
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, connection as _connection, cursor as _cursor
+from psycopg2.extras import execute_batch, execute_values
 from dotenv import load_dotenv
-import os
 
 load_dotenv()
 
+
+class CountingConnection(_connection):
+    """Conexión que cuenta los viajes al servidor (sentencias, BEGIN implícito, COMMIT/ROLLBACK)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.round_trips = 0
+        self.prepared = set()  # Sentencias preparadas en esta sesión
+        self.unverified = set()  # PREPARE enviado en un viaje que falló: puede o no existir
+
+    def cursor(self, *args, **kwargs):
+        kwargs.setdefault('cursor_factory', CountingCursor)
+        return super().cursor(*args, **kwargs)
+
+    def count_statement(self):
+        # psycopg2 envía BEGIN por separado antes de la primera sentencia de la transacción
+        if not self.autocommit and self.info.transaction_status == TRANSACTION_STATUS_IDLE:
+            self.round_trips += 1
+        self.round_trips += 1
+
+    def commit(self):
+        if self.info.transaction_status != TRANSACTION_STATUS_IDLE:
+            self.round_trips += 1
+        super().commit()
+
+    def rollback(self):
+        if self.info.transaction_status != TRANSACTION_STATUS_IDLE:
+            self.round_trips += 1
+        super().rollback()
+
+
+class CountingCursor(_cursor):
+    def execute(self, query, vars=None):
+        self.connection.count_statement()
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        # executemany de psycopg2 es un viaje por fila: preferir UnitOfWork.execute_batch
+        vars_list = list(vars_list)
+        for _ in vars_list:
+            self.connection.count_statement()
+        return super().executemany(query, vars_list)
+
+
+def to_positional(sql: str) -> str:
+    """Convierte los %s de psycopg2 en $1, $2... para PREPARE"""
+    counter = iter(range(1, 10**6))
+    return re.sub(r'%(%|s)', lambda m: '%' if m.group(1) == '%' else f"${next(counter)}", sql)
+
+
+class UnitOfWork:
+    """Transacción sobre una conexión del pool con ayudas para lotes y sentencias preparadas
+
+    Se obtiene con Database.unit_of_work(); al salir confirma (o revierte si
+    hubo una excepción) y devuelve la conexión al pool.
+    """
+
+    def __init__(self, db: "Database", conn: CountingConnection):
+        self.db = db
+        self.conn = conn
+        self.cursor = conn.cursor()
+
+    @property
+    def rowcount(self) -> int:
+        return self.cursor.rowcount
+
+    def execute(self, sql: str, params: Optional[Sequence] = None) -> "UnitOfWork":
+        self.cursor.execute(sql, params)
+        return self
+
+    def fetchone(self, sql: str, params: Optional[Sequence] = None):
+        self.cursor.execute(sql, params)
+        return self.cursor.fetchone()
+
+    def fetchall(self, sql: str, params: Optional[Sequence] = None) -> List[tuple]:
+        self.cursor.execute(sql, params)
+        return self.cursor.fetchall()
+
+    def fetchval(self, sql: str, params: Optional[Sequence] = None, default: Any = None):
+        row = self.fetchone(sql, params)
+        return row[0] if row else default
+
+    def execute_prepared(self, name: str, params: Sequence = ()) -> "UnitOfWork":
+        """Ejecuta una sentencia registrada con Database.prepare
+
+        La primera vez en cada conexión se envía PREPARE junto con EXECUTE en
+        el mismo viaje; después solo EXECUTE, sin volver a planificar.
+        """
+        placeholders = f" ({', '.join(['%s'] * len(params))})" if params else ""
+        execute = f"EXECUTE {name}{placeholders}"
+        if name in self.conn.unverified:
+            # Un EXECUTE anterior falló después de PREPARE: se consulta si quedó creada
+            self.conn.unverified.discard(name)
+            if self.fetchone("SELECT 1 FROM pg_prepared_statements WHERE name = %s", (name.lower(),)):
+                self.conn.prepared.add(name)
+        if name in self.conn.prepared:
+            self.cursor.execute(execute, params)
+        else:
+            sql = self.db.statements[name].replace('%', '%%')
+            try:
+                self.cursor.execute(f"PREPARE {name} AS {sql}; {execute}", params)
+            except Exception:
+                self.conn.unverified.add(name)
+                raise
+            self.conn.prepared.add(name)  # PREPARE no se deshace con ROLLBACK
+        return self
+
+    def fetch_prepared(self, name: str, params: Sequence = ()) -> List[tuple]:
+        return self.execute_prepared(name, params).cursor.fetchall()
+
+    def execute_values(self, sql: str, rows: Sequence[Sequence], template: Optional[str] = None,
+                       fetch: bool = False) -> Optional[List[tuple]]:
+        """Un solo INSERT ... VALUES con todas las filas (un viaje, no uno por fila)"""
+        rows = list(rows)
+        if not rows:
+            return [] if fetch else None
+        return execute_values(self.cursor, sql, rows, template=template,
+                              page_size=len(rows), fetch=fetch)
+
+    def execute_batch(self, sql: str, rows: Iterable[Sequence], page_size: int = 500):
+        """Sentencias repetidas (UPDATE/DELETE) agrupadas en páginas de page_size por viaje"""
+        execute_batch(self.cursor, sql, list(rows), page_size=page_size)
+
+    def copy_rows(self, table: str, columns: Sequence[str], rows: Iterable[Sequence]) -> int:
+        """Carga filas con COPY ... FROM STDIN (CSV): un viaje y sin parsear un INSERT por fila"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        if not count:
+            return 0
+        buffer.seek(0)
+        self.conn.count_statement()
+        self.cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        return count
+
+    def mogrify(self, sql: str, params: Optional[Sequence] = None) -> str:
+        return self.cursor.mogrify(sql, params).decode('utf-8')
+
+    def close(self):
+        self.cursor.close()
+
+
 class Database:
-    def __init__(self):
+    def __init__(self, minconn: int = 1, maxconn: int = 10, acquire_timeout: float = 10.0):
         self.logger = logging.getLogger("nova.db")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.acquire_timeout = acquire_timeout
+        # ThreadedConnectionPool falla en vez de esperar si se agota: el semáforo hace esperar
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._stats_lock = threading.Lock()
+        self.statements: Dict[str, str] = {}
+        self.stats = {'checkouts': 0, 'round_trips': 0, 'transactions': 0, 'errors': 0}
+        self.actions: Dict[str, dict] = {}  # Por acción: veces, viajes y tiempo acumulado
         self.connection_pool = self._create_connection_pool()
-    
+
     def _create_connection_pool(self):
         try:
-            return psycopg2.pool.SimpleConnectionPool(
-                minconn=1,
-                maxconn=10,
+            return psycopg2.pool.ThreadedConnectionPool(
+                minconn=self.minconn,
+                maxconn=self.maxconn,
                 host=os.getenv("DB_HOST", "IPBD"),
                 database=os.getenv("DB_NAME", "nombredb"),
                 user=os.getenv("DB_USER", "userdb"),
                 password=os.getenv("DB_PASSWORD", "passwd"),
                 port=os.getenv("DB_PORT", "5432"),
-                options="-c client_encoding=UTF8"
+                options="-c client_encoding=UTF8",
+                connection_factory=CountingConnection
             )
         except OperationalError as e:
             self.logger.error(f"Error al crear pool de conexiones: {str(e)}")
             return None
-    
+
     def get_connection(self):
-        """Obtiene una conexión del pool"""
+        """Obtiene una conexión del pool (espera hasta acquire_timeout si está agotado)"""
+        if not self.connection_pool:
+            return None
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            self.logger.error("Pool de conexiones agotado")
+            return None
         try:
-            if self.connection_pool:
-                conn = self.connection_pool.getconn()
-                conn.autocommit = False
-                return conn
+            conn = self.connection_pool.getconn()
+            conn.autocommit = False
+            with self._stats_lock:
+                self.stats['checkouts'] += 1
+            return conn
         except Exception as e:
+            self._slots.release()
             self.logger.error(f"Error al obtener conexión: {str(e)}")
             return None
-    
+
     def release_connection(self, conn):
         """Libera una conexión al pool"""
+        if not conn or not self.connection_pool:
+            return
         try:
-            if conn and self.connection_pool:
-                self.connection_pool.putconn(conn)
+            trips = getattr(conn, 'round_trips', 0)
+            conn.round_trips = 0
+            self.connection_pool.putconn(conn)  # Revierte si quedó una transacción abierta
+            with self._stats_lock:
+                self.stats['round_trips'] += trips
         except Exception as e:
             self.logger.error(f"Error al liberar conexión: {str(e)}")
-    
+        finally:
+            self._slots.release()
+
+    def check_connection(self) -> bool:
+        """True si se puede obtener una conexión del pool"""
+        conn = self.get_connection()
+        self.release_connection(conn)
+        return conn is not None
+
+    def prepare(self, name: str, sql: str):
+        """Registra una sentencia (con %s) para UnitOfWork.execute_prepared"""
+        self.statements[name] = to_positional(sql)
+
+    @contextmanager
+    def unit_of_work(self, action: str = 'db', autocommit: bool = False):
+        """Conexión y cursor para una acción; confirma al salir o revierte ante un error
+
+        Con autocommit=True no se abre transacción (sin BEGIN ni COMMIT): para
+        lecturas y para acciones de una sola sentencia, que ya son atómicas.
+        """
+        conn = self.get_connection()
+        if not conn:
+            raise ConnectionError("No hay conexión a la base de datos")
+        conn.autocommit = autocommit
+        start = time.perf_counter()
+        trips = conn.round_trips
+        uow = UnitOfWork(self, conn)
+        try:
+            yield uow
+            if not autocommit:
+                conn.commit()
+        except Exception:
+            with self._stats_lock:
+                self.stats['errors'] += 1
+            if not autocommit and not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            uow.close()
+            self._record(action, conn.round_trips - trips, time.perf_counter() - start,
+                         transaction=not autocommit)
+            self.release_connection(conn)
+
+    def _record(self, action: str, trips: int, elapsed: float, transaction: bool):
+        with self._stats_lock:
+            entry = self.actions.setdefault(action, {'count': 0, 'round_trips': 0, 'seconds': 0.0})
+            entry['count'] += 1
+            entry['round_trips'] += trips
+            entry['seconds'] += elapsed
+            if transaction:
+                self.stats['transactions'] += 1
+        self.logger.debug(f"{action}: {trips} viajes a la BD en {elapsed * 1000:.1f} ms")
+
+    def get_stats(self) -> dict:
+        """Contadores globales y viajes promedio por acción"""
+        with self._stats_lock:
+            actions = {name: dict(entry, round_trips_avg=round(entry['round_trips'] / entry['count'], 2))
+                       for name, entry in self.actions.items()}
+            return dict(self.stats, actions=actions)
+
     def close_all_connections(self):
         """Cierra todas las conexiones del pool"""
-        if self.connection_pool:
+        if self.connection_pool and not self.connection_pool.closed:
             self.connection_pool.closeall()
             self.logger.info("Todas las conexiones de la pool cerradas")
 
     def __del__(self):
         self.close_all_connections()
+
+
+class AsyncDatabase:
+    """Interfaz asyncio: cada unidad de trabajo corre en un hilo propio con su conexión del pool"""
+
+    def __init__(self, db: Database, max_workers: Optional[int] = None):
+        self.db = db
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or db.maxconn,
+                                            thread_name_prefix="AsyncDatabase")
+
+    def _call(self, fn: Callable, action: str, autocommit: bool, args: tuple):
+        with self.db.unit_of_work(action, autocommit=autocommit) as uow:
+            return fn(uow, *args)
+
+    async def run(self, fn: Callable[..., Any], *args, action: str = 'async', autocommit: bool = False):
+        """Ejecuta fn(uow, *args) en una unidad de trabajo sin bloquear el event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, fn, action, autocommit, args)
+
+    async def fetchall(self, sql: str, params: Optional[Sequence] = None, action: str = 'async'):
+        return await self.run(lambda uow: uow.fetchall(sql, params), action=action, autocommit=True)
+
+    async def fetchone(self, sql: str, params: Optional[Sequence] = None, action: str = 'async'):
+        return await self.run(lambda uow: uow.fetchone(sql, params), action=action, autocommit=True)
+
+    async def execute(self, sql: str, params: Optional[Sequence] = None, action: str = 'async') -> int:
+        return await self.run(lambda uow: uow.execute(sql, params).rowcount, action=action)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,225 @@
+# app/utils/metrics.py
+import bisect
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+# Límites superiores de los buckets en segundos (50 µs a ~13 s, factor 1.5)
+DEFAULT_BUCKETS = tuple(round(0.00005 * 1.5 ** i, 6) for i in range(32))
+
+
+class LatencyHistogram:
+    """Histograma de latencias con buckets fijos: memoria constante por etapa"""
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # Último bucket: +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        idx = bisect.bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """Estimación del percentil q (0-100) a partir del límite del bucket"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = q / 100 * self.count
+            running = 0
+            for idx, n in enumerate(self.counts):
+                running += n
+                if running >= target:
+                    return self.bounds[idx] if idx < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'mean_ms': round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 3),
+            'p95_ms': round(self.percentile(95) * 1000, 3),
+            'p99_ms': round(self.percentile(99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: LatencyHistogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """Histogramas por etapa, contadores y gauges de un pipeline de video"""
+
+    def __init__(self, namespace: str = 'nova'):
+        self.namespace = namespace
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> LatencyHistogram:
+        hist = self.histograms.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self.histograms.setdefault(stage, LatencyHistogram())
+        return hist
+
+    def timer(self, stage: str) -> _Timer:
+        """Context manager que registra la duración del bloque en la etapa"""
+        return _Timer(self.histogram(stage))
+
+    def observe(self, stage: str, seconds: float):
+        self.histogram(stage).record(seconds)
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def register_gauge(self, name: str, fn: Callable[[], float]):
+        """Registra un valor que se lee al momento de la consulta"""
+        self.gauges[name] = fn
+
+    def _gauge_values(self) -> Dict[str, float]:
+        values = {}
+        for name, fn in list(self.gauges.items()):
+            try:
+                values[name] = fn()
+            except Exception:
+                continue
+        return values
+
+    def snapshot(self) -> dict:
+        return {
+            'stages': {name: h.summary() for name, h in list(self.histograms.items())},
+            'counters': dict(self.counters),
+            'gauges': self._gauge_values(),
+        }
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def to_prometheus(self) -> str:
+        """Exposición en formato de texto de Prometheus"""
+        ns = self.namespace
+        lines: List[str] = [
+            f"# HELP {ns}_stage_latency_seconds Latencia por etapa del pipeline de video",
+            f"# TYPE {ns}_stage_latency_seconds histogram",
+        ]
+        for stage, hist in list(self.histograms.items()):
+            with hist._lock:
+                counts, total, count = list(hist.counts), hist.sum, hist.count
+            running = 0
+            for bound, n in zip(hist.bounds, counts):
+                running += n
+                lines.append(f'{ns}_stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {running}')
+            lines.append(f'{ns}_stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{ns}_stage_latency_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{ns}_stage_latency_seconds_count{{stage="{stage}"}} {count}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {ns}_{name}_total counter")
+            lines.append(f"{ns}_{name}_total {value}")
+        for name, value in sorted(self._gauge_values().items()):
+            lines.append(f"# TYPE {ns}_{name} gauge")
+            lines.append(f"{ns}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsReporter:
+    """Escribe periódicamente un resumen de las métricas en un logger"""
+
+    def __init__(self, registry: MetricsRegistry, interval: float = 10.0,
+                 logger: Optional[logging.Logger] = None):
+        self.registry = registry
+        self.interval = interval
+        self.logger = logger or logging.getLogger("nova.vision")
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="MetricsReporterThread")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.logger.info(f"Métricas de video: {json.dumps(self.registry.snapshot(), ensure_ascii=False)}")
+
+
+class MetricsHTTPServer:
+    """Endpoint HTTP local: /metrics (Prometheus) y /metrics.json"""
+
+    def __init__(self, registry: MetricsRegistry, port: int = 9108, host: str = '127.0.0.1'):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+
+    def start(self):
+        if self._server:
+            return
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body = registry.to_prometheus().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif self.path == '/metrics.json':
+                    body = json.dumps(registry.snapshot(), ensure_ascii=False).encode('utf-8')
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Evita escribir cada scrape en stderr
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True,
+                         name="MetricsHTTPThread").start()
+        logging.getLogger("nova.vision").info(f"Métricas disponibles en http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
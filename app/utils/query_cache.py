@@ -0,0 +1,163 @@
+# app/utils/query_cache.py
+import copy
+import logging
+import os
+import select
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+logger = logging.getLogger("nova.db")
+
+NOTIFY_CHANNEL = 'nova_cache'
+
+
+class QueryCache:
+    """Caché LRU con TTL para lecturas de la BD, invalidada por tabla
+
+    Cada entrada se indexa por (consulta, argumentos) y queda etiquetada con
+    las tablas que lee. Una escritura invalida sus tablas; si la invalidación
+    llega mientras una lectura está en curso, ese resultado no se guarda.
+    Los valores se entregan copiados: quien los modifica no altera la caché.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._listener = None
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get_or_load(self, key: Hashable, tables: Iterable[str], loader: Callable[[], Any]) -> Any:
+        """Valor en caché o el resultado de loader(); las excepciones del loader no se guardan"""
+        tables = tuple(tables)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return copy.deepcopy(entry[1])
+                del self._entries[key]
+                self.stats['expired'] += 1
+            self.stats['misses'] += 1
+            generations = self._generation(tables)
+        value = loader()
+        with self._lock:
+            if generations == self._generation(tables):
+                self._entries[key] = (time.monotonic() + self.ttl, value, tables)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.stats['evictions'] += 1
+        return copy.deepcopy(value)
+
+    def _generation(self, tables: Tuple[str, ...]) -> list:
+        return [self._generations.get(t, 0) for t in ('*',) + tables]
+
+    def invalidate(self, *tables: str):
+        """Descarta las entradas que leen alguna de las tablas (todas si no se indica ninguna)"""
+        with self._lock:
+            if not tables:
+                tables = ('*',)
+                self._entries.clear()
+            else:
+                for key in [k for k, (_, _, entry_tables) in self._entries.items()
+                            if any(t in entry_tables for t in tables)]:
+                    del self._entries[key]
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            self.stats['invalidations'] += 1
+
+    def clear(self):
+        self.invalidate()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return dict(self.stats, size=len(self._entries),
+                        hit_rate=round(self.stats['hits'] / lookups, 3) if lookups else 0.0)
+
+    def listen(self, db, channel: str = NOTIFY_CHANNEL):
+        """Invalida también con los NOTIFY de otros procesos (ver migrations/002_cache_notify.sql)"""
+        with self._lock:
+            if self._listener is not None and self._listener.running:
+                return
+            self._listener = CacheInvalidator(db, self, channel)
+        self._listener.start()
+
+    def stop_listening(self):
+        if self._listener is not None:
+            self._listener.stop()
+
+
+class CacheInvalidator:
+    """Hilo con LISTEN sobre una conexión propia; cada NOTIFY trae la tabla modificada"""
+
+    def __init__(self, db, cache: QueryCache, channel: str = NOTIFY_CHANNEL, timeout: float = 1.0):
+        self.db = db
+        self.cache = cache
+        self.channel = channel
+        self.timeout = timeout
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="CacheInvalidatorThread")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            conn = self.db.get_connection()
+            if not conn:
+                self._stop.wait(5.0)
+                continue
+            try:
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel}")
+                # Lo ocurrido mientras no se escuchaba se desconoce: se descarta todo
+                self.cache.clear()
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], self.timeout) == ([], [], []):
+                        continue
+                    conn.poll()
+                    tables = {notify.payload for notify in conn.notifies}
+                    conn.notifies.clear()
+                    if tables:
+                        self.cache.invalidate(*tables)
+            except Exception as e:
+                logger.warning(f"Escucha de invalidaciones interrumpida: {str(e)}")
+                self._stop.wait(5.0)
+            finally:
+                try:
+                    if not conn.closed:
+                        with conn.cursor() as cursor:
+                            cursor.execute(f"UNLISTEN {self.channel}")
+                except Exception:
+                    pass
+                self.db.release_connection(conn)
+
+
+query_cache = QueryCache(ttl=float(os.getenv("NOVA_CACHE_TTL", "30")))
+
+
+def listen_from_env(db, cache: Optional[QueryCache] = None):
+    """Activa la invalidación por LISTEN/NOTIFY si NOVA_CACHE_NOTIFY está definida"""
+    if os.getenv("NOVA_CACHE_NOTIFY"):
+        (cache or query_cache).listen(db)
@@ -0,0 +1,96 @@
+# app/utils/ring_buffer.py
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+
+class RingBuffer:
+    """Buffer circular acotado que descarta el elemento más antiguo al llenarse"""
+
+    def __init__(self, capacity: int = 2):
+        if capacity < 1:
+            raise ValueError("La capacidad del buffer debe ser al menos 1")
+        self._items = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self.capacity = capacity
+        self.dropped = 0
+
+    def put(self, item: Any, block: bool = False, timeout: Optional[float] = None) -> bool:
+        """Inserta un elemento; retorna True si se descartó uno antiguo
+
+        Con block=True espera a que haya espacio en lugar de descartar.
+        """
+        with self._cond:
+            if block:
+                self._cond.wait_for(lambda: len(self._items) < self.capacity, timeout)
+            dropped = len(self._items) == self.capacity
+            if dropped:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify_all()
+            return dropped
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Extrae el elemento más antiguo o None si vence el timeout"""
+        with self._cond:
+            if not self._items and not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def get_latest(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Extrae el elemento más reciente descartando los anteriores"""
+        with self._cond:
+            if not self._items and not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            item = self._items.pop()
+            self.dropped += len(self._items)
+            self._items.clear()
+            self._cond.notify_all()
+            return item
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+            self._cond.notify_all()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class StageCounter:
+    """Contador de FPS de una etapa del pipeline con ventana deslizante"""
+
+    def __init__(self, window: float = 2.0):
+        self.window = window
+        self.count = 0
+        self._stamps = deque()
+        self._lock = threading.Lock()
+
+    def tick(self):
+        now = time.monotonic()
+        with self._lock:
+            self.count += 1
+            self._stamps.append(now)
+            self._prune(now)
+
+    def _prune(self, now: float):
+        while self._stamps and now - self._stamps[0] > self.window:
+            self._stamps.popleft()
+
+    @property
+    def fps(self) -> float:
+        with self._lock:
+            # Una etapa detenida no sigue reportando su último FPS
+            self._prune(time.monotonic())
+            if len(self._stamps) < 2:
+                return 0.0
+            elapsed = self._stamps[-1] - self._stamps[0]
+            return (len(self._stamps) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self._stamps.clear()
@@ -5,11 +5,12 @@ from PyQt6.QtWidgets import (
     QTableWidgetItem, QHeaderView, QFileDialog, QHBoxLayout, 
     QListWidget, QListWidgetItem, QScrollArea
 )
-from PyQt6.QtGui import QAction, QIcon, QPixmap
+from PyQt6.QtGui import QAction, QIcon
 from PyQt6.QtCore import Qt, pyqtSignal
 from app.utils.logger import get_logger
 from app.utils.database import Database
 from app.controllers.img_rostro_controller import ImgRostroController
+from app.views.thumbnail_cache import get_thumbnail_cache
 from pathlib import Path
 
 logger = get_logger("nova.ui.img_rostro")
@@ -20,6 +21,7 @@ class ImgRostroFormDialog(QDialog):
         self.mode = mode
         self.rostro_data = rostro_data
         self.selected_images = []
+        self._preview_path = None
         self.setWindowTitle("Agregar Rostro" if mode == 'add' else "Editar Rostro")
         self.setModal(True)
         self.setMinimumSize(600, 500)
@@ -127,11 +129,19 @@ class ImgRostroFormDialog(QDialog):
             return
             
         img_path = selected_items[0].text()
-        pixmap = QPixmap(img_path)
-        if not pixmap.isNull():
-            pixmap = pixmap.scaled(
-                self.img_preview.width(), self.img_preview.height(),
-                Qt.AspectRatioMode.KeepAspectRatio)
+        self._preview_path = img_path
+        pixmap = get_thumbnail_cache().get(
+            img_path, self.img_preview.width(),
+            lambda thumb, path=img_path: self.set_preview(path, thumb))
+        self.img_preview.setPixmap(pixmap)
+    
+    def set_preview(self, img_path, pixmap):
+        """Coloca la miniatura cargada si la imagen sigue seleccionada"""
+        if img_path != self._preview_path:
+            return
+        if pixmap is None:
+            self.img_preview.clear()
+        else:
             self.img_preview.setPixmap(pixmap)
     
     def get_data(self):
@@ -289,16 +299,15 @@ class ImgRostroManagementDialog(QDialog):
         content = QWidget()
         content_layout = QVBoxLayout()
         
+        # Se muestran marcadores de inmediato; las miniaturas llegan al cargarse
+        thumbnails = get_thumbnail_cache()
         for img_data in imagenes:
             img_path = img_data['imagen']
             lbl_img = QLabel()
-            pixmap = QPixmap(img_path)
-            
-            if not pixmap.isNull():
-                pixmap = pixmap.scaled(400, 400, Qt.AspectRatioMode.KeepAspectRatio)
-                lbl_img.setPixmap(pixmap)
-                lbl_img.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                content_layout.addWidget(lbl_img)
+            lbl_img.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            lbl_img.setPixmap(thumbnails.get(
+                img_path, 400, lambda thumb, lbl=lbl_img: self.set_thumbnail(lbl, thumb)))
+            content_layout.addWidget(lbl_img)
         
         content.setLayout(content_layout)
         scroll.setWidget(content)
@@ -312,6 +321,13 @@ class ImgRostroManagementDialog(QDialog):
         dialog.setLayout(layout)
         dialog.exec()
 
+    def set_thumbnail(self, lbl_img, pixmap):
+        """Reemplaza el marcador; las imágenes que no se pueden leer se ocultan"""
+        if pixmap is None:
+            lbl_img.hide()
+        else:
+            lbl_img.setPixmap(pixmap)
+
 class ImgRostroWindow(QMainWindow):
     def __init__(self, username, profile):
         super().__init__()
@@ -194,7 +194,7 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.username = username
         self.profile = profile  # 0=admin, 1=operador
-        self.video_controller = VideoController()
+        self.video_controller = VideoController(db=Database(), user=username)
         self.setWindowTitle(f"Nova AI - Bienvenido {username}")
         self.setGeometry(100, 100, 800, 600)
         self.init_ui()
@@ -0,0 +1,179 @@
+# app/views/thumbnail_cache.py
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PyQt6.QtCore import QObject, QRunnable, QSize, Qt, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QColor, QImage, QImageReader, QPainter, QPixmap
+
+logger = logging.getLogger("nova.ui.thumbnails")
+
+DEFAULT_THUMBNAILS_DIR = Path("VISION_LLM/thumbnails")
+
+ThumbnailCallback = Callable[[Optional[QPixmap]], None]
+
+
+def content_hash(path: str) -> str:
+    """SHA-1 del contenido del archivo (la miniatura cambia si cambia la imagen)"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _LoaderSignals(QObject):
+    done = pyqtSignal(object, object)  # (clave, QImage o None)
+
+
+class _ThumbnailLoader(QRunnable):
+    """Genera o lee la miniatura en un hilo del pool; solo usa QImage (no QPixmap)"""
+
+    def __init__(self, key: tuple, path: str, size: int, directory: Path, signals: _LoaderSignals):
+        super().__init__()
+        self.key = key
+        self.path = path
+        self.size = size
+        self.directory = directory
+        self.signals = signals
+
+    def run(self):
+        image = None
+        try:
+            image = self._load()
+        except Exception as e:
+            logger.warning(f"No se pudo generar miniatura de {self.path}: {str(e)}")
+        self.signals.done.emit(self.key, image)
+
+    def _load(self) -> Optional[QImage]:
+        digest = content_hash(self.path)
+        cached = self.directory / digest[:2] / f"{digest}_{self.size}.jpg"
+        if cached.exists():
+            image = QImage(str(cached))
+            if not image.isNull():
+                return image
+        reader = QImageReader(self.path)
+        reader.setAutoTransform(True)
+        original = reader.size()
+        if original.isValid() and max(original.width(), original.height()) > self.size:
+            # El decodificador JPEG reduce al leer: no se carga la resolución completa
+            reader.setScaledSize(original.scaled(QSize(self.size, self.size),
+                                                 Qt.AspectRatioMode.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            return None
+        if max(image.width(), image.height()) > self.size:
+            image = image.scaled(self.size, self.size, Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_suffix('.tmp.jpg')
+        if image.save(str(tmp), 'JPG', 85):
+            os.replace(tmp, cached)
+        return image
+
+
+class ThumbnailCache(QObject):
+    """Miniaturas de imágenes para la UI sin bloquear el hilo de Qt
+
+    - En disco: una miniatura JPEG por (hash del contenido, tamaño).
+    - En memoria: LRU de QPixmap limitado en bytes, indexado por ruta,
+      fecha de modificación y tamaño.
+    - get() retorna de inmediato la miniatura o un marcador; las faltantes
+      se generan en un QThreadPool y llegan al callback en el hilo de Qt.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_THUMBNAILS_DIR, max_bytes: int = 64 * 2**20,
+                 max_threads: Optional[int] = None, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._pixmaps: "OrderedDict[tuple, QPixmap]" = OrderedDict()
+        self._bytes = 0
+        self._pending: Dict[tuple, List[ThumbnailCallback]] = {}
+        self._placeholders: Dict[int, QPixmap] = {}
+        self._pool = QThreadPool(self)
+        if max_threads:
+            self._pool.setMaxThreadCount(max_threads)
+        self._signals = _LoaderSignals(self)
+        self._signals.done.connect(self._on_loaded)
+        self.stats = {'hits': 0, 'misses': 0, 'loaded': 0, 'failed': 0}
+
+    @staticmethod
+    def _key(path: str, size: int) -> Optional[Tuple[str, int, int]]:
+        try:
+            return str(path), os.stat(path).st_mtime_ns, size
+        except OSError:
+            return None
+
+    def get(self, path: str, size: int, callback: Optional[ThumbnailCallback] = None) -> QPixmap:
+        """Miniatura en memoria, o un marcador mientras se carga (callback recibe la final o None)"""
+        key = self._key(path, size)
+        if key is None:
+            if callback:
+                callback(None)
+            return QPixmap()
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+            self.stats['hits'] += 1
+            return pixmap
+        self.stats['misses'] += 1
+        callbacks = self._pending.get(key)
+        if callbacks is None:
+            self._pending[key] = [callback] if callback else []
+            self._pool.start(_ThumbnailLoader(key, str(path), size, self.directory, self._signals))
+        elif callback:
+            callbacks.append(callback)
+        return self.placeholder(size)
+
+    def placeholder(self, size: int) -> QPixmap:
+        pixmap = self._placeholders.get(size)
+        if pixmap is None:
+            pixmap = QPixmap(size, size)
+            pixmap.fill(QColor("#eeeeee"))
+            painter = QPainter(pixmap)
+            painter.setPen(QColor("#888888"))
+            painter.drawText(pixmap.rect(), Qt.AlignmentFlag.AlignCenter, "Cargando…")
+            painter.end()
+            self._placeholders[size] = pixmap
+        return pixmap
+
+    def _on_loaded(self, key: tuple, image: Optional[QImage]):
+        callbacks = self._pending.pop(key, [])
+        pixmap = None
+        if image is not None and not image.isNull():
+            pixmap = QPixmap.fromImage(image)  # QPixmap solo se crea en el hilo de Qt
+            self._insert(key, pixmap)
+            self.stats['loaded'] += 1
+        else:
+            self.stats['failed'] += 1
+        for callback in callbacks:
+            try:
+                callback(pixmap)
+            except RuntimeError:
+                pass  # El widget destino ya se cerró
+
+    def _insert(self, key: tuple, pixmap: QPixmap):
+        self._pixmaps[key] = pixmap
+        self._bytes += pixmap.width() * pixmap.height() * 4
+        while self._bytes > self.max_bytes and len(self._pixmaps) > 1:
+            _, old = self._pixmaps.popitem(last=False)
+            self._bytes -= old.width() * old.height() * 4
+
+    def clear(self):
+        self._pixmaps.clear()
+        self._bytes = 0
+
+
+_thumbnail_cache = None
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """Caché compartida por las ventanas (se crea en el hilo de Qt en el primer uso)"""
+    global _thumbnail_cache
+    if _thumbnail_cache is None:
+        _thumbnail_cache = ThumbnailCache()
+    return _thumbnail_cache
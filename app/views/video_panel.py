@@ -6,13 +6,18 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QIcon, QColor
-import cv2
 import numpy as np
 from PIL import Image
 import io
+from app.views.video_widget import FrameBridge, VideoWidget
 
 class VideoPanel(QDialog):
     closed = pyqtSignal()
+    # Resultados de voz emitidos desde los hilos del VoiceWorker
+    voice_text = pyqtSignal(str)
+    voice_error = pyqtSignal(str)
+    # Rostros reconocidos, emitidos desde el hilo de inferencia
+    face_matched = pyqtSignal(dict)
     
     def __init__(self, video_controller, username):
         super().__init__()
@@ -21,6 +26,15 @@ class VideoPanel(QDialog):
         self.selected_object = None
         self.setWindowTitle(f"Video Panel - {username}")
         self.setMinimumSize(1000, 800)
+        # Los frames llegan desde el hilo de render y se pintan en el hilo de Qt
+        self.frame_bridge = FrameBridge(self)
+        self.frame_bridge.frame_ready.connect(self.show_latest_frame)
+        self.voice_text.connect(self.on_voice_text)
+        self.voice_error.connect(self.on_voice_error)
+        self.face_matched.connect(self.on_face_matched)
+        # Se guarda el callback para quitar exactamente el mismo al cerrar
+        self._face_listener = self.face_matched.emit
+        self.video_controller.add_face_listener(self._face_listener)
         self.init_ui()
     
     def init_ui(self):
@@ -39,8 +53,12 @@ class VideoPanel(QDialog):
         self.mask_mode = QRadioButton("Video Enmascarar")
         self.mode_group.addButton(self.mask_mode, 2)
         
+        self.recognize_mode = QRadioButton("Video Reconocer")
+        self.mode_group.addButton(self.recognize_mode, 3)
+        
         mode_layout.addWidget(self.obj_mode)
         mode_layout.addWidget(self.mask_mode)
+        mode_layout.addWidget(self.recognize_mode)
         mode_group.setLayout(mode_layout)
         
         # ===== Opciones de Objetos =====
@@ -87,6 +105,9 @@ class VideoPanel(QDialog):
         control_layout.addWidget(self.btn_toggle)
         control_group.setLayout(control_layout)
         
+        # ===== Video =====
+        self.video_widget = VideoWidget()
+        
         # ===== Interacción con Nova =====
         nova_group = QGroupBox("Interacción con Nova")
         nova_layout = QVBoxLayout()
@@ -143,11 +164,13 @@ class VideoPanel(QDialog):
         main_layout.addWidget(self.obj_options_group)
         main_layout.addWidget(self.mask_options_group)
         main_layout.addWidget(control_group)
+        main_layout.addWidget(self.video_widget, stretch=1)
         main_layout.addWidget(nova_group)
         
         # Conectar cambios de modo
         self.obj_mode.toggled.connect(self.update_mode_display)
         self.mask_mode.toggled.connect(self.update_mode_display)
+        self.recognize_mode.toggled.connect(self.update_mode_display)
         
         # Configuración inicial
         self.change_object()  # Establecer objeto inicial
@@ -175,11 +198,16 @@ class VideoPanel(QDialog):
                 self.mask_options_group.setVisible(False)
                 self.video_controller.set_detection_mode('object')
                 self.log_message("Sistema", "Modo: Detección de objetos")
-            else:
+            elif self.mask_mode.isChecked():
                 self.obj_options_group.setVisible(False)
                 self.mask_options_group.setVisible(True)
                 self.video_controller.set_detection_mode('face')
                 self.log_message("Sistema", "Modo: Enmascaramiento de rostros")
+            else:
+                self.obj_options_group.setVisible(False)
+                self.mask_options_group.setVisible(False)
+                self.video_controller.set_detection_mode('recognize')
+                self.log_message("Sistema", "Modo: Reconocimiento de rostros")
         except Exception as e:
             self.log_message("Error", f"Error al cambiar modo: {str(e)}")
             raise
@@ -193,40 +221,61 @@ class VideoPanel(QDialog):
                 self.log_message("Sistema", "Video iniciado")
         else:
             self.video_controller.stop_video()
+            self.frame_bridge.take()
+            self.video_widget.clear()
             self.btn_toggle.setIcon(QIcon("assets/icons/camera.png"))
             self.btn_toggle.setText(" Iniciar Video")
             self.log_message("Sistema", "Video detenido")
     
     def update_video_frame(self, frame):
-        """Actualiza el frame de video con las anotaciones"""
+        """Recibe el frame anotado desde el hilo de video (sin tocar widgets)"""
+        self.frame_bridge.push(frame)
+    
+    def show_latest_frame(self):
+        """Pinta el frame más reciente en el hilo de la UI"""
         try:
-            cv2.imshow('Video Nova', frame)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                self.toggle_video()
+            self.video_widget.set_frame(self.frame_bridge.take())
         except Exception as e:
             self.log_message("Error", f"Error mostrando video: {str(e)}")
     
+    def keyPressEvent(self, event):
+        """Detiene el video con la tecla Q"""
+        if event.key() == Qt.Key.Key_Q and "Detener" in self.btn_toggle.text():
+            self.toggle_video()
+            return
+        super().keyPressEvent(event)
+    
     def toggle_voice(self):
-        """Alterna el modo de voz"""
+        """Alterna la escucha continua (no bloquea la interfaz)"""
         if self.voice_btn.text().strip() == "Voz":
+            success, message = self.video_controller.start_listening(
+                self.voice_text.emit, self.voice_error.emit)
+            if not success:
+                self.log_message("Error", message)
+                return
             self.voice_btn.setIcon(QIcon("assets/icons/microphone-active.png"))
             self.voice_btn.setText(" Escuchando...")
             self.command_input.setEnabled(False)
             self.btn_send.setEnabled(False)
-            
-            success, message = self.video_controller.toggle_voice_listening()
-            if success:
-                self.log_message("Voz", f"Comando: {message}")
-                self.process_command(message)
-            else:
-                self.log_message("Error", message)
-            
-            self.voice_btn.setIcon(QIcon("assets/icons/microphone.png"))
-            self.voice_btn.setText(" Voz")
         else:
             self.video_controller.stop_listening()
-            self.voice_btn.setIcon(QIcon("assets/icons/microphone.png"))
-            self.voice_btn.setText(" Voz")
+            self.reset_voice_button()
+    
+    def reset_voice_button(self):
+        self.voice_btn.setIcon(QIcon("assets/icons/microphone.png"))
+        self.voice_btn.setText(" Voz")
+    
+    def on_voice_text(self, text):
+        self.log_message("Voz", f"Comando: {text}")
+        self.process_command(text)
+    
+    def on_voice_error(self, message):
+        self.log_message("Error", message)
+        if not self.video_controller.is_listening():
+            self.reset_voice_button()
+    
+    def on_face_matched(self, event):
+        self.log_message("Nova", f"Rostro reconocido: {event['alias']} ({event['score']:.2f})")
     
     def activate_text_input(self):
         """Activa la entrada de texto"""
@@ -258,6 +307,7 @@ class VideoPanel(QDialog):
     def closeEvent(self, event):
         """Maneja el cierre de la ventana"""
         self.video_controller.stop_video()
-        cv2.destroyAllWindows()
+        self.video_controller.stop_listening()
+        self.video_controller.remove_face_listener(self._face_listener)
         self.closed.emit()
         super().closeEvent(event)
\ No newline at end of file
@@ -0,0 +1,97 @@
+# app/views/video_widget.py
+import threading
+from typing import Optional
+
+import numpy as np
+from PyQt6.QtCore import QObject, QRect, Qt, pyqtSignal
+from PyQt6.QtGui import QColor, QImage, QPainter
+from PyQt6.QtWidgets import QSizePolicy, QWidget
+
+
+class FrameBridge(QObject):
+    """Entrega frames del hilo de video al hilo de Qt sin copiarlos
+
+    El hilo de video deja el frame más reciente en un slot compartido y
+    emite `frame_ready` solo si no hay ya una señal pendiente; si la UI se
+    atrasa, los frames intermedios se reemplazan (y se cuentan como
+    descartados) en lugar de encolarse.
+    """
+
+    frame_ready = pyqtSignal()
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._latest = None
+        self._pending = False
+        self.delivered = 0
+        self.dropped = 0
+
+    def push(self, frame: np.ndarray):
+        """Publica un frame desde cualquier hilo"""
+        with self._lock:
+            if self._latest is not None:
+                self.dropped += 1
+            self._latest = frame
+            if self._pending:
+                return
+            self._pending = True
+        self.frame_ready.emit()
+
+    def take(self) -> Optional[np.ndarray]:
+        """Retira el frame más reciente (se llama en el hilo de la UI)"""
+        with self._lock:
+            frame, self._latest = self._latest, None
+            self._pending = False
+        if frame is not None:
+            self.delivered += 1
+        return frame
+
+
+class VideoWidget(QWidget):
+    """Muestra frames BGR de numpy envolviéndolos en un QImage sin copia
+
+    El escalado a la ventana se hace una sola vez por frame al pintar,
+    manteniendo la relación de aspecto.
+    """
+
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self._frame = None  # Mantiene vivo el buffer que referencia el QImage
+        self._image = None
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.setMinimumSize(320, 240)
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+
+    def set_frame(self, frame: Optional[np.ndarray]):
+        if frame is None:
+            return
+        if not frame.flags['C_CONTIGUOUS']:
+            frame = np.ascontiguousarray(frame)
+        h, w = frame.shape[:2]
+        if frame.ndim == 2:
+            image = QImage(frame.data, w, h, frame.strides[0], QImage.Format.Format_Grayscale8)
+        else:
+            image = QImage(frame.data, w, h, frame.strides[0], QImage.Format.Format_BGR888)
+        self._frame = frame
+        self._image = image
+        self.update()
+
+    def clear(self):
+        self._frame = None
+        self._image = None
+        self.update()
+
+    def _target_rect(self) -> QRect:
+        iw, ih = self._image.width(), self._image.height()
+        scale = min(self.width() / iw, self.height() / ih)
+        w, h = int(iw * scale), int(ih * scale)
+        return QRect((self.width() - w) // 2, (self.height() - h) // 2, w, h)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(0, 0, 0))
+        if self._image is not None:
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, False)
+            painter.drawImage(self._target_rect(), self._image)
+        painter.end()
@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+"""Benchmarks sin cámara ni GUI para los servicios de visión"""
@@ -0,0 +1,139 @@
+# benchmarks/bench_ann.py
+"""Benchmark de recall vs latencia de los índices aproximados frente a la búsqueda exacta
+
+Uso:
+    python benchmarks/bench_ann.py --gallery 50000 --dim 512
+    python benchmarks/bench_ann.py --gallery 200000 --output benchmarks/results/ann.json
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.common import LatencyRecorder, print_table, write_results  # noqa: E402
+from app.services.ann_index import FlatIndex, create_index, load_index  # noqa: E402
+from app.services.face_embeddings import l2_normalize  # noqa: E402
+
+
+def make_gallery(rng: np.random.Generator, size: int, dim: int, per_identity: int, noise: float):
+    """Galería sintética: varias fotos por identidad alrededor de un centro aleatorio"""
+    identities = max(1, size // per_identity)
+    centers = l2_normalize(rng.standard_normal((identities, dim), dtype=np.float32))
+    owner = np.arange(size) % identities
+    vectors = l2_normalize(centers[owner] + noise * rng.standard_normal((size, dim), dtype=np.float32))
+    return centers, vectors
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(np.intersect1d(f[f >= 0], t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--gallery', type=int, default=50000)
+    parser.add_argument('--dim', type=int, default=512)
+    parser.add_argument('--per-identity', type=int, default=5)
+    parser.add_argument('--noise', type=float, default=0.05, help="ruido por componente de cada foto")
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--batch', type=int, default=4, help="rostros por frame (consultas por llamada)")
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--ef', type=int, nargs='+', default=[16, 32, 64, 128])
+    parser.add_argument('--updates', type=int, default=1000, help="altas y bajas incrementales a medir")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    centers, vectors = make_gallery(rng, args.gallery, args.dim, args.per_identity, args.noise)
+    ids = np.arange(len(vectors), dtype=np.int64)
+    owners = rng.integers(0, len(centers), args.queries)
+    queries = l2_normalize(centers[owners] + args.noise * rng.standard_normal(
+        (args.queries, args.dim), dtype=np.float32))
+    batches = [queries[i:i + args.batch] for i in range(0, len(queries), args.batch)]
+
+    exact = FlatIndex(args.dim)
+    exact.build(vectors, ids)
+    truth = np.concatenate([exact.search(batch, args.k)[1] for batch in batches])
+
+    candidates = [('ivf', {'nprobe': n}) for n in args.nprobe]
+    try:
+        create_index('hnsw', args.dim)
+        candidates += [('hnsw', {'ef': ef}) for ef in args.ef]
+    except RuntimeError as e:
+        print(f"HNSW omitido: {e}")
+
+    recorder = LatencyRecorder()
+    for batch in batches:
+        with recorder.measure('exacta'):
+            exact.search(batch, args.k)
+
+    config = {'gallery': args.gallery, 'dim': args.dim, 'per_identity': args.per_identity,
+              'noise': args.noise, 'queries': args.queries, 'batch': args.batch, 'k': args.k,
+              'seed': args.seed, 'indexes': {}}
+    recalls = {}
+    built = {}
+    for kind, params in candidates:
+        if kind not in built:
+            start = time.perf_counter()
+            index = create_index(kind, args.dim)
+            index.build(vectors, ids)
+            build_s = time.perf_counter() - start
+            with tempfile.TemporaryDirectory() as tmp:
+                path = Path(tmp) / f"index_{kind}.npz"
+                start = time.perf_counter()
+                index.save(path)
+                save_s = time.perf_counter() - start
+                start = time.perf_counter()
+                index = load_index(path, kind)
+                load_s = time.perf_counter() - start
+            built[kind] = index
+            config['indexes'][kind] = {'build_s': round(build_s, 3), 'save_s': round(save_s, 3),
+                                       'load_s': round(load_s, 3)}
+            print(f"{kind}: construcción {build_s:.2f} s, guardado {save_s:.2f} s, carga {load_s:.2f} s")
+        index = built[kind]
+        for name, value in params.items():
+            setattr(index, name, value)
+            if kind == 'hnsw':
+                index._index.set_ef(value)
+        stage = f"{kind} {' '.join(f'{n}={v}' for n, v in params.items())}"
+        found = []
+        for batch in batches:
+            with recorder.measure(stage):
+                found.append(index.search(batch, args.k)[1])
+        recalls[stage] = recall_at_k(np.concatenate(found), truth)
+
+    # Altas y bajas incrementales sobre cada índice ya construido
+    extra = l2_normalize(rng.standard_normal((args.updates, args.dim), dtype=np.float32))
+    extra_ids = np.arange(len(vectors), len(vectors) + args.updates, dtype=np.int64)
+    for kind, index in built.items():
+        for i in range(args.updates):
+            with recorder.measure(f"{kind} alta"):
+                index.add(extra[i:i + 1], extra_ids[i:i + 1])
+        for i in range(args.updates):
+            with recorder.measure(f"{kind} baja"):
+                index.remove(extra_ids[i:i + 1])
+
+    stages = recorder.summary()
+    for stage, recall in recalls.items():
+        stages[stage][f'recall@{args.k}'] = round(recall, 4)
+    print(f"galería {args.gallery} × {args.dim}, {args.queries} consultas en lotes de {args.batch}")
+    print_table(stages)
+    exact_p50 = stages['exacta']['p50_ms']
+    for stage, recall in recalls.items():
+        speedup = exact_p50 / stages[stage]['p50_ms'] if stages[stage]['p50_ms'] else float('inf')
+        print(f"{stage:<18} recall@{args.k} {recall:.3f}  aceleración p50 ×{speedup:.1f}")
+
+    if args.output:
+        write_results(args.output, 'ann', config, stages)
+        print(f"Resultados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
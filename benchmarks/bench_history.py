@@ -0,0 +1,94 @@
+# benchmarks/bench_history.py
+"""Benchmark de escritura y consultas por rango sobre el registro de acciones
+
+Uso:
+    python benchmarks/bench_history.py --records 1000000 --days 30
+    python benchmarks/bench_history.py --records 5000000 --output benchmarks/results/history.json
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.common import LatencyRecorder, peak_rss_mb, print_table, write_results  # noqa: E402
+from app.services.action_log import ActionLogWriter, record_dtype  # noqa: E402
+from app.services.history_query import ActionHistory  # noqa: E402
+
+ACTIONS = ['waving', 'sitting', 'standing', 'walking', 'falling', 'clapping']
+
+
+def make_records(rng: np.random.Generator, start: int, count: int, t0: float, step: float) -> np.ndarray:
+    """Registros sintéticos equiespaciados en el tiempo con acciones al azar"""
+    records = np.zeros(count, dtype=record_dtype())
+    records['ts'] = t0 + step * np.arange(start, start + count)
+    records['confidence'] = rng.random(count, dtype=np.float32)
+    records['action'] = np.array([a.encode() for a in ACTIONS])[rng.integers(0, len(ACTIONS), count)]
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=1_000_000)
+    parser.add_argument('--days', type=float, default=30)
+    parser.add_argument('--segment', type=int, default=100_000, help="registros por segmento")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--cached-segments', type=int, default=64)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    t0 = time.time() - args.days * 86400
+    step = args.days * 86400 / args.records
+    recorder = LatencyRecorder()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        start = time.perf_counter()
+        with ActionLogWriter(directory, max_records=args.segment) as writer:
+            for offset in range(0, args.records, 50_000):
+                writer.extend(make_records(rng, offset, min(50_000, args.records - offset), t0, step))
+        write_s = time.perf_counter() - start
+        with ActionLogWriter(directory, max_records=args.segment) as writer:
+            for _ in range(1000):
+                with recorder.measure('append'):
+                    writer.append('waving', 0.9, np.zeros((17, 3), dtype=np.float32))
+
+        history = ActionHistory(directory, max_cached_segments=args.cached_segments)
+        with recorder.measure('counts (frío)'):
+            history.counts()
+        span = args.days * 86400
+        for _ in range(args.queries):
+            lo = t0 + rng.random() * (span - 3600)
+            with recorder.measure('count 1 h'):
+                history.count(lo, lo + 3600, 'waving')
+            with recorder.measure('counts 1 día'):
+                history.counts(lo, lo + 86400)
+        for _ in range(max(1, args.queries // 10)):
+            with recorder.measure('counts total'):
+                history.counts()
+            with recorder.measure('histograma 1 h'):
+                history.histogram(t0, t0 + span, 3600)
+
+        disk_mb = sum(p.stat().st_size for p in directory.iterdir()) / 2**20
+
+    stages = recorder.summary()
+    config = {'records': args.records, 'days': args.days, 'segment': args.segment,
+              'queries': args.queries, 'cached_segments': args.cached_segments, 'seed': args.seed,
+              'write_s': round(write_s, 3), 'disk_mb': round(disk_mb, 1)}
+    print(f"{args.records} registros en {args.days:g} días: escritura {write_s:.2f} s "
+          f"({args.records / write_s:,.0f} reg/s), {disk_mb:.1f} MB en disco, pico RSS {peak_rss_mb()} MB")
+    print_table(stages)
+
+    if args.output:
+        write_results(args.output, 'history', config, stages)
+        print(f"Resultados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
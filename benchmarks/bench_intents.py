@@ -0,0 +1,114 @@
+# benchmarks/bench_intents.py
+"""Benchmark del analizador de comandos de voz/texto sobre miles de frases
+
+Uso:
+    python benchmarks/bench_intents.py --utterances 5000
+    python benchmarks/bench_intents.py --utterances 20000 --output benchmarks/results/intents.json
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.common import LatencyRecorder, print_table, write_results  # noqa: E402
+from app.services.intent_engine import COLORS, MASKS, OBJECT_ALIASES, IntentParser  # noqa: E402
+
+PREFIXES = ['', 'nova ', 'oye nova ', 'por favor ', 'nova por favor ']
+FACES = ['ana', 'carlos', 'maria jose', 'el profe', 'juan perez']
+
+
+def make_utterances(rng: random.Random, count: int) -> list:
+    """Frases sintéticas con la intención esperada: (texto, intención, argumento)"""
+    objects = [(alias, name) for name, aliases in OBJECT_ALIASES.items() for alias in aliases]
+    colors = [(word, color) for color, words in COLORS.items() for word in words]
+    masks = [(word, method) for method, words in MASKS.items() for word in words]
+    templates = [
+        lambda: ('inicia la cámara', 'start', None),
+        lambda: ('detén el video', 'stop', None),
+        lambda: ('¿puedes parar?', 'stop', None),
+        lambda: (lambda o: (f"busca {o[0]}", 'search', o[1]))(rng.choice(objects)),
+        lambda: (lambda o, c: (f"encuentra el {o[0]} {c[0]}", 'search', o[1]))(
+            rng.choice(objects), rng.choice(colors)),
+        lambda: (lambda m: (f"enmascara con {m[0]}", 'mask', m[1]))(rng.choice(masks)),
+        lambda: (lambda m: (f"usa {m[0]}", 'mask', m[1]))(rng.choice(masks)),
+        lambda: ('quita la máscara', 'mask', 'm0'),
+        lambda: ('modo rostros', 'mode', 'face'),
+        lambda: (lambda f: (f"busca a {f}", 'find_face', f))(rng.choice(FACES)),
+        lambda: ('cancela la búsqueda', 'clear', None),
+    ]
+    utterances = []
+    for _ in range(count):
+        text, intent, arg = rng.choice(templates)()
+        utterances.append((rng.choice(PREFIXES) + text, intent, arg))
+    return utterances
+
+
+def legacy_parse(command: str) -> str:
+    """Comparación por subcadenas de la versión anterior (solo iniciar/detener)"""
+    command = command.lower()
+    if "detener" in command or "parar" in command:
+        return 'stop'
+    elif "iniciar" in command or "comenzar" in command:
+        return 'start'
+    return 'unknown'
+
+
+def argument(result: dict, intent: str):
+    return {'search': result['object'], 'mask': result['mask'], 'mode': result['mode'],
+            'find_face': result['face']}.get(intent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--utterances', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, default=None)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    utterances = make_utterances(rng, args.utterances)
+    recorder = LatencyRecorder()
+
+    start = time.perf_counter()
+    intents = IntentParser(face_aliases=FACES)
+    compile_s = time.perf_counter() - start
+    start = time.perf_counter()
+    intents.set_face_aliases(FACES)
+    alias_s = time.perf_counter() - start
+
+    correct = legacy_correct = 0
+    for text, intent, arg in utterances:
+        start = time.perf_counter()
+        result = intents.parse(text)
+        elapsed = time.perf_counter() - start
+        recorder.samples['parse'].append(elapsed)
+        recorder.wall['parse'] += elapsed
+        correct += result['intent'] == intent and (arg is None or argument(result, intent) == arg)
+
+        start = time.perf_counter()
+        legacy = legacy_parse(text)
+        elapsed = time.perf_counter() - start
+        recorder.samples['legacy'].append(elapsed)
+        recorder.wall['legacy'] += elapsed
+        legacy_correct += legacy == intent
+
+    stages = recorder.summary()
+    print(f"{len(utterances)} frases, compilación {compile_s * 1000:.2f} ms, "
+          f"alias de rostros {alias_s * 1000:.2f} ms")
+    print_table(stages)
+    accuracy = correct / len(utterances)
+    print(f"aciertos: analizador {accuracy:.1%}, anterior {legacy_correct / len(utterances):.1%}")
+
+    if args.output:
+        stages['parse']['accuracy'] = round(accuracy, 4)
+        config = {'utterances': args.utterances, 'seed': args.seed,
+                  'compile_ms': round(compile_s * 1000, 3), 'face_alias_ms': round(alias_s * 1000, 3)}
+        write_results(args.output, 'intents', config, stages)
+        print(f"Resultados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# benchmarks/bench_vision.py
+"""Benchmark de detección y enmascaramiento de VideoService sin cámara ni GUI
+
+Uso:
+    python benchmarks/bench_vision.py --source synthetic:640x480 --frames 300
+    python benchmarks/bench_vision.py --source grabacion.mp4 --raw --output benchmarks/results/base.json
+"""
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.common import LatencyRecorder, PROJECT_ROOT, print_table, write_results  # noqa: E402
+from app.services.frame_source import create_source  # noqa: E402
+from app.services.masking import MaskingEngine  # noqa: E402
+from app.services.video_service import VideoService  # noqa: E402
+
+STAGES = ('objects', 'faces', 'masking')
+
+
+def load_frames(spec: str, count: int, recorder: LatencyRecorder) -> list:
+    """Decodifica los frames por adelantado para no mezclar E/S con inferencia"""
+    source = create_source(spec, realtime=False)
+    if hasattr(source, 'num_frames') and source.num_frames is None:
+        source.num_frames = count
+    if not source.open():
+        raise SystemExit(f"No se pudo abrir la fuente: {spec}")
+    frames = []
+    try:
+        while len(frames) < count:
+            with recorder.measure('capture'):
+                ret, frame = source.read()
+            if not ret:
+                break
+            frames.append(frame)
+    finally:
+        source.release()
+    if not frames:
+        raise SystemExit(f"La fuente no entregó frames: {spec}")
+    return frames
+
+
+def run_stage(recorder, name, frames, fn, warmup):
+    for i, frame in enumerate(frames):
+        work = frame.copy()
+        if i < warmup:
+            fn(work)
+            continue
+        with recorder.measure(name):
+            fn(work)
+
+
+def synthetic_boxes(frame: np.ndarray, count: int = 4) -> np.ndarray:
+    h, w = frame.shape[:2]
+    size = max(16, min(h, w) // 5)
+    xs = np.linspace(0, w - size, count).astype(np.int32)
+    return np.stack([xs, np.full(count, h // 3), xs + size, np.full(count, h // 3 + size)], axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default='synthetic:640x480',
+                        help="Archivo de video, carpeta de imágenes, .npy o synthetic[:WxH]")
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--stages', default=','.join(STAGES))
+    parser.add_argument('--device', default=None)
+    parser.add_argument('--raw', action='store_true',
+                        help="Detecta en todos los frames (sin seguimiento ni compuerta de movimiento)")
+    parser.add_argument('--output', type=Path, default=None)
+    args = parser.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"Etapas desconocidas: {', '.join(sorted(unknown))}")
+
+    recorder = LatencyRecorder()
+    frames = load_frames(args.source, args.frames + args.warmup, recorder)
+    service = VideoService(device=args.device)
+    if args.raw:
+        service.set_detect_interval(1)
+        service.set_motion_gating(False)
+
+    if 'objects' in stages:
+        run_stage(recorder, 'object_predict', frames, service.predict_object_boxes, args.warmup)
+        service.set_detection_mode('object')
+        run_stage(recorder, 'object_pipeline', frames, service.process_frame, args.warmup)
+
+    face_boxes = None
+    if 'faces' in stages:
+        run_stage(recorder, 'face_predict', frames, service.predict_face_boxes, args.warmup)
+        face_boxes = service.predict_face_boxes(frames[0])
+        service.set_detection_mode('face')
+        service.mask_method = 'm1'
+        run_stage(recorder, 'face_pipeline', frames, service.process_frame, args.warmup)
+
+    if 'masking' in stages:
+        engine = MaskingEngine(PROJECT_ROOT / "assets/emojis")
+        if face_boxes is None or not len(face_boxes):
+            face_boxes = synthetic_boxes(frames[0])
+        for method in ('m1', 'm2', 'm3', 'm4'):
+            run_stage(recorder, f'mask_{method}', frames,
+                      lambda f, m=method: engine.apply(f, face_boxes, m), args.warmup)
+
+    summary = recorder.summary()
+    print_table(summary)
+    output = args.output or PROJECT_ROOT / 'benchmarks' / 'results' / f"vision_{datetime.now():%Y%m%d_%H%M%S}.json"
+    config = {'source': args.source, 'frames': len(frames) - args.warmup, 'warmup': args.warmup,
+              'stages': stages, 'device': args.device, 'raw': args.raw,
+              'frame_shape': list(frames[0].shape), 'model_stats': service.get_model_stats()}
+    results = write_results(output, 'vision', config, summary)
+    print(f"Pico RSS: {results['peak_rss_mb']} MB")
+    print(f"Resultados: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/common.py
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+class LatencyRecorder:
+    """Acumula latencias por etapa y resume percentiles y FPS"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.wall: Dict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def measure(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.samples[stage].append(elapsed)
+            self.wall[stage] += elapsed
+
+    def summary(self) -> Dict[str, dict]:
+        result = {}
+        for stage, values in self.samples.items():
+            ms = np.asarray(values) * 1000
+            result[stage] = {
+                'count': len(ms),
+                'mean_ms': round(float(ms.mean()), 3),
+                'p50_ms': round(float(np.percentile(ms, 50)), 3),
+                'p95_ms': round(float(np.percentile(ms, 95)), 3),
+                'p99_ms': round(float(np.percentile(ms, 99)), 3),
+                'max_ms': round(float(ms.max()), 3),
+                'fps': round(len(ms) / self.wall[stage], 2) if self.wall[stage] > 0 else None,
+            }
+        return result
+
+
+def peak_rss_mb() -> float:
+    """Pico de memoria residente del proceso en MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB; macOS reporta bytes
+    return round(peak / (2**20 if sys.platform == 'darwin' else 2**10), 1)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+            stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconocido'
+
+
+def write_results(path: Path, name: str, config: dict, stages: Dict[str, dict]) -> dict:
+    """Escribe los resultados en JSON junto con metadatos del entorno"""
+    results = {
+        'benchmark': name,
+        'commit': git_revision(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': config,
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': stages,
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+    return results
+
+
+def print_table(stages: Dict[str, dict]):
+    print(f"{'etapa':<18}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'fps':>10}")
+    for stage, s in stages.items():
+        fps = f"{s['fps']:.1f}" if s['fps'] else '-'
+        print(f"{stage:<18}{s['count']:>6}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{fps:>10}")
@@ -0,0 +1,55 @@
+# benchmarks/compare.py
+"""Compara dos resultados JSON de benchmarks y marca regresiones
+
+Uso:
+    python benchmarks/compare.py benchmarks/results/base.json benchmarks/results/actual.json --threshold 0.10
+
+Retorna código 1 si alguna etapa empeora su p50 o p95 más que el umbral.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def compare(base: dict, current: dict, threshold: float) -> bool:
+    print(f"base: {base.get('commit')} ({base.get('timestamp')})  actual: {current.get('commit')} ({current.get('timestamp')})")
+    print(f"{'etapa':<18}" + ''.join(f"{m:>22}" for m in METRICS))
+    regressed = False
+    for stage, cur in current['stages'].items():
+        old = base['stages'].get(stage)
+        if old is None:
+            print(f"{stage:<18}{'(nueva)':>22}")
+            continue
+        cells = []
+        for metric in METRICS:
+            delta = (cur[metric] - old[metric]) / old[metric] if old[metric] else 0.0
+            flag = ''
+            if delta > threshold and metric != 'p99_ms':
+                flag = ' !'
+                regressed = True
+            cells.append(f"{old[metric]:.2f}->{cur[metric]:.2f} {delta:+.0%}{flag}")
+        print(f"{stage:<18}" + ''.join(f"{c:>22}" for c in cells))
+    rss_old, rss_new = base.get('peak_rss_mb'), current.get('peak_rss_mb')
+    if rss_old and rss_new:
+        print(f"pico RSS: {rss_old} MB -> {rss_new} MB ({(rss_new - rss_old) / rss_old:+.0%})")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('base', type=Path)
+    parser.add_argument('current', type=Path)
+    parser.add_argument('--threshold', type=float, default=0.10)
+    args = parser.parse_args()
+    base = json.loads(args.base.read_text(encoding='utf-8'))
+    current = json.loads(args.current.read_text(encoding='utf-8'))
+    if compare(base, current, args.threshold):
+        print("Regresión detectada")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
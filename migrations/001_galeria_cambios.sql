@@ -0,0 +1,59 @@
+-- migrations/001_galeria_cambios.sql
+-- Registro de cambios de buscar_rostro/imagen para sincronizar la galería de
+-- embeddings de forma incremental (app/services/gallery_sync.py).
+-- Cada alta, baja o cambio de alias agrega una fila con una versión creciente.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS galeria_cambios (
+    version     BIGSERIAL PRIMARY KEY,
+    tabla       VARCHAR(20) NOT NULL,          -- 'imagen' o 'buscar_rostro'
+    operacion   CHAR(1)     NOT NULL,          -- 'I' alta, 'U' cambio de alias, 'D' baja
+    id_rostro   INTEGER     NOT NULL,
+    id_imagen   INTEGER,
+    cambiado_en TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_galeria_cambios_fecha ON galeria_cambios (cambiado_en);
+
+CREATE OR REPLACE FUNCTION registrar_cambio_galeria() RETURNS trigger AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'imagen' THEN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO galeria_cambios (tabla, operacion, id_rostro, id_imagen)
+            VALUES ('imagen', 'D', OLD.id_rostro, OLD.id);
+            RETURN OLD;
+        END IF;
+        INSERT INTO galeria_cambios (tabla, operacion, id_rostro, id_imagen)
+        VALUES ('imagen', 'I', NEW.id_rostro, NEW.id);
+        RETURN NEW;
+    END IF;
+
+    -- buscar_rostro: las altas llegan por sus imágenes; solo interesan alias y bajas
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO galeria_cambios (tabla, operacion, id_rostro)
+        VALUES ('buscar_rostro', 'D', OLD.id_rostro);
+        RETURN OLD;
+    END IF;
+    IF NEW.alias IS DISTINCT FROM OLD.alias THEN
+        INSERT INTO galeria_cambios (tabla, operacion, id_rostro)
+        VALUES ('buscar_rostro', 'U', NEW.id_rostro);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_imagen_galeria ON imagen;
+CREATE TRIGGER trg_imagen_galeria
+    AFTER INSERT OR DELETE ON imagen
+    FOR EACH ROW EXECUTE FUNCTION registrar_cambio_galeria();
+
+DROP TRIGGER IF EXISTS trg_buscar_rostro_galeria ON buscar_rostro;
+CREATE TRIGGER trg_buscar_rostro_galeria
+    AFTER UPDATE OR DELETE ON buscar_rostro
+    FOR EACH ROW EXECUTE FUNCTION registrar_cambio_galeria();
+
+-- Los cambios ya aplicados por todos los equipos se pueden purgar, p. ej.:
+-- DELETE FROM galeria_cambios WHERE cambiado_en < now() - interval '30 days';
+
+COMMIT;
@@ -0,0 +1,32 @@
+-- migrations/002_cache_notify.sql
+-- Avisa por NOTIFY en el canal nova_cache qué tabla cambió, para que cada
+-- proceso invalide su caché de lecturas (app/utils/query_cache.py).
+-- Opcional: se activa en la aplicación con NOVA_CACHE_NOTIFY=1.
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION notificar_cambio_cache() RETURNS trigger AS $$
+BEGIN
+    -- NOTIFY agrupa los avisos idénticos de una misma transacción
+    PERFORM pg_notify('nova_cache', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Triggers por sentencia: un aviso por INSERT/UPDATE/DELETE, no uno por fila
+DROP TRIGGER IF EXISTS trg_users_cache ON users;
+CREATE TRIGGER trg_users_cache
+    AFTER INSERT OR UPDATE OR DELETE ON users
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_cache();
+
+DROP TRIGGER IF EXISTS trg_buscar_rostro_cache ON buscar_rostro;
+CREATE TRIGGER trg_buscar_rostro_cache
+    AFTER INSERT OR UPDATE OR DELETE ON buscar_rostro
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_cache();
+
+DROP TRIGGER IF EXISTS trg_imagen_cache ON imagen;
+CREATE TRIGGER trg_imagen_cache
+    AFTER INSERT OR UPDATE OR DELETE ON imagen
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_cache();
+
+COMMIT;
@@ -0,0 +1,43 @@
+-- migrations/003_eventos_deteccion.sql
+-- Historial de detecciones (app/services/event_sink.py), particionado por mes.
+-- Las filas llegan por lotes con COPY; cada partición mensual se crea bajo
+-- demanda con crear_particion_eventos() y se puede archivar o eliminar entera.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS eventos_deteccion (
+    ts          TIMESTAMPTZ NOT NULL,
+    stream      VARCHAR(64) NOT NULL,
+    tipo        VARCHAR(16) NOT NULL,          -- 'object', 'face' o 'recognize'
+    etiqueta    VARCHAR(64) NOT NULL,          -- clase YOLO o alias del rostro
+    track_id    BIGINT,                        -- NULL si la caja no tiene track
+    confianza   REAL        NOT NULL,
+    x1          INTEGER     NOT NULL,
+    y1          INTEGER     NOT NULL,
+    x2          INTEGER     NOT NULL,
+    y2          INTEGER     NOT NULL,
+    usuario     VARCHAR(64)
+) PARTITION BY RANGE (ts);
+
+CREATE TABLE IF NOT EXISTS eventos_deteccion_default
+    PARTITION OF eventos_deteccion DEFAULT;
+
+-- BRIN: las filas llegan casi ordenadas por tiempo, el índice ocupa unos KB
+CREATE INDEX IF NOT EXISTS idx_eventos_deteccion_ts ON eventos_deteccion USING brin (ts);
+CREATE INDEX IF NOT EXISTS idx_eventos_deteccion_etiqueta ON eventos_deteccion (etiqueta, ts);
+
+CREATE OR REPLACE FUNCTION crear_particion_eventos(mes DATE) RETURNS void AS $$
+DECLARE
+    inicio DATE := date_trunc('month', mes);
+    nombre TEXT := 'eventos_deteccion_' || to_char(inicio, 'YYYY_MM');
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF eventos_deteccion FOR VALUES FROM (%L) TO (%L)',
+        nombre, inicio, inicio + interval '1 month');
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT crear_particion_eventos(current_date);
+SELECT crear_particion_eventos((current_date + interval '1 month')::date);
+
+COMMIT;